@@ -1,31 +1,61 @@
 from modules.utils import * 
 # streamlit run .\Home.py
 
+@st.fragment(run_every=1.0)
+def wait_for_deck():
+    """Mientras el mazo carga en segundo plano; cuando está listo, se redibuja la página con el panel."""
+    if fm.is_loaded():
+        st.rerun()
+    st.caption("Loading your deck...")
+
+def metrics_panel():
+    """Contadores que el manager mantiene en cada revisión y alta: dibujarlos no recorre nada."""
+    stats = fm.get_stats()
+    col_streak, col_today, col_due, col_retention = st.columns(4)
+    col_streak.metric("Streak", f"{stats['streak']} 🔥", help=f"Longest streak: {stats['longest_streak']} days")
+    col_today.metric("Reviewed today", stats['reviews_today'],
+                     help=f"{stats['added_today']} cards added today · {stats['total_reviews']} reviews in total")
+    col_due.metric("Due today", stats['due_today'])
+    retention = stats['retention']
+    col_retention.metric("Retention", "-" if retention is None else f"{retention:.0%}",
+                         help="Reviews not graded 'Again'")
+    st.caption("Cards due in the next days")
+    forecast = stats['due_forecast']
+    st.bar_chart({"Day": [day[5:] for day in forecast], "Cards": list(forecast.values())},
+                 x="Day", y="Cards", height=160)
+
 def main():
-    st.set_page_config(page_title="English Flashcards Generator", layout="centered", page_icon="🧠")
-    initialize_session_state()
-    
-    st.title("🧠 English Flashcards Generator")
-    st.write("")
-    st.write("")
-
-    col_review, col_add, col_manage = st.columns(3)
-
-    with col_review:
-        if st.button("Review", width='stretch'):
-            st.session_state.review_index = 0
-            st.session_state.show_answer = False
-            st.switch_page("pages/1_Review.py")
-
-    with col_add:
-        if st.button("Add", use_container_width=True):
-            st.switch_page("pages/2_Add.py")
-
-    with col_manage:
-        if st.button("Manage", use_container_width=True):
-            st.switch_page("pages/3_Manage.py")
-
-    st.divider()
+    with page_timer("home"):
+        st.set_page_config(page_title="English Flashcards Generator", layout="centered", page_icon="🧠")
+        # El mazo se carga en segundo plano: Home no lo necesita para dibujarse
+        fm.warm_up()
+
+        st.title("🧠 English Flashcards Generator")
+        st.write("")
+        st.write("")
+
+        col_review, col_add, col_manage = st.columns(3)
+
+        with col_review:
+            if st.button("Review", width='stretch'):
+                st.session_state.review_index = 0
+                st.session_state.show_answer = False
+                st.switch_page("pages/1_Review.py")
+
+        with col_add:
+            if st.button("Add", use_container_width=True):
+                st.switch_page("pages/2_Add.py")
+
+        with col_manage:
+            if st.button("Manage", use_container_width=True):
+                st.switch_page("pages/3_Manage.py")
+
+        st.divider()
+
+        if fm.is_loaded():
+            metrics_panel()
+        else:
+            wait_for_deck()
 
 if __name__ == '__main__':
     main()
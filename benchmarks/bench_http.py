@@ -0,0 +1,131 @@
+"""
+Benchmark de muchas sesiones a la vez contra la BD: compara el acceso síncrono (FakeSupabase,
+una llamada bloqueante por consulta, como supabase-py) con la capa asíncrona
+(AsyncPostgrest sobre un PostgREST falso en proceso), con la misma latencia inyectada.
+
+Cada sesión, en su propio hilo: carga el mazo, trae algunos 'back' y sincroniza.
+Al final se escriben todas las revisiones. Se informa el tiempo total, las operaciones
+por segundo, p50/p99 de cada operación y cuántas peticiones llegaron al "servidor".
+
+    python benchmarks/bench_http.py --sessions 32 --cards 5000 --latency 0.03
+    python benchmarks/bench_http.py --fail-rate 0.05   # 5% de respuestas 503 (sólo async reintenta)
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.decks import seed_local
+from benchmarks.fake_postgrest import FakePostgrest
+from benchmarks.fake_supabase import FakeSupabase
+from modules.async_db import AsyncPostgrest
+import modules.flashcards_manager as fm
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] if samples else 0.0
+
+
+def _session(client, card_ids: List[int], args, rng: random.Random,
+             timings: Dict[str, List[float]], errors: List[str]):
+    def timed(name: str, func: Callable[[], Any]):
+        start = time.perf_counter()
+        try:
+            func()
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            return
+        timings[name].append(time.perf_counter() - start)
+
+    # Lo mismo que hacen _load_cards, get_back y sync del manager
+    timed("load", lambda: client.table("flashcards").select(fm.LOAD_COLUMNS).eq("user_id", fm.DEFAULT_USER)
+          .eq("deleted", False).order("next_review_date").execute())
+    for _ in range(args.backs):
+        ids = rng.sample(card_ids, 10)
+        timed("backs", lambda: client.table("flashcards").select("id,back").eq("user_id", fm.DEFAULT_USER)
+              .in_("id", ids).execute())
+    timed("sync", lambda: client.table("flashcards").select(fm.LOAD_COLUMNS).eq("user_id", fm.DEFAULT_USER)
+          .gte("updated_at", "2000-01-01").order("updated_at").limit(50).execute())
+
+
+def run(backend: str, args) -> Dict[str, Any]:
+    if backend == "sync":
+        client = FakeSupabase(latency=args.latency, jitter=args.jitter)
+        server = client
+        seed_local(client.local, args.cards, seed=args.seed)
+    else:
+        server = FakePostgrest(latency=args.latency, jitter=args.jitter, fail_rate=args.fail_rate, seed=args.seed)
+        seed_local(server.local, args.cards, seed=args.seed)
+        client = AsyncPostgrest("http://bench", "key", transport=server.transport(), base_delay=0.02,
+                                max_connections=args.connections)
+
+    manager = fm.FlashcardsManager(client=client)
+    card_ids = list(manager.cards)
+    calls_before = server.calls if backend == "sync" else server.requests
+    timings: Dict[str, List[float]] = {"load": [], "backs": [], "sync": []}
+    errors: List[str] = []
+    threads = [threading.Thread(target=_session, args=(client, card_ids, args, random.Random(args.seed + i),
+                                                       timings, errors))
+               for i in range(args.sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    rng = random.Random(args.seed)
+    for card_id in rng.sample(card_ids, args.reviews):
+        manager.review_card(card_id, rng.randint(0, 3))
+    start = time.perf_counter()
+    manager.flush_reviews()
+    flush_seconds = time.perf_counter() - start
+    calls = (server.calls if backend == "sync" else server.requests) - calls_before
+    manager.close()
+    if backend == "async":
+        client.close()
+
+    operations = sum(len(samples) for samples in timings.values())
+    result = {'backend': backend, 'seconds': elapsed, 'ops_per_second': operations / elapsed,
+              'server_requests': calls, 'errors': len(errors), 'flush_seconds': flush_seconds}
+    for name, samples in timings.items():
+        result[f'{name}_p50_ms'] = _percentile(samples, 0.5) * 1000
+        result[f'{name}_p99_ms'] = _percentile(samples, 0.99) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sesiones concurrentes: acceso síncrono vs AsyncPostgrest.")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--backs", type=int, default=5, help="Consultas de 'back' por sesión")
+    parser.add_argument("--reviews", type=int, default=500, help="Revisiones escritas al final")
+    parser.add_argument("--latency", type=float, default=0.03, help="Segundos por petición")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fracción de respuestas 503 (async)")
+    parser.add_argument("--connections", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir) # Journals de los managers
+        rows = [run(backend, args) for backend in ("sync", "async")]
+        os.chdir(ROOT)
+
+    keys = [key for key in rows[0] if key != 'backend']
+    print(f"{args.sessions} sesiones, {args.cards} tarjetas, latencia {args.latency * 1000:.0f} ms")
+    print(f"  {'':<18}" + "".join(f"{row['backend']:>12}" for row in rows))
+    for key in keys:
+        print(f"  {key:<18}" + "".join(f"{row[key]:>12.4g}" for row in rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Benchmark de FlashcardsManager contra un Supabase falso en proceso (con latencia inyectada).
+Mide, para cada tamaño de mazo: carga (_load_cards), load_all_cards, get_due_cards,
+revisiones por segundo y memoria por tarjeta y por revisión. El resultado es JSON,
+para comparar commits:
+
+    python benchmarks/bench_manager.py --sizes 1000 10000 100000 --latency 0.02
+    python benchmarks/bench_manager.py --sizes 1000000 --runs 1
+    python benchmarks/bench_manager.py --compare benchmarks/results/<commit anterior>.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.decks import seed_local
+from benchmarks.fake_supabase import FakeSupabase
+import modules.flashcards_manager as fm
+
+DEFAULT_SIZES = [1000, 10000, 100000] # 1M: --sizes 1000000 (necesita varios GB de RAM)
+GRADES = ["Again", "Hard", "Good", "Easy"]
+
+# Métricas donde más es mejor (para el --compare)
+HIGHER_IS_BETTER = {"reviews_per_second"}
+
+
+def _timed(func: Callable[[], Any], runs: int) -> float:
+    """Mediana de 'runs' ejecuciones, en segundos."""
+    samples = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def _allocated(func: Callable[[], Any]) -> int:
+    """Bytes que quedan asignados después de ejecutar 'func' (tracemalloc)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def _seeded_manager(cards: int, args) -> fm.FlashcardsManager:
+    """Manager nuevo sobre un Supabase falso con un mazo recién sembrado."""
+    client = FakeSupabase(latency=args.latency, jitter=args.jitter, per_row=args.per_row)
+    seed_local(client.local, cards, seed=args.seed)
+    return fm.FlashcardsManager(client=client)
+
+
+def _reviews(manager: fm.FlashcardsManager, args) -> List[Any]:
+    """Las mismas revisiones (tarjeta, botón) para una misma semilla."""
+    rng = random.Random(args.seed)
+    card_ids = list(manager.cards)
+    return [(rng.choice(card_ids), rng.choice(GRADES)) for _ in range(args.reviews)]
+
+
+def _review_all(reviews: List[Any]) -> None:
+    for card_id, grade in reviews:
+        fm.update_review_status(card_id, grade)
+
+
+def bench_size(cards: int, args) -> Dict[str, Any]:
+    client = FakeSupabase(latency=args.latency, jitter=args.jitter, per_row=args.per_row)
+    started = time.perf_counter()
+    seed_local(client.local, cards, seed=args.seed)
+    result: Dict[str, Any] = {'cards': cards, 'seed_seconds': time.perf_counter() - started}
+
+    started = time.perf_counter()
+    manager = fm.FlashcardsManager(client=client)
+    result['init_seconds'] = time.perf_counter() - started
+    # Los wrappers de las páginas usan el manager del usuario de la sesión: acá, el del benchmark
+    fm.current_manager = lambda: manager
+
+    result['load_cards_seconds'] = _timed(manager._load_cards, args.runs)
+    result['load_all_cards_seconds'] = _timed(fm.load_all_cards, args.runs)
+    result['get_due_cards_seconds'] = _timed(fm.get_due_cards, args.runs)
+    result['due_cards'] = len(manager.due_cards())
+
+    reviews = _reviews(manager, args)
+    started = time.perf_counter()
+    _review_all(reviews)
+    elapsed = time.perf_counter() - started
+    result['reviews_per_second'] = len(reviews) / elapsed
+    result['review_latency_us'] = elapsed / len(reviews) * 1e6
+    result['flush_seconds'] = _timed(manager.flush_reviews, 1)
+    manager.close()
+
+    if not args.no_memory:
+        # Mazo nuevo: repetir las revisiones sobre tarjetas ya revisadas no mide lo mismo
+        manager = _seeded_manager(cards, args)
+        fm.current_manager = lambda: manager
+        manager.cards = {}
+        manager._rebuild_due_index()
+        result['bytes_per_card'] = _allocated(manager._load_cards) / max(cards, 1)
+        reviews = _reviews(manager, args)
+        result['bytes_per_review'] = _allocated(lambda: _review_all(reviews)) / len(reviews)
+        manager.flush_reviews()
+        manager.close()
+
+    return result
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def compare(current: Dict[str, Any], baseline_path: str):
+    """Imprime la variación de cada métrica respecto de un resultado anterior."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old_rows = {row['cards']: row for row in baseline['results']}
+    print(f"\nComparado con {baseline['meta']['commit']} ({baseline_path}):")
+    for row in current['results']:
+        old = old_rows.get(row['cards'])
+        if old is None:
+            continue
+        for key, value in row.items():
+            if key in ('cards', 'seed_seconds', 'due_cards') or not old.get(key):
+                continue
+            change = (value - old[key]) / old[key] * 100
+            worse = change < 0 if key in HIGHER_IS_BETTER else change > 0
+            flag = "  <-- peor" if worse and abs(change) > 10 else ""
+            print(f"  {row['cards']:>8} {key:<26} {old[key]:>12.4g} -> {value:>12.4g} ({change:+.1f}%){flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de FlashcardsManager con un Supabase falso.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--latency", type=float, default=0.0, help="Segundos por llamada a la BD")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--per-row", type=float, default=0.0, help="Segundos extra por fila devuelta")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--reviews", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="No medir memoria (tracemalloc es lento)")
+    parser.add_argument("--output", default=None, help="Por defecto benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", default=None, help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    report = {
+        'meta': {'commit': _commit(), 'date': datetime.now().isoformat(timespec='seconds'),
+                 'python': platform.python_version(), 'machine': platform.machine(),
+                 'latency': args.latency, 'jitter': args.jitter, 'per_row': args.per_row,
+                 'runs': args.runs, 'reviews': args.reviews, 'seed': args.seed},
+        'results': [],
+    }
+    output = os.path.abspath(args.output or os.path.join(ROOT, "benchmarks", "results",
+                                                         f"{report['meta']['commit']}.json"))
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    # Journals y archivos de la app van a un directorio temporal
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for cards in args.sizes:
+            print(f"Mazo de {cards} tarjetas...")
+            row = bench_size(cards, args)
+            report['results'].append(row)
+            for key, value in row.items():
+                if key != 'cards':
+                    print(f"  {key:<26} {value:.4g}")
+        os.chdir(ROOT)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados en {output}")
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark del snapshot binario (.fcs) contra el camino JSON, con un Supabase falso en proceso:
+
+- arranque: carga en frío desde la BD (latencia por llamada + costo por fila) vs arranque en
+  caliente desde el snapshot, y cuánto tarda la reconciliación en segundo plano;
+- backup: un JSON con todas las filas vs el snapshot (tiempo y tamaño);
+- restore: leer el backup y reinsertarlo en un mazo vacío (inserts por lotes en ambos casos).
+
+    python benchmarks/bench_snapshot.py --cards 50000 --latency 0.03 --per-row 0.00002
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.decks import seed_local
+from benchmarks.fake_supabase import FakeSupabase
+import modules.flashcards_manager as fm
+
+
+def _timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def _wait_reconciled(manager: fm.FlashcardsManager, timeout: float = 120.0) -> float:
+    """Segundos hasta que termina el hilo de reconciliación (se mide desde que se lo llama)."""
+    start = time.perf_counter()
+    for thread in threading.enumerate():
+        if thread.name == "snapshot-reconcile":
+            thread.join(timeout)
+    manager.sync()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot binario vs JSON: arranque, backup y restore.")
+    parser.add_argument("--cards", type=int, default=50000)
+    parser.add_argument("--latency", type=float, default=0.03, help="Segundos por llamada")
+    parser.add_argument("--per-row", type=float, default=0.00002, help="Segundos por fila devuelta")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir) # Journals de los managers
+        client = FakeSupabase(latency=args.latency, per_row=args.per_row)
+        seed_local(client.local, args.cards, seed=args.seed)
+        snapshot_path = os.path.join(workdir, "deck.fcs")
+
+        cold, cold_s = _timed(lambda: fm.FlashcardsManager(client=client))
+        size, first_save_s = _timed(lambda: cold.save_snapshot(snapshot_path))
+        cold.close()
+
+        warm, warm_s = _timed(lambda: fm.FlashcardsManager(client=client, snapshot_path=snapshot_path))
+        reconcile_s = _wait_reconciled(warm)
+        # Backup: reusa los 'back' del snapshot abierto (las tarjetas no cambiaron)
+        backup_path = os.path.join(workdir, "backup.fcs")
+        backup_size, backup_s = _timed(lambda: warm.save_snapshot(backup_path))
+        warm.close()
+
+        # Backup JSON: las filas completas, como las devuelve la BD
+        rows, json_dump_s = _timed(lambda: client.local.table("flashcards").select("*").execute().data)
+        json_path = os.path.join(workdir, "deck.json")
+        json_size, write_s = _timed(lambda: open(json_path, "w").write(json.dumps(rows)))
+        json_dump_s += write_s
+
+        def restore_json(manager):
+            data = json.load(open(json_path))
+            batch = [{key: row[key] for key in ('front', 'back', 'next_review_date', 'interval',
+                                                 'easiness_factor', 'repetitions')} for row in data]
+            return sum(len(manager._insert_rows([{**row, 'user_id': manager.user_id}
+                                                 for row in batch[i:i + 500]]))
+                       for i in range(0, len(batch), 500))
+
+        target = fm.FlashcardsManager(user_id="restore-json", client=client)
+        restored_json, restore_json_s = _timed(lambda: restore_json(target))
+        target.close()
+        target = fm.FlashcardsManager(user_id="restore-fcs", client=client)
+        restored_fcs, restore_fcs_s = _timed(lambda: target.restore_snapshot(backup_path))
+        target.close()
+        os.chdir(ROOT)
+
+    print(f"{args.cards} tarjetas · latencia {args.latency * 1000:.0f} ms + {args.per_row * 1e6:.0f} µs/fila\n")
+    print(f"  arranque en frío (BD)          {cold_s * 1000:9.1f} ms")
+    print(f"  arranque desde snapshot        {warm_s * 1000:9.1f} ms")
+    print(f"  reconciliación (en 2º plano)   {reconcile_s * 1000:9.1f} ms")
+    print(f"  primer snapshot (trae backs)   {first_save_s * 1000:9.1f} ms  {size / 2**20:8.1f} MB\n")
+    print(f"  backup JSON                    {json_dump_s * 1000:9.1f} ms  {json_size / 2**20:8.1f} MB")
+    print(f"  backup snapshot                {backup_s * 1000:9.1f} ms  {backup_size / 2**20:8.1f} MB")
+    print(f"  restore JSON                   {restore_json_s * 1000:9.1f} ms  ({restored_json} tarjetas)")
+    print(f"  restore snapshot               {restore_fcs_s * 1000:9.1f} ms  ({restored_fcs} tarjetas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Mazos sintéticos reproducibles para los benchmarks.
+Los 'back' imitan las respuestas de Gemini (título '####', acepciones y ejemplos en markdown)
+con un largo log-normal: mediana ~1000 caracteres y cola hasta ~4000, como un mazo real.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+_SYLLABLES = ("ba", "co", "de", "fi", "gu", "ha", "jo", "ki", "lu", "me", "no", "pa",
+              "qui", "ro", "su", "ta", "ve", "wi", "xo", "yu", "ze", "ran", "tor", "ing")
+_FILLER = ("the", "a", "to", "of", "in", "and", "with", "for", "someone", "something", "usually",
+           "place", "people", "time", "way", "often", "when", "make", "take", "game", "court",
+           "legal", "case", "risk", "attention", "affection", "support", "before", "after")
+
+
+def _word(rng: random.Random, i: int) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4))) + (str(i) if i % 7 == 0 else "")
+
+
+def _sentences(rng: random.Random, count: int = 4096) -> List[str]:
+    """Oraciones plantilla con '{w}' donde va la palabra (armarlas una vez abarata 1M de tarjetas)."""
+    sentences = []
+    for _ in range(count):
+        words = [rng.choice(_FILLER) for _ in range(rng.randint(8, 18))]
+        words.insert(rng.randrange(len(words)), "{w}")
+        sentences.append(" ".join(words).capitalize() + ".")
+    return sentences
+
+
+def make_back(rng: random.Random, word: str, sentences: List[str]) -> str:
+    target = min(int(rng.lognormvariate(6.8, 0.45)), 4000)
+    parts = [f"#### {word}", ""]
+    size = len(parts[0]) + 1
+    while size < target:
+        block = [rng.choice(sentences).replace("{w}", word)]
+        block += [f"* {rng.choice(sentences).replace('{w}', f'**{word}**')}" for _ in range(rng.randint(1, 2))]
+        block.append("")
+        parts += block
+        size += sum(len(line) + 1 for line in block)
+    return "\n".join(parts)
+
+
+def iter_deck(cards: int, seed: int = 0, days: int = 30) -> Iterator[Dict[str, Any]]:
+    """Filas (con 'id') listas para LocalClient.bulk_load. Vencimientos entre -days/3 y +2*days/3."""
+    rng = random.Random(seed)
+    sentences = _sentences(rng)
+    now = datetime.now().replace(microsecond=0)
+    for i in range(cards):
+        word = _word(rng, i)
+        repetitions = rng.randint(0, 8)
+        yield {
+            'id': i + 1,
+            'front': word,
+            'back': make_back(rng, word, sentences),
+            'next_review_date': (now + timedelta(days=rng.randint(-days // 3, 2 * days // 3),
+                                                 seconds=rng.randint(0, 86399))).isoformat(),
+            'interval': 0.0 if repetitions == 0 else float(rng.randint(1, 120)),
+            'easiness_factor': round(rng.uniform(1.3, 3.0), 2),
+            'repetitions': repetitions,
+        }
+
+
+def make_deck(cards: int, seed: int = 0) -> List[Dict[str, Any]]:
+    return list(iter_deck(cards, seed))
+
+
+def seed_local(client, cards: int, seed: int = 0, chunk: int = 50000):
+    """Carga el mazo en un LocalClient por partes (1M de filas no se arma entero en memoria)."""
+    rows = []
+    for row in iter_deck(cards, seed):
+        rows.append(row)
+        if len(rows) >= chunk:
+            client.bulk_load("flashcards", rows)
+            rows = []
+    if rows:
+        client.bulk_load("flashcards", rows)
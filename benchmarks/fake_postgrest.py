@@ -0,0 +1,115 @@
+"""
+PostgREST de mentira para AsyncPostgrest: un transport de httpx que responde en proceso
+(sin red) traduciendo cada petición REST a una consulta sobre un LocalClient SQLite.
+La latencia es un asyncio.sleep, así que las peticiones concurrentes se solapan como con un
+servidor real; 'fail_rate' devuelve 503 al azar para ejercitar los reintentos.
+"""
+import asyncio
+import json
+import random
+from typing import Optional
+
+import httpx
+
+from modules.local_db import LocalClient
+
+_OPS = ("eq", "neq", "gt", "gte", "lt", "lte", "in")
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+def _parse_list(text: str):
+    """'(1,2,"a,b")' -> [1, 2, 'a,b']"""
+    values, current, quoted, escaped = [], "", False, False
+    for char in text[1:-1]:
+        if escaped:
+            current, escaped = current + char, False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            values.append(current)
+            current = ""
+        else:
+            current += char
+    if current or values:
+        values.append(current)
+    return [_LITERALS.get(value, value) for value in values]
+
+
+class FakePostgrest:
+    def __init__(self, local: Optional[LocalClient] = None, latency: float = 0.0, jitter: float = 0.0,
+                 fail_rate: float = 0.0, seed: int = 0):
+        self.local = local or LocalClient(":memory:")
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self._rng = random.Random(seed)
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            delay = self.latency + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.fail_rate and self._rng.random() < self.fail_rate:
+                return httpx.Response(503, json={"message": "Service Unavailable"})
+            try:
+                data = self._run(request)
+            except (ValueError, KeyError) as e:
+                return httpx.Response(400, json={"message": str(e)})
+            return httpx.Response(200, json=data)
+        finally:
+            self.concurrent -= 1
+
+    def _run(self, request: httpx.Request):
+        path = request.url.path.split("/rest/v1/", 1)[1]
+        body = json.loads(request.content) if request.content else None
+        if path.startswith("rpc/"):
+            return self.local.rpc(path[4:], body).execute().data
+
+        query = self.local.table(path)
+        method = request.method
+        prefer = request.headers.get("Prefer", "")
+        if method == "GET":
+            query = query.select(request.url.params.get("select", "*"))
+        elif method == "POST":
+            if "-duplicates" in prefer:
+                query = query.upsert(body, on_conflict=request.url.params.get("on_conflict", ""),
+                                     ignore_duplicates="ignore-duplicates" in prefer)
+            else:
+                query = query.insert(body)
+        elif method == "PATCH":
+            query = query.update(body)
+        elif method == "DELETE":
+            query = query.delete()
+
+        limit = offset = None
+        for column, value in request.url.params.multi_items():
+            if column == "order":
+                for part in value.split(","):
+                    name, _, direction = part.partition(".")
+                    query = query.order(name, desc=direction == "desc")
+            elif column == "limit":
+                limit = int(value)
+            elif column == "offset":
+                offset = int(value)
+            elif column not in ("select", "on_conflict"):
+                op, _, operand = value.partition(".")
+                if op not in _OPS:
+                    raise ValueError(f"Operador no soportado: {op}")
+                if op == "in":
+                    query = query.in_(column, _parse_list(operand))
+                else:
+                    query = getattr(query, op)(column, _LITERALS.get(operand, operand))
+        if limit is not None:
+            query = query.range(offset or 0, (offset or 0) + limit - 1)
+        return query.execute().data
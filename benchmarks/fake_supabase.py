@@ -0,0 +1,60 @@
+"""
+Supabase de mentira, en proceso: la misma API de tablas que supabase-py
+(select/insert/upsert/update/delete, filtros, order/limit/range, rpc, execute -> .data)
+sobre un LocalClient SQLite en memoria, con latencia de red inyectada en cada execute().
+"""
+import random
+import time
+from typing import Optional
+
+from modules.local_db import LocalClient
+
+
+class _LatencyQuery:
+    __slots__ = ("_query", "_client")
+
+    def __init__(self, query, client: "FakeSupabase"):
+        self._query = query
+        self._client = client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._query, name)
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _LatencyQuery(result, self._client) if hasattr(result, "execute") else result
+        return call
+
+    def execute(self):
+        response = self._query.execute()
+        self._client.wait(len(response.data))
+        return response
+
+
+class FakeSupabase:
+    """
+    'latency' segundos por llamada (±'jitter') más 'per_row' segundos por fila devuelta,
+    para imitar el costo de transferir respuestas grandes.
+    """
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, per_row: float = 0.0,
+                 local: Optional[LocalClient] = None, seed: int = 0):
+        self.local = local or LocalClient(":memory:")
+        self.latency = latency
+        self.jitter = jitter
+        self.per_row = per_row
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    def table(self, name: str) -> _LatencyQuery:
+        return _LatencyQuery(self.local.table(name), self)
+
+    def rpc(self, name: str, params=None) -> _LatencyQuery:
+        return _LatencyQuery(self.local.rpc(name, params), self)
+
+    def wait(self, rows: int):
+        self.calls += 1
+        delay = self.latency + self.per_row * rows
+        if self.jitter:
+            delay += self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
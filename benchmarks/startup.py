@@ -0,0 +1,93 @@
+"""
+Benchmark de arranque en frío: cuánto tarda importar modules.utils y cuánto tarda
+la primera ejecución de una página (Home no espera al mazo; Review sí).
+Cada medición corre en un proceso nuevo, así no hay módulos ya importados ni caches.
+
+    python benchmarks/startup.py --runs 5 --cards 20000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import modules.utils
+print(time.perf_counter() - t)
+"""
+
+_RENDER_SNIPPET = """
+import sys, time
+t = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+at.secrets['storage'] = {'engine': 'local', 'path': sys.argv[2]}
+at.run()
+if at.exception:
+    raise SystemExit(at.exception[0].message)
+print(time.perf_counter() - t)
+"""
+
+HEAVY_MODULES = ("supabase", "google.generativeai", "gtts", "numpy")
+
+
+def seed_deck(path: str, cards: int):
+    """Base SQLite local con un mazo sintético, para que cargarlo cueste lo que cuesta de verdad."""
+    from benchmarks.decks import seed_local
+    from modules.local_db import LocalClient
+    seed_local(LocalClient(path), cards)
+
+
+def _run(snippet: str, *args: str, cwd: str) -> float:
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", snippet, *args], cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or result.stdout.strip())
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def heavy_imports(cwd: str):
+    """Qué SDKs pesados quedan importados después de 'import modules.utils'."""
+    snippet = ("import sys, modules.utils; "
+               f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, "-c", snippet], cwd=cwd, env=env,
+                            capture_output=True, text=True)
+    return [m for m in result.stdout.strip().split(",") if m]
+
+
+def report(name: str, samples):
+    print(f"{name:<32} median {statistics.median(samples) * 1000:8.1f} ms   "
+          f"min {min(samples) * 1000:8.1f} ms   max {max(samples) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque en frío de la app.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cards", type=int, default=20000, help="Tamaño del mazo sintético")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "flashcards.db")
+        seed_deck(db_path, args.cards)
+        print(f"Mazo sintético: {args.cards} tarjetas · {args.runs} ejecuciones por medición\n")
+
+        report("import modules.utils", [_run(_IMPORT_SNIPPET, cwd=workdir) for _ in range(args.runs)])
+        for page in ("Home.py", "pages/1_Review.py"):
+            samples = [_run(_RENDER_SNIPPET, os.path.join(ROOT, page), db_path, cwd=workdir)
+                       for _ in range(args.runs)]
+            report(f"first render {page}", samples)
+
+        loaded = heavy_imports(workdir)
+        print(f"\nSDKs pesados importados al arrancar: {', '.join(loaded) if loaded else 'ninguno'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import asyncio
+import random
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# --- Capa de acceso asíncrona a Supabase (PostgREST) ---
+# Misma API de tablas que supabase-py y LocalClient (table(...).select(...).eq(...).execute()),
+# pero todas las consultas de todas las sesiones pasan por un único event loop en un hilo
+# propio y una única sesión HTTP con conexiones reutilizadas (keep-alive). Encima de eso:
+#   - lecturas idénticas simultáneas (mismo GET en vuelo) se resuelven con una sola petición,
+#   - cada intento tiene timeout y los fallos transitorios se reintentan con backoff y jitter,
+#   - execute_many() manda muchas consultas a la vez sobre la misma sesión.
+
+# Estados que vale la pena reintentar (sobrecarga o fallo transitorio del servidor)
+RETRY_STATUS = frozenset((408, 425, 429, 500, 502, 503, 504))
+# Errores en los que la petición seguro no llegó al servidor: se reintentan aunque escriban
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+_RESERVED = set(',.:()" ')
+
+
+class DataAccessError(Exception):
+    """Error de la BD (status HTTP y mensaje de PostgREST)."""
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class DataTimeout(DataAccessError):
+    """La consulta no terminó dentro del plazo (contando los reintentos)."""
+
+
+class Response:
+    """Como el APIResponse de supabase-py: sólo expone '.data'."""
+    def __init__(self, data: Any):
+        self.data = data
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if value is None:
+        return "null"
+    return str(value)
+
+
+def _quote(value: Any) -> str:
+    """Valor dentro de una lista in.(...): entre comillas si tiene caracteres reservados."""
+    text = _fmt(value)
+    if _RESERVED & set(text):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+class AsyncQuery:
+    """Builder de una consulta (subconjunto de supabase-py) que se ejecuta en el loop de AsyncPostgrest."""
+    def __init__(self, client: "AsyncPostgrest", path: str, op: str = "select", payload: Any = None):
+        self.client = client
+        self.path = path
+        self._op = op
+        self._select = "*"
+        self._payload = payload
+        self._on_conflict = ""
+        self._ignore_duplicates = False
+        self._filters: List[Tuple[str, str]] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    # --- Operaciones ---
+
+    def select(self, columns: str = "*", **kwargs):
+        self._op = "select"
+        self._select = ",".join(c.strip() for c in columns.split(","))
+        return self
+
+    def insert(self, data, **kwargs):
+        self._op = "insert"
+        self._payload = data
+        return self
+
+    def upsert(self, data, on_conflict: str = "", ignore_duplicates: bool = False, **kwargs):
+        self._op = "upsert"
+        self._payload = data
+        self._on_conflict = on_conflict
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: Dict[str, Any], **kwargs):
+        self._op = "update"
+        self._payload = data
+        return self
+
+    def delete(self, **kwargs):
+        self._op = "delete"
+        return self
+
+    # --- Filtros ---
+
+    def _filter(self, column: str, op: str, value: Any):
+        self._filters.append((column, f"{op}.{_fmt(value)}"))
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column: str, values):
+        self._filters.append((column, f"in.({','.join(_quote(v) for v in values)})"))
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self._order.append(f"{column}.{'desc' if desc else 'asc'}")
+        return self
+
+    def limit(self, size: int, **kwargs):
+        self._limit = int(size)
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    # --- Ejecución ---
+
+    @property
+    def idempotent(self) -> bool:
+        """Repetirla no cambia el resultado: se puede reintentar aunque la primera haya llegado."""
+        return self._op in ("select", "upsert", "delete")
+
+    def request(self) -> Tuple[str, str, List[Tuple[str, str]], Dict[str, str], Any]:
+        """(método, path, parámetros, headers, cuerpo) de la petición HTTP."""
+        params = list(self._filters)
+        headers = {"Prefer": "return=representation"}
+        if self._op == "select":
+            params.insert(0, ("select", self._select))
+        if self._order:
+            params.append(("order", ",".join(self._order)))
+        if self._limit is not None:
+            params.append(("limit", str(self._limit)))
+        if self._offset is not None:
+            params.append(("offset", str(self._offset)))
+        method = {"select": "GET", "insert": "POST", "upsert": "POST", "update": "PATCH",
+                  "delete": "DELETE", "rpc": "POST"}[self._op]
+        if self._op == "upsert":
+            headers["Prefer"] += (",resolution=ignore-duplicates" if self._ignore_duplicates
+                                  else ",resolution=merge-duplicates")
+            if self._on_conflict:
+                params.append(("on_conflict", self._on_conflict))
+        return method, self.path, params, headers, self._payload
+
+    async def execute_async(self) -> Response:
+        return Response(await self.client.send(self))
+
+    def execute(self) -> Response:
+        return Response(self.client.run(self.client.send(self)))
+
+
+class AsyncPostgrest:
+    """
+    Cliente de Supabase (la API REST de PostgREST) sobre httpx.AsyncClient.
+    Se usa igual que el de supabase-py desde código síncrono (cada execute() espera su resultado);
+    las consultas de todos los hilos comparten el loop, el pool de conexiones y las lecturas en vuelo.
+    """
+    def __init__(self, url: str, key: str, timeout: float = 10.0, retries: int = 3,
+                 base_delay: float = 0.2, max_delay: float = 5.0, max_connections: int = 20,
+                 concurrency: int = 16, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.timeout = timeout
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.concurrency = concurrency
+        # Plazo total de una consulta: todos sus intentos y las esperas entre ellos
+        self.deadline = timeout * (retries + 1) + max_delay * retries
+        self.requests = 0 # Peticiones HTTP enviadas (sin contar las lecturas unificadas)
+        self.coalesced = 0 # Lecturas resueltas con la respuesta de otra idéntica en vuelo
+        self.retried = 0
+        self._inflight: Dict[tuple, asyncio.Future] = {} # Sólo se toca desde el loop
+        self._http = httpx.AsyncClient(
+            base_url=url.rstrip("/") + "/rest/v1/",
+            headers={"apikey": key, "Authorization": f"Bearer {key}", "Accept": "application/json"},
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="supabase-async", daemon=True)
+        self._thread.start()
+
+    def table(self, name: str) -> AsyncQuery:
+        return AsyncQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> AsyncQuery:
+        """Llama a una función de Postgres (POST /rpc/<name>)."""
+        return AsyncQuery(self, f"rpc/{name}", op="rpc", payload=params or {})
+
+    def run(self, coro):
+        """Ejecuta una corrutina en el loop del cliente y espera su resultado (desde cualquier hilo)."""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("Desde el loop del cliente hay que usar execute_async()")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def execute_many(self, queries: List[AsyncQuery]) -> List[Any]:
+        """
+        Ejecuta muchas consultas a la vez (como mucho 'concurrency' en vuelo) y devuelve,
+        en el mismo orden, un Response o la excepción de cada una.
+        """
+        return self.run(self._gather(queries))
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        try:
+            self.run(self._http.aclose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # --- En el loop ---
+
+    async def _gather(self, queries: List[AsyncQuery]) -> List[Any]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(query):
+            async with semaphore:
+                return await query.execute_async()
+        return await asyncio.gather(*(one(query) for query in queries), return_exceptions=True)
+
+    async def send(self, query: AsyncQuery) -> Any:
+        method, path, params, headers, body = query.request()
+        if method != "GET":
+            return await self._with_deadline(self._send_with_retry(method, path, params, headers, body,
+                                                                   query.idempotent))
+        # Mismo GET ya en vuelo (p.ej. varias sesiones cargando lo mismo): se espera esa respuesta
+        key = (path, tuple(params))
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            data = await asyncio.shield(future)
+            return [dict(row) for row in data] if isinstance(data, list) else data
+        future = asyncio.ensure_future(self._with_deadline(
+            self._send_with_retry(method, path, params, headers, body, True)))
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _with_deadline(self, coro):
+        try:
+            return await asyncio.wait_for(coro, self.deadline)
+        except asyncio.TimeoutError:
+            raise DataTimeout(f"La consulta no terminó en {self.deadline:.1f} s") from None
+
+    async def _send_with_retry(self, method: str, path: str, params, headers, body, idempotent: bool):
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                self.requests += 1
+                response = await self._http.request(method, path, params=params, headers=headers,
+                                                    json=body if method != "GET" else None)
+            except _NOT_SENT as e:
+                if last:
+                    raise DataAccessError(f"Sin conexión con Supabase: {e}") from e
+            except httpx.TransportError as e:
+                # Timeout de lectura, conexión cortada...: la escritura pudo haberse aplicado
+                if last or not idempotent:
+                    raise DataAccessError(f"Error de red con Supabase: {e!r}") from e
+            else:
+                if response.status_code < 400:
+                    return response.json() if response.content else []
+                if last or response.status_code not in RETRY_STATUS:
+                    raise DataAccessError(self._error_message(response), response.status_code)
+            self.retried += 1
+            # Backoff exponencial con jitter completo: las sesiones no reintentan todas juntas
+            await asyncio.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        try:
+            body = response.json()
+            message = body.get("message") or body
+        except ValueError:
+            message = response.text
+        return f"{response.status_code}: {message}"
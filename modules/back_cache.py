@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+class BackCache:
+    """
+    Cache LRU de los 'back' (el markdown de Gemini), acotado por tamaño.
+    Las tarjetas en memoria no guardan el 'back': se pide a la BD cuando hace falta,
+    de a lotes ('fetch' recibe una lista de ids y devuelve {id: back}).
+    """
+    def __init__(self, fetch: Callable[[List[int]], Dict[int, str]], max_bytes: int = 4 * 1024 * 1024):
+        self.fetch = fetch
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[int, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[int, Future] = {} # id -> prefetch en curso que lo trae
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, card_id: int, back: Optional[str]):
+        if back is None:
+            return
+        with self._lock:
+            old = self._items.pop(card_id, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[card_id] = back
+            self._bytes += len(back)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def invalidate(self, card_id: int):
+        with self._lock:
+            old = self._items.pop(card_id, None)
+            if old is not None:
+                self._bytes -= len(old)
+
+    def get(self, card_id: int, prefetch: Iterable[int] = ()) -> Optional[str]:
+        """
+        El 'back' de una tarjeta. Si no está en cache se trae junto con los de 'prefetch'
+        (p.ej. las próximas tarjetas a revisar) en una sola consulta.
+        """
+        with self._lock:
+            back = self._items.get(card_id)
+            if back is not None:
+                self._items.move_to_end(card_id)
+                self.hits += 1
+                return back
+        return self.get_many([card_id, *prefetch]).get(card_id)
+
+    def get_many(self, card_ids: Iterable[int]) -> Dict[int, str]:
+        """Varios 'back' a la vez: una consulta para todos los que falten."""
+        found: Dict[int, str] = {}
+        missing: List[int] = []
+        waiting: Dict[int, Future] = {}
+        with self._lock:
+            for card_id in dict.fromkeys(card_ids):
+                back = self._items.get(card_id)
+                if back is not None:
+                    self._items.move_to_end(card_id)
+                    found[card_id] = back
+                elif card_id in self._inflight:
+                    waiting[card_id] = self._inflight[card_id]
+                else:
+                    missing.append(card_id)
+            self.hits += len(found)
+            self.misses += len(missing) + len(waiting)
+        if missing:
+            found.update(self._fetch(missing))
+        # Los que ya venía trayendo un prefetch no se piden de nuevo: se espera esa consulta
+        for card_id, future in waiting.items():
+            back = future.result().get(card_id)
+            if back is not None:
+                found[card_id] = back
+        return found
+
+    def prefetch(self, card_ids: Iterable[int]):
+        """Trae en segundo plano (en una sola consulta) los 'back' que falten, p.ej. de las próximas tarjetas."""
+        with self._lock:
+            missing = [card_id for card_id in dict.fromkeys(card_ids)
+                       if card_id not in self._items and card_id not in self._inflight]
+            if not missing:
+                return
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="back-prefetch")
+            future = self._pool.submit(self._fetch, missing)
+            for card_id in missing:
+                self._inflight[card_id] = future
+
+    def _fetch(self, card_ids: List[int]) -> Dict[int, str]:
+        try:
+            fetched = self.fetch(card_ids)
+        except Exception as e:
+            print(f"Error al traer {len(card_ids)} respuestas de la BD: {e}")
+            fetched = {}
+        for card_id, back in fetched.items():
+            self.put(card_id, back)
+        with self._lock:
+            for card_id in card_ids:
+                self._inflight.pop(card_id, None)
+        return fetched
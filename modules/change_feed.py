@@ -0,0 +1,185 @@
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from modules.local_db import LocalClient
+
+# --- Feeds de cambios por fila ---
+# Avisan a los managers de cada alta, cambio o borrado de 'flashcards' hecho desde otra
+# sesión, proceso o dispositivo, para que apliquen sólo esa fila en lugar de recargar el mazo.
+# Cada aviso es un dict:
+#   {'id': 12, 'row': {...}}   la fila completa (Supabase Realtime)
+#   {'id': 12, 'row': None}    sólo el id: el manager la lee de la BD (feed local)
+#   {'gap': True}              pudieron perderse avisos (reconexión): hay que sincronizar por marca de agua
+
+Change = Dict[str, Any]
+
+
+class ChangeFeed(ABC):
+    """
+    Base: reparte los avisos entre los managers suscritos, por usuario.
+    Mientras 'healthy' es False los managers no confían en el feed y sincronizan por marca de agua.
+    """
+    def __init__(self):
+        self.healthy = False
+        self._subscribers: Dict[str, List[Callable[[Change], None]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id: str, callback: Callable[[Change], None]):
+        with self._lock:
+            self._subscribers.setdefault(user_id, []).append(callback)
+
+    def unsubscribe(self, user_id: str, callback: Callable[[Change], None]):
+        with self._lock:
+            callbacks = self._subscribers.get(user_id, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            if not callbacks:
+                self._subscribers.pop(user_id, None)
+
+    def _dispatch(self, user_id: Optional[str], change: Change):
+        """A los suscriptores de 'user_id' (a todos si no se sabe de quién es la fila)."""
+        with self._lock:
+            if user_id is None:
+                callbacks = [cb for cbs in self._subscribers.values() for cb in cbs]
+            else:
+                callbacks = list(self._subscribers.get(user_id, ()))
+        for callback in callbacks:
+            callback(change)
+
+    def _gap(self):
+        self._dispatch(None, {'gap': True})
+
+    @abstractmethod
+    def start(self):
+        """Empieza a recibir avisos (en segundo plano)."""
+
+    @abstractmethod
+    def stop(self):
+        """Deja de recibir avisos."""
+
+
+class LocalChangeFeed(ChangeFeed):
+    """
+    Reemplazo local (sin red, se puede probar offline) de Supabase Realtime: el LocalClient
+    anota cada escritura en la tabla '_changes' y este hilo la lee cada 'interval' segundos.
+    Funciona entre procesos que comparten el archivo SQLite (WAL), no sólo entre sesiones.
+    """
+    def __init__(self, local: "LocalClient", interval: float = 0.5, retention: int = 10000,
+                 table: str = "flashcards"):
+        super().__init__()
+        self.local = local
+        self.interval = interval
+        self.retention = retention # Entradas de '_changes' que se conservan
+        self.table = table
+        self._seq = self._last_seq()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+
+    def start(self):
+        self.healthy = True
+        self._thread.start()
+
+    def stop(self):
+        self.healthy = False
+        self._stop.set()
+
+    def poll(self) -> int:
+        """Reparte los cambios nuevos. Devuelve cuántos había."""
+        with self.local.lock:
+            # Se cruza con la tabla para saber de qué usuario es cada fila (None si se borró)
+            entries = self.local.conn.execute(
+                f'SELECT c."seq", c."row_id", t."user_id" FROM "_changes" c '
+                f'LEFT JOIN "{self.table}" t ON t."id" = c."row_id" '
+                f'WHERE c."seq" > ? AND c."tbl" = ? ORDER BY c."seq"', (self._seq, self.table)).fetchall()
+        if not entries:
+            return 0
+        self._seq = entries[-1]["seq"]
+        latest = {entry["row_id"]: entry["user_id"] for entry in entries} # Un aviso por fila
+        for row_id, user_id in latest.items():
+            self._dispatch(user_id, {'id': row_id, 'row': None})
+        return len(entries)
+
+    def _last_seq(self) -> int:
+        with self.local.lock:
+            return self.local.conn.execute('SELECT COALESCE(MAX("seq"), 0) FROM "_changes"').fetchone()[0]
+
+    def _prune(self):
+        with self.local.lock:
+            self.local.conn.execute('DELETE FROM "_changes" WHERE "seq" <= ?', (self._seq - self.retention,))
+            self.local.conn.commit()
+
+    def _run(self):
+        polls = 0
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+                self.healthy = True
+                polls += 1
+                if polls % 1000 == 0:
+                    self._prune()
+            except Exception as e:
+                # Los cambios siguen en '_changes': no se pierden, se leen en la próxima vuelta
+                print(f"Error leyendo los cambios locales: {e}")
+                self.healthy = False
+
+
+class RealtimeChangeFeed(ChangeFeed):
+    """
+    Supabase Realtime (postgres_changes) sobre la tabla. Corre en su propio event loop.
+    Cada vez que la suscripción queda activa (también al reconectar) avisa un 'gap':
+    los managers se ponen al día una vez por marca de agua y desde ahí sólo aplican avisos.
+    Sin suscripción activa 'healthy' es False y vuelven a sincronizar por marca de agua.
+    Requiere: alter publication supabase_realtime add table flashcards;
+    """
+    def __init__(self, url: str, key: str, table: str = "flashcards", schema: str = "public"):
+        super().__init__()
+        self.url = url.replace("https://", "wss://").replace("http://", "ws://").rstrip("/") + "/realtime/v1"
+        self.key = key
+        self.table = table
+        self.schema = schema
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="supabase-realtime", daemon=True)
+        self._client = None
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._connect(), self._loop)
+
+    def stop(self):
+        self.healthy = False
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _connect(self):
+        from realtime import AsyncRealtimeClient # Viene con supabase-py; se importa sólo si se usa
+        try:
+            self._client = AsyncRealtimeClient(self.url, self.key, auto_reconnect=True)
+            await self._client.connect()
+            channel = self._client.channel(f"{self.table}-changes")
+            channel.on_postgres_changes("*", schema=self.schema, table=self.table, callback=self._on_payload)
+            await channel.subscribe(self._on_state)
+        except Exception as e:
+            print(f"Error conectando a Supabase Realtime: {e}")
+            self.healthy = False
+
+    def _on_state(self, state, error: Optional[Exception] = None):
+        self.healthy = str(state).endswith("SUBSCRIBED") and error is None
+        if error is not None:
+            print(f"Supabase Realtime: {state} ({error})")
+        if self.healthy:
+            self._gap() # Lo que cambió mientras no había suscripción se trae una vez por marca de agua
+
+    def _on_payload(self, payload: Dict[str, Any]):
+        data = payload.get("data", {})
+        if data.get("type") == "DELETE":
+            old = data.get("old_record") or {}
+            if "id" in old:
+                self._dispatch(old.get("user_id"), {'id': old["id"], 'row': {'id': old["id"], 'deleted': True}})
+            return
+        record = data.get("record") or {}
+        if "id" in record:
+            self._dispatch(record.get("user_id"), {'id': record["id"], 'row': record})
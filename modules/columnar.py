@@ -0,0 +1,118 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# --- Representación columnar (struct-of-arrays) de los campos de scheduling ---
+# Pensada para operaciones masivas (reprogramar el mazo entero, importar historial,
+# reproducir logs de revisiones) que serían demasiado lentas objeto por objeto.
+
+SECONDS_PER_DAY = 86400
+
+# Botón (0=Again, 1=Hard, 2=Good, 3=Easy) -> calidad q de SM-2, igual que en review_card
+QUALITY = np.array([1, 3, 4, 5], dtype=np.int8)
+
+# Tope del intervalo en días, igual que MAX_INTERVAL_DAYS en review_card
+MAX_INTERVAL_DAYS = 36500.0
+
+
+class CardColumns:
+    """Columnas paralelas: la tarjeta i es (ids[i], easiness_factor[i], interval[i], repetitions[i], due[i])."""
+    def __init__(self, ids: np.ndarray, easiness_factor: np.ndarray, interval: np.ndarray,
+                 repetitions: np.ndarray, due: np.ndarray):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.easiness_factor = np.asarray(easiness_factor, dtype=np.float64)
+        self.interval = np.asarray(interval, dtype=np.float64)
+        self.repetitions = np.asarray(repetitions, dtype=np.int32)
+        self.due = np.asarray(due, dtype=np.int64) # epoch en segundos
+        self._pos: Optional[Dict[int, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def empty(cls, size: int = 0) -> "CardColumns":
+        return cls(np.zeros(size, np.int64), np.full(size, 2.5), np.zeros(size),
+                   np.zeros(size, np.int32), np.zeros(size, np.int64))
+
+    @classmethod
+    def from_cards(cls, cards: Iterable) -> "CardColumns":
+        """Construye las columnas desde objetos Flashcard (las fechas se parsean una sola vez)."""
+        cards = [card for card in cards if card.id is not None]
+        return cls(
+            ids=[card.id for card in cards],
+            easiness_factor=[card.easiness_factor for card in cards],
+            interval=[card.interval for card in cards],
+            repetitions=[card.repetitions for card in cards],
+            due=[card.due for card in cards],
+        )
+
+    def positions(self, ids) -> np.ndarray:
+        """Posiciones de los ids dados (-1 si no existen)."""
+        if self._pos is None:
+            self._pos = {int(card_id): i for i, card_id in enumerate(self.ids)}
+        return np.array([self._pos.get(int(card_id), -1) for card_id in ids], dtype=np.int64)
+
+    def due_mask(self, now: Optional[float] = None) -> np.ndarray:
+        now = datetime.now().timestamp() if now is None else now
+        return self.due <= now
+
+    def to_rows(self, positions: Optional[np.ndarray] = None) -> List[Dict]:
+        """Campos de scheduling (formato de la tabla) de las posiciones dadas, para enviar a la BD."""
+        positions = np.arange(len(self)) if positions is None else positions
+        return [{
+            'id': int(self.ids[i]),
+            'next_review_date': datetime.fromtimestamp(int(self.due[i])).isoformat(),
+            'interval': float(self.interval[i]),
+            'easiness_factor': float(self.easiness_factor[i]),
+            'repetitions': int(self.repetitions[i]),
+        } for i in positions]
+
+
+def sm2_batch(easiness_factor: np.ndarray, interval: np.ndarray, repetitions: np.ndarray,
+              grades: np.ndarray):
+    """
+    SM-2 vectorizado, idéntico a FlashcardsManager.review_card pero para n tarjetas a la vez.
+    Devuelve (easiness_factor, interval, repetitions, days) nuevos; los grados fuera de 0..3
+    dejan la tarjeta como estaba (days = -1).
+    """
+    grades = np.asarray(grades, dtype=np.int64)
+    valid = (grades >= 0) & (grades <= 3)
+    q = QUALITY[np.clip(grades, 0, 3)].astype(np.float64)
+
+    d = 5.0 - q
+    new_ef = np.maximum(1.3, easiness_factor + (0.1 - d * (0.08 + d * 0.02)))
+
+    passed = q >= 3
+    new_reps = np.where(passed, repetitions + 1, 0).astype(np.int32)
+    new_interval = np.where(new_reps == 1, 1.0,
+                   np.where(new_reps == 2, 6.0, interval * new_ef))
+    new_interval = np.where(passed, np.minimum(new_interval, MAX_INTERVAL_DAYS), 1.0)
+
+    # np.rint redondea al par más cercano, igual que round() de Python
+    days = np.rint(new_interval).astype(np.int64)
+
+    new_ef = np.where(valid, new_ef, easiness_factor)
+    new_interval = np.where(valid, new_interval, interval)
+    new_reps = np.where(valid, new_reps, repetitions).astype(np.int32)
+    days = np.where(valid, days, -1)
+    return new_ef, new_interval, new_reps, days
+
+
+def review_batch(columns: CardColumns, positions: np.ndarray, grades: np.ndarray,
+                 now: Optional[float] = None) -> np.ndarray:
+    """
+    Califica de una vez las tarjetas en 'positions' (modifica 'columns' en el sitio).
+    Una posición repetida se aplica una sola vez: para reproducir un historial en orden
+    hay que llamar una vez por "ronda". Devuelve los días hasta la próxima revisión.
+    """
+    now = datetime.now().timestamp() if now is None else now
+    positions = np.asarray(positions, dtype=np.int64)
+    ef, interval, reps, days = sm2_batch(columns.easiness_factor[positions], columns.interval[positions],
+                                         columns.repetitions[positions], grades)
+    columns.easiness_factor[positions] = ef
+    columns.interval[positions] = interval
+    columns.repetitions[positions] = reps
+    reviewed = days >= 0
+    columns.due[positions[reviewed]] = int(now) + days[reviewed] * SECONDS_PER_DAY
+    return days
@@ -0,0 +1,226 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+# --- Detección de tarjetas repetidas ---
+# Dos niveles:
+#  1. Exacto: 'front' normalizado (minúsculas, espacios y puntuación) en un dict -> ids.
+#     "Court", " court! " y "COURT" caen en la misma clave.
+#  2. Casi-duplicados: MinHash sobre n-gramas de caracteres + LSH por bandas, para
+#     variantes como "take off" / "take-off" o errores de tipeo; y un segundo dict por raíces
+#     ("courts", "courting" -> "court"). El stemmer se equivoca a veces (wedding -> wed,
+#     evening -> even), así que lo que coincide sólo por raíz se muestra como parecido, nunca exacto.
+
+_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"[^\w\s']+")
+
+# Sufijos a quitar, de más largo a más corto (stemmer liviano para inglés)
+_SUFFIXES = ("ingly", "ings", "ing", "edly", "ied", "ies", "ed", "es", "ly", "s")
+# Largo mínimo de la raíz: con menos, "news" -> "new" o "apply" -> "app" serían repetidos exactos
+_MIN_STEM = {"ly": 4}
+_MIN_STEM_DEFAULT = 3
+# Letras tras las que el sufijo es parte de la palabra: class, status, news / speed, agreed
+_KEEP_AFTER = {"s": "suw", "ed": "e"}
+_VOWELS = frozenset("aeiouy")
+
+
+def stem(word: str) -> str:
+    """Raíz aproximada de una palabra en inglés (courting -> court, studies -> study)."""
+    if len(word) <= 3:
+        return word
+    for suffix in _SUFFIXES:
+        if not word.endswith(suffix):
+            continue
+        stem = word[:-len(suffix)]
+        if len(stem) < _MIN_STEM.get(suffix, _MIN_STEM_DEFAULT) or stem[-1] in _KEEP_AFTER.get(suffix, "") \
+                or not _VOWELS.intersection(stem): # string, spring: sin vocal no es una raíz
+            continue # Quizás un sufijo más corto (kings -> king)
+        if suffix in ("ied", "ies"):
+            return stem + "y" # studies -> study
+        if suffix in ("ing", "ed", "ings", "ingly", "edly") and len(stem) > 3 \
+                and stem[-1] == stem[-2] and stem[-1] not in "lsz":
+            return stem[:-1] # running -> run, stopped -> stop
+        return stem
+    return word
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin puntuación y con los espacios colapsados."""
+    text = _WORD_RE.sub(" ", text.casefold().replace("-", " "))
+    return " ".join(text.split())
+
+
+def stem_front(text: str) -> str:
+    """Clave por raíces: texto normalizado con cada palabra reducida a su raíz."""
+    return " ".join(stem(word) for word in normalize_text(text).split())
+
+
+def shingles(text: str, n: int = 3) -> Set[str]:
+    """n-gramas de caracteres del texto normalizado (con bordes, para palabras cortas)."""
+    text = f" {normalize_text(text)} "
+    if len(text) <= n:
+        return {text}
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class DuplicateIndex:
+    """
+    Índice de 'fronts' para detectar repetidos antes de llamar a Gemini.
+    Se mantiene incrementalmente con add/update/remove.
+    """
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.5,
+                 ngram: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("'num_perm' debe ser múltiplo de 'bands'")
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+        # Coeficientes para resumir cada banda en un entero (firma < 2^31, coef < 2^20: sin overflow)
+        self._band_coef = rng.integers(1, 1 << 20, size=num_perm // bands, dtype=np.int64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.ngram = ngram
+
+        self._exact: Dict[str, Set[int]] = defaultdict(set) # texto normalizado -> ids
+        self._stems: Dict[str, Set[int]] = defaultdict(set) # clave por raíces -> ids
+        self._fronts: Dict[int, str] = {} # id -> front original
+        self._buckets: Dict[int, Set[int]] = defaultdict(set) # clave de banda -> ids
+        self._card_buckets: Dict[int, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._fronts)
+
+    # --- MinHash ---
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        return np.array([zlib.crc32(s.encode("utf-8")) for s in shingles(text, self.ngram)], dtype=np.int64)
+
+    def _signature(self, text: str) -> np.ndarray:
+        h = self._shingle_hashes(text)
+        return ((self._a[:, None] * h[None, :] + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def _signatures(self, texts: List[str], chunk: int = 4096) -> np.ndarray:
+        """Firmas (n, num_perm) de muchos textos a la vez (reduceat por bloques, para la carga inicial)."""
+        result = [np.empty((0, len(self._a)), dtype=np.int64)]
+        for start in range(0, len(texts), chunk):
+            hashes = [self._shingle_hashes(t) for t in texts[start:start + chunk]]
+            lengths = np.array([len(h) for h in hashes])
+            offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            flat = np.concatenate(hashes)
+            values = (self._a[:, None] * flat[None, :] + self._b[:, None]) % _PRIME
+            mins = np.minimum.reduceat(values, offsets, axis=1)
+            result.append(mins.T)
+        return np.concatenate(result)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """
+        (n, num_perm) -> (n, bands): una clave entera por banda, vectorizado.
+        La banda va en los bits bajos para que bandas distintas no compartan bucket.
+        """
+        n = signatures.shape[0]
+        band_hash = (signatures.reshape(n, self.bands, self.rows) * self._band_coef).sum(axis=2)
+        return band_hash * self.bands + np.arange(self.bands)
+
+    # --- Mantenimiento ---
+
+    def _insert(self, card_id: int, front: str, keys: List[int]):
+        self._fronts[card_id] = front
+        self._exact[normalize_text(front)].add(card_id)
+        self._stems[stem_front(front)].add(card_id)
+        self._card_buckets[card_id] = keys
+        for key in keys:
+            self._buckets[key].add(card_id)
+
+    def add(self, card_id: int, front: str):
+        if card_id in self._fronts:
+            self.remove(card_id)
+        self._insert(card_id, front, self._band_keys(self._signature(front)[None, :])[0].tolist())
+
+    def add_many(self, items: Iterable[Tuple[int, str]]):
+        items = [(card_id, front) for card_id, front in items if card_id not in self._fronts]
+        if not items:
+            return
+        keys = self._band_keys(self._signatures([f for _, f in items])).tolist()
+        for (card_id, front), card_keys in zip(items, keys):
+            self._insert(card_id, front, card_keys)
+
+    def update(self, card_id: int, front: str):
+        if self._fronts.get(card_id) != front:
+            self.add(card_id, front)
+
+    def remove(self, card_id: int):
+        front = self._fronts.pop(card_id, None)
+        if front is None:
+            return
+        for keys, key in ((self._exact, normalize_text(front)), (self._stems, stem_front(front))):
+            keys[key].discard(card_id)
+            if not keys[key]:
+                del keys[key]
+        for bucket in self._card_buckets.pop(card_id, []):
+            self._buckets[bucket].discard(card_id)
+            if not self._buckets[bucket]:
+                del self._buckets[bucket]
+
+    # --- Consultas ---
+
+    def find(self, front: str, exclude: Optional[int] = None) -> Dict[str, list]:
+        """
+        Busca tarjetas repetidas de 'front'.
+        Devuelve {'exact': [ids], 'near': [(id, similitud)]} (near ordenado por similitud).
+        Las que coinciden por raíz van a 'near' aunque la similitud quede bajo el umbral.
+        """
+        exact = sorted(i for i in self._exact.get(normalize_text(front), ()) if i != exclude)
+        same_stem = set(self._stems.get(stem_front(front), ()))
+        candidates = set(same_stem)
+        for key in self._band_keys(self._signature(front)[None, :])[0].tolist():
+            candidates |= self._buckets.get(key, set())
+        candidates -= set(exact)
+        candidates.discard(exclude)
+
+        query = shingles(front, self.ngram)
+        near = []
+        for card_id in candidates:
+            score = jaccard(query, shingles(self._fronts[card_id], self.ngram))
+            if score >= self.threshold or card_id in same_stem:
+                near.append((card_id, round(score, 3)))
+        near.sort(key=lambda item: -item[1])
+        return {'exact': exact, 'near': near}
+
+    def report(self) -> Dict[str, list]:
+        """
+        Reporte de todo el mazo: grupos de repetidos exactos y pares de casi-duplicados.
+        Los pares salen de los buckets de LSH y de las raíces, sin comparar todas las tarjetas entre sí.
+        """
+        exact_groups = [sorted(ids) for ids in self._exact.values() if len(ids) > 1]
+        same_key = {card_id: key for key, ids in self._exact.items() for card_id in ids}
+        same_stem = {card_id: key for key, ids in self._stems.items() for card_id in ids}
+
+        seen_pairs = set()
+        near_pairs = []
+        cache: Dict[int, Set[str]] = {}
+        for ids in list(self._stems.values()) + list(self._buckets.values()):
+            if len(ids) < 2:
+                continue
+            ids = sorted(ids)
+            for i, first in enumerate(ids):
+                for second in ids[i + 1:]:
+                    if (first, second) in seen_pairs or same_key[first] == same_key[second]:
+                        continue
+                    seen_pairs.add((first, second))
+                    a = cache.setdefault(first, shingles(self._fronts[first], self.ngram))
+                    b = cache.setdefault(second, shingles(self._fronts[second], self.ngram))
+                    score = jaccard(a, b)
+                    if score >= self.threshold or same_stem[first] == same_stem[second]:
+                        near_pairs.append((first, second, round(score, 3)))
+        near_pairs.sort(key=lambda item: -item[2])
+        return {'exact': exact_groups, 'near': near_pairs}
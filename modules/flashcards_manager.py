@@ -1,84 +1,946 @@
+import atexit
+import bisect
+import heapq
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from operator import attrgetter
 from datetime import datetime, timedelta
-from typing import List, Dict, Union, Any
+from typing import TYPE_CHECKING, List, Dict, Union, Any, Iterator, Optional, Tuple
 import streamlit as st  # <-- Necesario para leer los secrets
-from supabase import create_client, Client # <-- pip install supabase
+from modules.review_queue import ReviewWriteBehind
+from modules.local_db import LocalClient, Replicator
+from modules.instrumentation import InstrumentedClient
+from modules.back_cache import BackCache
+from modules.review_stats import ReviewStats
+from modules.change_feed import ChangeFeed, LocalChangeFeed
+
+if TYPE_CHECKING:
+    from supabase import Client # <-- pip install supabase (se importa recién al conectar)
+    from modules.async_db import AsyncPostgrest
+    # Usan NumPy: se importan recién cuando hacen falta, no al arrancar la app
+    from modules.columnar import CardColumns
+    from modules.dedupe import DuplicateIndex
+    from modules.search_index import SearchIndex
+    from modules.snapshot import DeckSnapshot
+
+# --- Esquema esperado en Supabase para la sincronización incremental ---
+# La tabla 'flashcards' necesita una marca de agua y tombstones:
+#
+#   alter table flashcards add column updated_at timestamptz not null default now();
+#   alter table flashcards add column deleted boolean not null default false;
+#   create index on flashcards (updated_at);
+#   create or replace function touch_updated_at() returns trigger as $$
+#   begin new.updated_at = clock_timestamp(); return new; end $$ language plpgsql;
+#   create trigger flashcards_touch before insert or update on flashcards
+#   for each row execute function touch_updated_at();
+#
+# 'updated_at' lo pone el servidor (no dependemos del reloj del cliente) y borrar
+# una tarjeta es marcar deleted = true, para que las demás sesiones se enteren.
+#
+# Mazos por usuario y control de concurrencia optimista:
+#
+#   alter table flashcards add column user_id text not null default 'default';
+#   alter table flashcards add column version integer not null default 1;
+#   create index on flashcards (user_id, updated_at);
+#
+# Con la base local (storage.engine = "local") cada dispositivo numera sus tarjetas por su cuenta: el
+# Replicator las identifica por un uid global, no por el id local (ver REPLICATION_KEYS):
+#
+#   alter table flashcards add column uid text not null unique default gen_random_uuid()::text;
+#
+# Cada escritura de una revisión o edición es 'update ... where id = ? and version = ?'
+# y sube la versión: si otra sesión escribió antes, no se pisa nada y se detecta el conflicto.
+#
+# Historial de revisiones (append-only) y métricas diarias (ver ReviewStats):
+#
+#   create table review_log (id bigint generated by default as identity primary key,
+#     user_id text not null default 'default', card_id bigint not null, grade smallint not null,
+#     reviewed_at timestamp not null, interval real not null default 0,
+#     uid text not null unique default gen_random_uuid()::text);
+#   create index on review_log (user_id, reviewed_at);
+#
+# 'uid' lo genera el cliente al calificar: las filas se envían con resolution=ignore-duplicates
+# sobre él, así reenviar un lote que quizá ya llegó no duplica el historial.
+#   create table daily_stats (id bigint generated by default as identity primary key,
+#     user_id text not null default 'default', day date not null,
+#     again integer not null default 0, hard integer not null default 0,
+#     good integer not null default 0, easy integer not null default 0,
+#     added integer not null default 0, unique (user_id, day));
+#
+# Las revisiones pendientes se escriben todas en una sola llamada (update condicional por lote):
+#
+#   create or replace function apply_reviews(rows jsonb) returns table (id bigint, version integer)
+#   language sql as $$
+#     update flashcards f set next_review_date = r.next_review_date, interval = r.interval,
+#       easiness_factor = r.easiness_factor, repetitions = r.repetitions, version = f.version + 1
+#     from jsonb_to_recordset(rows) as r(id bigint, next_review_date timestamp, interval real,
+#       easiness_factor real, repetitions integer, version integer)
+#     where f.id = r.id and f.version = r.version
+#     returning f.id, f.version;
+#   $$;
+#
+# Las métricas diarias se suman (cada sesión envía sus incrementos, no los totales del día):
+#
+#   create or replace function add_daily_stats(rows jsonb) returns void language sql as $$
+#     insert into daily_stats (user_id, day, again, hard, good, easy, added)
+#     select r.user_id, r.day, r.again, r.hard, r.good, r.easy, r.added
+#     from jsonb_to_recordset(rows) as r(user_id text, day date, again integer, hard integer,
+#       good integer, easy integer, added integer)
+#     on conflict (user_id, day) do update set again = daily_stats.again + excluded.again,
+#       hard = daily_stats.hard + excluded.hard, good = daily_stats.good + excluded.good,
+#       easy = daily_stats.easy + excluded.easy, added = daily_stats.added + excluded.added;
+#   $$;
+#
+# Los managers se enteran de los cambios de otras sesiones por Supabase Realtime (ver ChangeFeed):
+#
+#   alter publication supabase_realtime add table flashcards;
+
+# Columnas que viven en memoria. El 'back' no: se pide a la BD cuando hace falta (BackCache)
+CARD_FIELDS = ('id', 'front', 'next_review_date', 'interval', 'easiness_factor', 'repetitions', 'version')
+# Lo que se descarga al cargar / sincronizar (sin el 'back', que es ~10x más pesado que el resto)
+LOAD_COLUMNS = ",".join(CARD_FIELDS + ('updated_at', 'deleted'))
+# Lo que cambia una revisión (y envía el write-behind)
+SCHEDULE_FIELDS = ('next_review_date', 'interval', 'easiness_factor', 'repetitions')
+# Tope del intervalo SM-2: sin él, una tarjeta repasada con "Good" una y otra vez crece
+# exponencialmente hasta que la fecha de la próxima revisión no entra en un datetime.
+MAX_INTERVAL_DAYS = 36500.0
+DEFAULT_USER = "default"
 
 # --- 1. Flashcard Class (MODIFICADA) ---
 
 class Flashcard:
-    """Representa una flashcard. Ahora incluye un 'id' de la base de datos."""
-    def __init__(self, front: str, back: str, 
+    """
+    Representa una flashcard. Ahora incluye un 'id' de la base de datos.
+    Con __slots__ y sin el 'back' (lo guarda el BackCache del manager): en mazos grandes
+    cada tarjeta ocupa una fracción de lo que ocupaba. La fecha de revisión se guarda
+    como timestamp entero ('due'); 'next_review_date' la expone como ISO, igual que la BD.
+    """
+    __slots__ = ('id', 'front', 'due', 'interval', 'easiness_factor', 'repetitions', 'version')
+
+    def __init__(self, front: str,
                  next_review_date: str = None, 
                  interval: float = 0.0, 
                  easiness_factor: float = 2.5, 
                  repetitions: int = 0,
-                 id: int = None): # <-- AÑADIDO: id de la base de datos
+                 id: int = None, # <-- AÑADIDO: id de la base de datos
+                 version: int = 1):
         
         self.id = id # <-- AÑADIDO
+        self.version = version # Versión de la fila en la BD (concurrencia optimista)
         self.front = front
-        self.back = back
         self.next_review_date = next_review_date or datetime.now().isoformat()
         self.interval = interval
         self.easiness_factor = easiness_factor
         self.repetitions = repetitions
+
+    @property
+    def next_review_date(self) -> str:
+        return datetime.fromtimestamp(self.due).isoformat()
+
+    @next_review_date.setter
+    def next_review_date(self, value: str):
+        timestamp = _due_timestamp(value)
+        self.due = int(timestamp) if timestamp != float('-inf') else 0 # Inválida: vencida desde siempre
         
     def to_dict(self) -> Dict[str, Union[str, float, int]]:
-        """Convierte a dict. Usado para ENVIAR a Supabase."""
+        """Convierte a dict. Usado para ENVIAR a Supabase (sin el 'back')."""
         # Excluimos el 'id' al crear/actualizar, 
         # Supabase lo maneja (o se usa en el 'where' de la consulta)
         return {
             'front': self.front,
-            'back': self.back,
             'next_review_date': self.next_review_date,
             'interval': self.interval,
             'easiness_factor': self.easiness_factor,
             'repetitions': self.repetitions,
         }
 
+    @classmethod
+    def from_snapshot(cls, id: int, front: str, due: int, interval: float, easiness_factor: float,
+                      repetitions: int, version: int):
+        """Crea un Flashcard con la fecha ya como timestamp (sin parsear ISO: arranque desde snapshot)."""
+        card = cls.__new__(cls)
+        card.id, card.front, card.due, card.version = id, front, due, version
+        card.interval, card.easiness_factor, card.repetitions = interval, easiness_factor, repetitions
+        return card
+
     @classmethod
     def from_dict(cls, data: Dict[str, Any]):
         """Crea un Flashcard desde un dict (cargado de SupABASE)."""
-        # data['id'] existirá al venir de Supabase
-        return cls(**data)
+        # data['id'] existirá al venir de Supabase.
+        # Columnas extra de la tabla (back, updated_at, deleted, ...) se ignoran.
+        return cls(**{k: v for k, v in data.items() if k in CARD_FIELDS})
 
     def __repr__(self):
         return (f"Flashcard(id={self.id}, front='{self.front[:20]}...', "
                 f"due={self.next_review_date[:10]}, EF={self.easiness_factor:.2f})")
 
+def _schedule(card: Flashcard) -> Tuple[int, float, float, int]:
+    """Los campos de scheduling de una tarjeta (lo que cambia una revisión)."""
+    return card.due, card.interval, card.easiness_factor, card.repetitions
+
+
+def _same_schedule(a: Tuple[int, float, float, int], b: Tuple[int, float, float, int]) -> bool:
+    """Compara dos scheduling con tolerancia en los floats ('real' en Postgres es de 4 bytes)."""
+    return (a[0] == b[0] and a[3] == b[3]
+            and math.isclose(a[1], b[1], rel_tol=1e-6) and math.isclose(a[2], b[2], rel_tol=1e-6))
+
+
+def _due_timestamp(next_review_date: str) -> float:
+    """
+    Convierte la fecha ISO de la BD a un timestamp 'naive' comparable con datetime.now().
+    Las fechas inválidas se consideran vencidas desde siempre (-inf), igual que antes.
+    """
+    try:
+        due_date = datetime.fromisoformat(next_review_date)
+    except (TypeError, ValueError):
+        return float('-inf')
+    if due_date.tzinfo:
+        due_date = due_date.replace(tzinfo=None) # Hacerla naive para comparar
+    return due_date.timestamp()
+
+# --- Clientes de datos compartidos ---
+# Un solo cliente (Supabase o SQLite local) para todo el proceso: los managers de
+# todos los usuarios lo comparten en vez de abrir una conexión por sesión.
+
+_client_lock = threading.Lock()
+_shared_client = None
+_replicator: Optional[Replicator] = None
+_change_feed: Optional[ChangeFeed] = None
+_UNSAFE_CHARS = re.compile(r"[^\w.-]")
+
+
+def get_client():
+    """
+    Devuelve el cliente de datos según st.secrets["storage"]["engine"]:
+    - "supabase" (por defecto): todo va directo a Supabase.
+    - "local": SQLite local como almacenamiento principal. Si hay secrets de Supabase,
+      se usa como réplica asíncrona; si no, la app funciona completamente offline.
+    Junto con el cliente arranca el feed de cambios (ver get_change_feed).
+    """
+    global _shared_client, _change_feed
+    with _client_lock:
+        if _shared_client is None:
+            storage = st.secrets.get("storage", {})
+            if storage.get("engine", "supabase") == "local":
+                client = _get_local_client(storage)
+                if storage.get("change_feed", True):
+                    _change_feed = LocalChangeFeed(client, interval=float(storage.get("feed_interval", 0.5)))
+            else:
+                client = _get_remote_client()
+                if storage.get("change_feed", True):
+                    from modules.change_feed import RealtimeChangeFeed
+                    _change_feed = RealtimeChangeFeed(st.secrets["supabase"]["url"], st.secrets["supabase"]["key"])
+            if _change_feed is not None:
+                _change_feed.start()
+                atexit.register(_change_feed.stop)
+            # Cada execute() queda registrado en las métricas (página Latency)
+            _shared_client = InstrumentedClient(client)
+        return _shared_client
+
+
+def _get_local_client(storage) -> LocalClient:
+    """Abre la base SQLite local y, si se puede, arranca la réplica hacia Supabase."""
+    global _replicator
+    has_remote = "supabase" in st.secrets
+    local = LocalClient(storage.get("path", ".flashcards/flashcards.db"), track_changes=has_remote,
+                        change_log=storage.get("change_feed", True))
+    if has_remote:
+        _replicator = Replicator(local, _get_remote_client(),
+                                 interval=float(storage.get("replication_interval", 5.0)))
+        _replicator.bootstrap()
+        _replicator.bootstrap("daily_stats")
+        _replicator.start()
+        atexit.register(_replicator.stop)
+    return local
+
+
+def _snapshot_path(user_id: str) -> Optional[str]:
+    """Snapshot binario del mazo de cada usuario ([storage] snapshot = false lo desactiva)."""
+    storage = st.secrets.get("storage", {})
+    if not storage.get("snapshot", True):
+        return None
+    return os.path.join(storage.get("snapshot_dir", ".flashcards/snapshots"),
+                        f"{_UNSAFE_CHARS.sub('_', user_id)}.fcs")
+
+
+def get_change_feed() -> Optional[ChangeFeed]:
+    """
+    Feed de cambios por fila del cliente compartido ([storage] change_feed = false lo apaga):
+    Supabase Realtime, o con engine = "local" el LocalChangeFeed sobre la tabla '_changes'.
+    """
+    get_client()
+    return _change_feed
+
+
+def _get_remote_client() -> Union["AsyncPostgrest", "Client"]:
+    """
+    Inicializa y devuelve el cliente de Supabase usando st.secrets.
+    Por defecto es la capa asíncrona (AsyncPostgrest): una sesión HTTP compartida por todas
+    las sesiones, lecturas idénticas unificadas, timeouts y reintentos con jitter.
+    Con [storage] http = "supabase-py" se usa el cliente oficial.
+    """
+    try:
+        url = st.secrets["supabase"]["url"]
+        key = st.secrets["supabase"]["key"]
+        storage = st.secrets.get("storage", {})
+        if storage.get("http", "async") == "supabase-py":
+            from supabase import create_client # Import pesado: sólo si de verdad se usa
+            return create_client(url, key)
+        from modules.async_db import AsyncPostgrest
+        client = AsyncPostgrest(url, key, timeout=float(storage.get("timeout", 10.0)),
+                                retries=int(storage.get("retries", 3)),
+                                max_connections=int(storage.get("max_connections", 20)))
+        atexit.register(client.close)
+        return client
+    except Exception as e:
+        print(f"Error conectando a Supabase: {e}")
+        # Esto detendrá la app si los secrets no están, lo cual es bueno.
+        st.error("Error al conectar con Supabase. Revisa tus .streamlit/secrets.toml")
+        st.stop()
+
+
+def _journal_path(user_id: str) -> str:
+    """Journal de revisiones de cada usuario (el usuario por defecto conserva el archivo de siempre)."""
+    if user_id == DEFAULT_USER:
+        return ".flashcards/review_journal.jsonl"
+    return f".flashcards/journals/{_UNSAFE_CHARS.sub('_', user_id)}.jsonl"
+
+
 # --- 2. Flashcard Manager Class (MODIFICADA) ---
 
 class FlashcardsManager:
     """
-    Gestiona las Flashcards usando Supabase como backend.
+    Gestiona las Flashcards de un usuario usando Supabase como backend.
+    Todas las consultas van filtradas por 'user_id': cada usuario sólo ve su mazo.
+    Con un feed de cambios, lo que cambia en otras sesiones llega fila por fila y se aplica
+    como delta en sync(); 'revision' sube con cada cambio real del mazo en memoria.
+    Con 'snapshot_path' arranca desde el snapshot local (ver modules/snapshot.py) y se reconcilia
+    con la BD en segundo plano; el snapshot se reescribe cada 'snapshot_interval' segundos si hubo cambios.
     """
-    def __init__(self):
+    def __init__(self, user_id: str = DEFAULT_USER, client=None, back_cache_bytes: int = 4 * 1024 * 1024,
+                 feed: Optional[ChangeFeed] = None, snapshot_path: Optional[str] = None,
+                 snapshot_interval: float = 300.0):
         # Ya no necesita 'filename'
-        self.cards: List[Flashcard] = []
-        self.supabase: Client = self._get_supabase_client()
-        self._load_cards()
+        self.user_id = user_id
+        # El manager lo comparten todas las sesiones del usuario (ManagerPool): los cambios del mazo
+        # en memoria (carga, sync, revisiones, altas, borrados, índices perezosos) pasan por este lock
+        self._lock = threading.RLock()
+        # Tarjetas indexadas por su 'id' de la BD: buscar y actualizar son O(1) (borrar, ver _remove_local)
+        self.cards: Dict[int, Flashcard] = {}
+        # Índice de vencimientos: min-heap de (timestamp, seq, id) con borrado perezoso.
+        # Una entrada sólo es válida si 'seq' coincide con _due_seq[id].
+        self._due_heap: List[Tuple[int, int, int]] = []
+        self._due_seq: Dict[int, int] = {}
+        self._seq = 0
+        # Vista ordenada por id, para mostrar y paginar por keyset. Es una lista: agregar al final
+        # (ids nuevos) es O(1) amortizado. Borrar es perezoso como en el heap: el id queda en la
+        # lista (los lectores se saltean los que ya no están en self.cards) hasta compactarla
+        self._id_order: List[int] = []
+        self._dead_ids = 0
+        self._dup_index: Optional["DuplicateIndex"] = None # Se construye la primera vez que se usa
+        self._search_index: Optional["SearchIndex"] = None # Ídem (búsqueda de texto en Manage)
+        # Marca de agua de la sincronización incremental (max 'updated_at' visto)
+        self._watermark: Optional[str] = None
+        self._last_sync = 0.0
+        # Tarjetas cuya revisión chocó con una escritura de otra sesión (se resuelven en sync)
+        self._conflicts: set = set()
+        self._conflicts_lock = threading.Lock()
+        # Scheduling de la BD sobre el que se calcularon las revisiones en cola: al chocar con otra
+        # escritura dice si la otra sesión también revisó la tarjeta o sólo cambió otra columna
+        self._review_base: Dict[int, Tuple[int, float, float, int]] = {}
+        self.supabase: "Client" = client if client is not None else get_client()
+        self.review_writer: Optional[ReviewWriteBehind] = None # Se crea después de la carga
+        # Avisos del feed: los anota su hilo y se aplican en sync() (como los conflictos)
+        self.revision = 0 # Sube con cada cambio del mazo en memoria: las sesiones sólo comparan números
+        self._changes: deque = deque()
+        self._feed_gap = False
+        self._feed = feed if feed is not None else (get_change_feed() if client is None else None)
+        if self._feed is not None:
+            # Antes de cargar: lo que cambie durante la carga queda en cola y se aplica después
+            self._feed.subscribe(user_id, self._on_change)
+        # Los 'back' se traen a pedido y por lotes, con un LRU acotado por tamaño
+        self.backs = BackCache(self._fetch_backs, int(back_cache_bytes))
+        # Métricas (racha, revisiones por día, vencimientos...) actualizadas en cada revisión
+        self.stats = ReviewStats()
+        # Snapshot local: el abierto sirve los 'back' de las tarjetas que no cambiaron desde entonces
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._snapshot: Optional["DeckSnapshot"] = None
+        self._snapshot_lock = threading.Lock() # Cambiar de snapshot abierto
+        self._snapshot_write_lock = threading.Lock() # Una escritura a la vez
+        self._snapshot_revision: Optional[int] = None # 'revision' del mazo que refleja el archivo
+        self._snapshot_at = float('-inf')
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._load_stats() # Antes que las tarjetas: no compite con la reconciliación del snapshot
+        if not (snapshot_path and self._load_snapshot(snapshot_path)):
+            self._load_cards()
+        # Las revisiones (y su historial) se guardan en segundo plano y en lotes
+        self.review_writer = ReviewWriteBehind(self.supabase, self._row_for_upsert,
+                                               journal_path=_journal_path(user_id),
+                                               on_written=self._on_review_written,
+                                               on_conflict=self._on_review_conflict,
+                                               after_flush=self._after_flush)
+        self._replay_journal()
 
-    def _get_supabase_client(self) -> Client:
-        """Inicializa y devuelve el cliente de Supabase usando st.secrets."""
+    def _load_cards(self):
+        """Carga las flashcards desde la base de datos de Supabase."""
+        with self._lock:
+            try:
+                response = (self.supabase.table("flashcards").select(LOAD_COLUMNS).eq("user_id", self.user_id)
+                            .eq("deleted", False).order("next_review_date").execute())
+                data = response.data
+                self.cards = {card_data['id']: Flashcard.from_dict(card_data) for card_data in data}
+                self._watermark = max((row['updated_at'] for row in data if row.get('updated_at')), default=None)
+                print(f"Cargadas {len(self.cards)} tarjetas desde Supabase.")
+            except Exception as e:
+                print(f"Error al cargar tarjetas de Supabase: {e}")
+                self.cards = {} # Empezar sin tarjetas si falla la carga
+            if self.review_writer is not None:
+                # Recarga (sync sin marca de agua): las revisiones en cola son más nuevas que la BD
+                for card_id, fields in self.review_writer.pending().items():
+                    card = self.cards.get(card_id)
+                    if card is not None:
+                        for key, value in fields.items():
+                            setattr(card, key, value)
+            self._last_sync = time.monotonic()
+            self._rebuild_due_index()
+
+    def _load_stats(self):
+        """Lee las métricas diarias del usuario (una fila por día con actividad, no el historial)."""
         try:
-            url = st.secrets["supabase"]["url"]
-            key = st.secrets["supabase"]["key"]
-            return create_client(url, key)
+            rows = (self.supabase.table("daily_stats").select("*").eq("user_id", self.user_id)
+                    .execute().data)
         except Exception as e:
-            print(f"Error conectando a Supabase: {e}")
-            # Esto detendrá la app si los secrets no están, lo cual es bueno.
-            st.error("Error al conectar con Supabase. Revisa tus .streamlit/secrets.toml")
-            st.stop()
+            print(f"Error al cargar las métricas de Supabase: {e}")
+            return
+        self.stats.load_days(rows)
 
-    def _load_cards(self):
-        """Carga las flashcards desde la base de datos de Supabase."""
+    def _after_flush(self):
+        # Lo llama el hilo del write-behind después de cada flush
+        self.stats.save(self.supabase, self.user_id)
+        if (self.snapshot_path and self.revision != self._snapshot_revision
+                and time.monotonic() - self._snapshot_at >= self.snapshot_interval
+                and not (self._snapshot_thread and self._snapshot_thread.is_alive())):
+            # En su propio hilo: el primero de un mazo grande trae todos los 'back' y no debe frenar las revisiones
+            self._snapshot_thread = threading.Thread(target=self.save_snapshot, name="snapshot-writer", daemon=True)
+            self._snapshot_thread.start()
+
+    # --- Snapshot local ---
+
+    def _load_snapshot(self, path: str) -> bool:
+        """
+        Arranque en caliente: las tarjetas salen del snapshot (columnas con mmap y los 'front'),
+        sin consultar la BD. La reconciliación corre en un hilo y deja sus cambios como avisos
+        del feed, que sync() aplica. False si no hay snapshot usable (se hace la carga normal).
+        """
+        if not os.path.exists(path):
+            return False
+        from modules.snapshot import DeckSnapshot, SnapshotError
         try:
-            response = self.supabase.table("flashcards").select("*").order("next_review_date").execute()
-            data = response.data
-            self.cards = [Flashcard.from_dict(card_data) for card_data in data]
-            print(f"Cargadas {len(self.cards)} tarjetas desde Supabase.")
+            snapshot = DeckSnapshot(path)
+            if snapshot.user_id != self.user_id:
+                snapshot.close()
+                return False
+            ids, versions = snapshot.ids.tolist(), snapshot.version.tolist()
+            self.cards = {card_id: Flashcard.from_snapshot(card_id, front, due, interval, ef, reps, version)
+                          for card_id, front, due, interval, ef, reps, version in zip(
+                              ids, snapshot.texts("front"), snapshot.due.tolist(), snapshot.interval.tolist(),
+                              snapshot.easiness_factor.tolist(), snapshot.repetitions.tolist(), versions)}
+        except (OSError, SnapshotError) as e:
+            print(f"Snapshot ignorado ({e}); se carga el mazo desde Supabase.")
+            return False
+        self._snapshot = snapshot
+        self._watermark = snapshot.watermark
+        self._last_sync = time.monotonic()
+        self._rebuild_due_index()
+        self._snapshot_revision, self._snapshot_at = self.revision, time.monotonic()
+        print(f"Cargadas {len(self.cards)} tarjetas desde el snapshot local.")
+        threading.Thread(target=self._reconcile, args=(dict(zip(ids, versions)),),
+                         name="snapshot-reconcile", daemon=True).start()
+        return True
+
+    def _reconcile(self, versions: Dict[int, int], chunk: int = 500):
+        """
+        Compara (id, versión) de todo el mazo con la BD (dos enteros por fila, no el mazo entero),
+        trae las filas que cambiaron y encola todo como avisos del feed. Corre en su propio hilo.
+        """
+        try:
+            remote = {row['id']: row['version'] for row in
+                      self.supabase.table("flashcards").select("id,version").eq("user_id", self.user_id)
+                      .eq("deleted", False).execute().data}
+            changed = [card_id for card_id, version in remote.items() if versions.get(card_id) != version]
+            rows = []
+            for start in range(0, len(changed), chunk):
+                rows += (self.supabase.table("flashcards").select(LOAD_COLUMNS).eq("user_id", self.user_id)
+                         .in_("id", changed[start:start + chunk]).execute().data)
         except Exception as e:
-            print(f"Error al cargar tarjetas de Supabase: {e}")
-            self.cards = [] # Empezar con lista vacía si falla la carga
+            print(f"Error al reconciliar el snapshot con Supabase: {e}")
+            self._feed_gap = True # sync() recurre a la marca de agua
+            return
+        for row in rows:
+            self._changes.append({'id': row['id'], 'row': row})
+        gone = versions.keys() - remote.keys()
+        for card_id in gone:
+            self._changes.append({'id': card_id, 'row': {'id': card_id, 'deleted': True}})
+        print(f"Snapshot reconciliado con Supabase: {len(rows)} tarjetas cambiadas, {len(gone)} borradas.")
+
+    def _snapshot_rows(self, cards: List[Flashcard], chunk: int = 500) -> Iterator[Tuple]:
+        """
+        Filas del snapshot, por id. Los 'back' salen del snapshot anterior si la tarjeta sigue
+        en la misma versión; los demás, de la BD en una consulta por lote.
+        """
+        for start in range(0, len(cards), chunk):
+            batch = cards[start:start + chunk]
+            ids = [card.id for card in batch]
+            with self._snapshot_lock:
+                backs = (self._snapshot.backs(ids, [card.version for card in batch])
+                         if self._snapshot is not None else {})
+            missing = [card_id for card_id in ids if card_id not in backs]
+            if missing:
+                backs.update(self._fetch_backs(missing, use_snapshot=False))
+            for card in batch:
+                yield (card.id, card.front, backs.get(card.id, ""), card.due, card.interval,
+                       card.easiness_factor, card.repetitions, card.version)
+
+    def save_snapshot(self, path: Optional[str] = None) -> int:
+        """
+        Escribe el snapshot del mazo (por defecto en snapshot_path, que pasa a ser el abierto).
+        Devuelve el tamaño en bytes (0 si falló).
+        """
+        path = path or self.snapshot_path
+        if not path:
+            return 0
+        from modules.snapshot import DeckSnapshot, write_snapshot
+        with self._snapshot_write_lock:
+            with self._lock:
+                revision, watermark = self.revision, self._watermark
+                cards = sorted(list(self.cards.values()), key=attrgetter('id'))
+            replace_open = path == self.snapshot_path
+            try:
+                # El abierto se reemplaza recién al final (en Windows no se puede pisar un archivo con mmap)
+                size = write_snapshot(path + ".new" if replace_open else path,
+                                      self._snapshot_rows(cards), self.user_id, watermark)
+                if replace_open:
+                    with self._snapshot_lock:
+                        if self._snapshot is not None:
+                            self._snapshot.close()
+                            self._snapshot = None
+                        os.replace(path + ".new", path)
+                        self._snapshot = DeckSnapshot(path)
+            except Exception as e:
+                print(f"Error al guardar el snapshot del mazo: {e}")
+                return 0
+            if replace_open:
+                self._snapshot_revision, self._snapshot_at = revision, time.monotonic()
+        return size
+
+    def restore_snapshot(self, path: str, skip_existing: bool = True, chunk: int = 500) -> int:
+        """
+        Restaura un backup (snapshot) como tarjetas nuevas de este usuario, con su scheduling,
+        en inserts por lotes. Con skip_existing no se repiten los 'front' que ya están en el mazo.
+        Devuelve cuántas tarjetas se agregaron.
+        """
+        from modules.snapshot import DeckSnapshot
+        with self._lock:
+            existing = {card.front for card in self.cards.values()} if skip_existing else set()
+        restored = 0
+        with DeckSnapshot(path) as snapshot:
+            batch = []
+            for row in snapshot.rows():
+                if row['front'] in existing:
+                    continue
+                batch.append({'front': row['front'], 'back': row['back'],
+                              'next_review_date': datetime.fromtimestamp(row['due']).isoformat(),
+                              'interval': row['interval'], 'easiness_factor': row['easiness_factor'],
+                              'repetitions': row['repetitions'], 'user_id': self.user_id})
+                if len(batch) == chunk:
+                    restored += len(self._insert_rows(batch))
+                    batch = []
+            if batch:
+                restored += len(self._insert_rows(batch))
+        print(f"Restauradas {restored} tarjetas desde {path}.")
+        return restored
+
+    def sync(self, max_age: float = 0.0) -> int:
+        """
+        Aplica los avisos del feed de cambios y, si no hay feed (o no es confiable: caído,
+        recién reconectado), la sincronización incremental: trae sólo las filas con
+        updated_at >= marca de agua y las aplica sobre las tarjetas en memoria.
+        Si la última sincronización tiene menos de 'max_age' segundos no consulta la marca de agua.
+        Devuelve la cantidad de filas aplicadas.
+        """
+        with self._lock:
+            self._resolve_conflicts()
+            applied = self._apply_changes()
+            if self._feed is not None and self._feed.healthy and not self._feed_gap:
+                return applied # El feed ya trajo todo lo que cambió
+            if time.monotonic() - self._last_sync < max_age:
+                return applied
+            self._feed_gap = False
+            if self._watermark is None:
+                # Nunca hubo una carga con marca de agua: carga completa
+                self._load_cards()
+                return len(self.cards)
+            try:
+                # '>=' y no '>': re-aplicar las filas del borde es idempotente y no se pierde ninguna
+                # Con el índice de búsqueda armado también hace falta el 'back' de lo que cambió
+                columns = LOAD_COLUMNS + (",back" if self._search_index is not None else "")
+                response = (self.supabase.table("flashcards").select(columns).eq("user_id", self.user_id)
+                            .gte("updated_at", self._watermark).order("updated_at").execute())
+            except Exception as e:
+                print(f"Error al sincronizar tarjetas de Supabase: {e}")
+                self._feed_gap = True
+                return applied
+            self._last_sync = time.monotonic()
+            for row in response.data:
+                self._apply_row(row)
+                self._advance_watermark(row)
+            return applied + len(response.data)
+
+    def _advance_watermark(self, row: Dict[str, Any]):
+        if row.get('updated_at') and (self._watermark is None or row['updated_at'] > self._watermark):
+            self._watermark = row['updated_at']
+
+    # --- Feed de cambios ---
+
+    def _on_change(self, change: Dict[str, Any]):
+        # Se llama desde el hilo del feed: sólo se anota y se aplica en sync()
+        if change.get('gap'):
+            self._feed_gap = True
+        else:
+            self._changes.append(change)
+
+    def _apply_changes(self, chunk: int = 200) -> int:
+        """
+        Aplica los avisos acumulados. Los que traen la fila se aplican tal cual; de los que sólo
+        traen el id se leen las filas en una consulta por lote (si ya no existen, se borran).
+        Devuelve cuántos cambiaron algo del mazo en memoria.
+        """
+        rows: Dict[int, Dict[str, Any]] = {}
+        ids: set = set()
+        while self._changes:
+            change = self._changes.popleft()
+            if change['row'] is None:
+                ids.add(change['id'])
+                rows.pop(change['id'], None)
+            else:
+                rows[change['id']] = change['row']
+                ids.discard(change['id'])
+        if ids:
+            columns = LOAD_COLUMNS + (",back" if self._search_index is not None else "")
+            pending = sorted(ids)
+            try:
+                for start in range(0, len(pending), chunk):
+                    for row in (self.supabase.table("flashcards").select(columns).eq("user_id", self.user_id)
+                                .in_("id", pending[start:start + chunk]).execute().data):
+                        rows[row['id']] = row
+            except Exception as e:
+                print(f"Error al leer las tarjetas cambiadas: {e}")
+                self._feed_gap = True # Se recupera con la marca de agua
+            else:
+                for card_id in ids.difference(rows):
+                    rows[card_id] = {'id': card_id, 'deleted': True} # Borrada físicamente u otro usuario
+        changed = 0
+        for row in rows.values():
+            changed += self._apply_row(row)
+            self._advance_watermark(row)
+        return changed
+
+    def _apply_row(self, row: Dict[str, Any]) -> bool:
+        """Aplica una fila remota (alta, cambio o tombstone) sobre el estado local. ¿Cambió algo?"""
+        card_id = row.get('id')
+        if card_id is None:
+            return False
+        card = self.cards.get(card_id)
+        if row.get('deleted'):
+            if card is None:
+                return False
+            self._remove_local(card_id)
+            return True
+        if self.review_writer.is_pending(card_id):
+            return False # La revisión local en cola es más nueva que lo que hay en Supabase
+        back = row.get('back')
+        if card is None:
+            self._append_local(Flashcard.from_dict(row), back)
+            return True
+        version = row.get('version', card.version)
+        if version < card.version:
+            return False # Lectura vieja: ya tenemos una versión posterior
+        if version == card.version and 'version' in row:
+            return False # La misma versión (p.ej. el eco de una escritura de esta sesión)
+        old_due = card.due
+        for key in CARD_FIELDS:
+            if key in row:
+                setattr(card, key, row[key])
+        self._push_due(card, old_due)
+        if back is None:
+            self.backs.invalidate(card_id) # Pudo haber cambiado: se vuelve a pedir cuando haga falta
+        else:
+            self.backs.put(card_id, back)
+        self._index_text(card, back)
+        return True
+
+    def _append_local(self, card: Flashcard, back: Optional[str] = None):
+        """Agrega una tarjeta al mapa local y a los índices."""
+        if card.id is None:
+            return
+        old = self.cards.get(card.id)
+        if old is None:
+            # Los ids nuevos suelen ser los mayores: búsqueda O(log n) e inserción al final, O(1) amortizado
+            order_index = bisect.bisect_left(self._id_order, card.id)
+            if order_index < len(self._id_order) and self._id_order[order_index] == card.id:
+                self._dead_ids -= 1 # Estaba borrada y sin compactar: vuelve a estar viva
+            else:
+                self._id_order.insert(order_index, card.id)
+        self.cards[card.id] = card
+        self.backs.put(card.id, back)
+        self._push_due(card, old.due if old is not None else None)
+        self._index_text(card, back)
+
+    def _remove_local(self, card_id: int):
+        """
+        Quita la tarjeta del mapa local y de los índices. Los ids de las demás no cambian.
+        En _id_order queda como id muerto (O(1)); la lista se compacta cuando hay demasiados.
+        """
+        card = self.cards.pop(card_id, None)
+        if card is None:
+            return
+        self._review_base.pop(card_id, None)
+        self._drop_due(card)
+        self.backs.invalidate(card_id)
+        self._unindex_text(card_id)
+        self._dead_ids += 1
+        self._maybe_compact_id_order()
+
+    def _maybe_compact_id_order(self):
+        """Saca los ids muertos de _id_order cuando superan a los vivos (amortizado O(1))."""
+        if self._dead_ids > len(self.cards) + 64:
+            self._id_order = [card_id for card_id in self._id_order if card_id in self.cards]
+            self._dead_ids = 0
+
+    def _index_text(self, card: Flashcard, back: Optional[str] = None):
+        """Actualiza los índices de texto (repetidos y búsqueda) que ya estén construidos."""
+        if self._dup_index is not None:
+            self._dup_index.update(card.id, card.front)
+        if self._search_index is not None:
+            if back is None:
+                back = self.backs.get(card.id)
+            self._search_index.update(card.id, card.front, back or "")
+
+    def _unindex_text(self, card_id: int):
+        if self._dup_index is not None:
+            self._dup_index.remove(card_id)
+        if self._search_index is not None:
+            self._search_index.remove(card_id)
+
+    def _row_for_upsert(self, card_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Fila (id, campos de scheduling y versión) para el update condicional del write-behind.
+        Sin 'front' ni 'back': una revisión no los cambia. None si la tarjeta ya no existe.
+        """
+        with self._lock:
+            card = self.cards.get(card_id)
+            if card is None:
+                return None
+            return {'id': card.id, 'next_review_date': card.next_review_date, 'interval': card.interval,
+                    'easiness_factor': card.easiness_factor, 'repetitions': card.repetitions,
+                    'version': card.version}
+
+    def _fetch_backs(self, card_ids: List[int], use_snapshot: bool = True) -> Dict[int, str]:
+        """
+        Los 'back' de varias tarjetas (lo usa el BackCache): del snapshot local las que no cambiaron
+        desde que se escribió, y el resto de la BD en una consulta.
+        """
+        backs = {}
+        if use_snapshot:
+            known = [card for card in map(self.cards.get, card_ids) if card is not None]
+            with self._snapshot_lock:
+                if self._snapshot is not None and known:
+                    backs = self._snapshot.backs([card.id for card in known], [card.version for card in known])
+        missing = [card_id for card_id in card_ids if card_id not in backs]
+        if missing:
+            rows = (self.supabase.table("flashcards").select("id,back").eq("user_id", self.user_id)
+                    .in_("id", missing).execute().data)
+            backs.update((row['id'], row['back']) for row in rows)
+        return backs
+
+    def get_back(self, card_id: int, prefetch: List[int] = ()) -> Optional[str]:
+        """El 'back' de una tarjeta; si hay que pedirlo, se piden también los de 'prefetch'."""
+        return self.backs.get(card_id, prefetch)
+
+    def _on_review_written(self, card_id: int, version: int):
+        """La escritura condicional se aplicó: la copia local pasa a la nueva versión."""
+        with self._lock:
+            card = self.cards.get(card_id)
+            if card is not None and card.version < version:
+                card.version = version
+            self._review_base.pop(card_id, None)
+
+    def _on_review_conflict(self, card_id: int):
+        # Se llama desde el hilo del write-behind: sólo se anota y se resuelve en sync()
+        with self._conflicts_lock:
+            self._conflicts.add(card_id)
+
+    def _resolve_conflicts(self) -> int:
+        """
+        Trae la versión de la BD de las tarjetas en conflicto. Si la otra sesión sólo cambió el texto
+        (el scheduling de la BD sigue siendo el que revisamos), la revisión en cola se vuelve a aplicar
+        sobre la fila nueva y se reintenta con su versión. Si también la revisó, gana la que llegó primero.
+        """
+        with self._conflicts_lock:
+            card_ids, self._conflicts = list(self._conflicts), set()
+        if not card_ids:
+            return 0
+        try:
+            rows = (self.supabase.table("flashcards").select("*").eq("user_id", self.user_id)
+                    .in_("id", card_ids).execute().data)
+        except Exception as e:
+            print(f"Error al releer tarjetas en conflicto: {e}")
+            with self._conflicts_lock:
+                self._conflicts.update(card_ids)
+            return 0
+        for row in rows:
+            card = self.cards.get(row['id'])
+            base = self._review_base.pop(row['id'], None)
+            self.review_writer.discard(row['id']) # Estaba basada en la versión vieja
+            if (card is None or base is None or row.get('deleted')
+                    or not _same_schedule(_schedule(Flashcard.from_dict(row)), base)):
+                self._apply_row(row)
+                continue
+            fields = {key: getattr(card, key) for key in SCHEDULE_FIELDS}
+            self._apply_row(row) # Texto y versión nuevos
+            old_due = card.due
+            for key, value in fields.items():
+                setattr(card, key, value)
+            self._push_due(card, old_due)
+            self._review_base[card.id] = base
+            # Sin fila del historial: ésa ya se guardó con la revisión original
+            self.review_writer.enqueue(card.id, fields)
+            print(f"La revisión de la tarjeta {card.id} se reintenta sobre la versión {card.version}.")
+        return len(rows)
+
+    def _replay_journal(self):
+        """Aplica sobre las tarjetas cargadas las revisiones que no llegaron a Supabase."""
+        for card_id, fields in self.review_writer.recover().items():
+            card = self.cards.get(card_id)
+            if card is None:
+                continue
+            old_due = card.due
+            for key, value in fields.items():
+                setattr(card, key, value)
+            self._push_due(card, old_due)
+
+    def flush_reviews(self, wait: bool = True) -> bool:
+        """Fuerza el envío de las revisiones pendientes (fin de sesión). Con wait=False lo hace el hilo de fondo."""
+        if not wait:
+            self.review_writer.flush_soon()
+            return True
+        return self.review_writer.flush()
+
+    def close(self):
+        """Envía lo pendiente y detiene el hilo de escritura (al salir del pool o del proceso)."""
+        if self._feed is not None:
+            self._feed.unsubscribe(self.user_id, self._on_change)
+        self.review_writer.close()
+        if self.snapshot_path and self.revision != self._snapshot_revision:
+            self.save_snapshot()
+        with self._snapshot_lock:
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
+
+    # --- Índice de vencimientos ---
+
+    def _rebuild_due_index(self):
+        """Reconstruye el heap y la vista ordenada desde self.cards (O(n log n), sólo al cargar)."""
+        self.revision += 1
+        self._due_heap = []
+        self._due_seq = {}
+        for card in self.cards.values():
+            self._seq += 1
+            self._due_seq[card.id] = self._seq
+            self._due_heap.append((card.due, self._seq, card.id))
+        heapq.heapify(self._due_heap)
+        self.stats.rebuild_due(card.due for card in self.cards.values())
+        self._id_order = sorted(self.cards)
+        self._dead_ids = 0
+        self._dup_index = None
+        self._search_index = None
+
+    def _push_due(self, card: Flashcard, old_due: Optional[int] = None):
+        """
+        (Re)indexa una tarjeta en O(log n). La entrada anterior queda obsoleta.
+        'old_due' es el vencimiento que tenía (None si la tarjeta es nueva), para las métricas.
+        """
+        if card.id is None:
+            return
+        self.revision += 1
+        self.stats.move_due(old_due, card.due)
+        self._seq += 1
+        self._due_seq[card.id] = self._seq
+        heapq.heappush(self._due_heap, (card.due, self._seq, card.id))
+        self._maybe_compact_due_index()
+
+    def _drop_due(self, card: Flashcard):
+        """Saca una tarjeta del índice (borrado perezoso, O(1))."""
+        if self._due_seq.pop(card.id, None) is not None:
+            self.revision += 1
+            self.stats.move_due(card.due, None)
+        self._maybe_compact_due_index()
+
+    def _maybe_compact_due_index(self):
+        """Limpia las entradas obsoletas cuando superan a las válidas (amortizado O(1))."""
+        if len(self._due_heap) > 2 * len(self._due_seq) + 64:
+            self._due_heap = [entry for entry in self._due_heap
+                              if self._due_seq.get(entry[2]) == entry[1]]
+            heapq.heapify(self._due_heap)
+
+    def _iter_due(self) -> Iterator[Tuple[int, int]]:
+        """
+        Recorre el heap en orden de vencimiento sin modificarlo (best-first sobre el árbol).
+        Cada elemento producido cuesta O(log k), así que pedir k tarjetas no depende del tamaño del mazo.
+        """
+        heap = self._due_heap
+        if not heap:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier:
+            entry, i = heapq.heappop(frontier)
+            due_ts, seq, card_id = entry
+            if self._due_seq.get(card_id) == seq:
+                yield due_ts, card_id
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def due_cards(self, now: Optional[datetime] = None) -> List[Flashcard]:
+        """Devuelve las tarjetas vencidas, ordenadas por fecha."""
+        with self._lock:
+            now_ts = (now or datetime.now()).timestamp()
+            result = []
+            for due_ts, card_id in self._iter_due():
+                if due_ts > now_ts:
+                    break
+                result.append(self.cards[card_id])
+            return result
+
+    def next_due_cards(self, k: int) -> List[Flashcard]:
+        """Devuelve las próximas k tarjetas a revisar (vencidas o no), ordenadas por fecha."""
+        with self._lock:
+            result = []
+            if k <= 0:
+                return result
+            for _, card_id in self._iter_due():
+                result.append(self.cards[card_id])
+                if len(result) >= k:
+                    break
+            return result
 
     def save_cards(self):
         """
@@ -89,196 +951,551 @@ class FlashcardsManager:
 
     def add_card(self, front: str, back: str):
         """Añade una nueva flashcard a Supabase y a la lista local."""
-        new_card = Flashcard(front, back)
+        with self._lock:
+            new_card = Flashcard(front)
         
-        try:
-            # Inserta en Supabase (solo los datos, sin el 'id=None')
-            data_to_insert = new_card.to_dict()
-            response = self.supabase.table("flashcards").insert(data_to_insert).execute()
+            try:
+                # Inserta en Supabase (solo los datos, sin el 'id=None')
+                data_to_insert = {**new_card.to_dict(), 'back': back, 'user_id': self.user_id}
+                response = self.supabase.table("flashcards").insert(data_to_insert).execute()
             
-            # Obtiene la tarjeta completa (con el 'id' generado) de la respuesta
-            new_card_data_from_db = response.data[0]
-            new_card_obj = Flashcard.from_dict(new_card_data_from_db)
+                # Obtiene la tarjeta completa (con el 'id' generado) de la respuesta
+                new_card_data_from_db = response.data[0]
+                new_card_obj = Flashcard.from_dict(new_card_data_from_db)
             
-            # Añade el objeto completo a la lista local
-            self.cards.append(new_card_obj)
-            return new_card_obj
+                # Añade el objeto completo a la lista local (y el 'back' al cache)
+                self._append_local(new_card_obj, back)
+                self._advance_watermark(new_card_data_from_db)
+                self.stats.record_added()
+                return new_card_obj
         
+            except Exception as e:
+                print(f"Error al añadir tarjeta a Supabase: {e}")
+                return None
+
+    def add_cards(self, pairs: List[Tuple[str, str]]) -> List[Flashcard]:
+        """Añade muchas tarjetas (front, back) con un único insert por lotes."""
+        if not pairs:
+            return []
+        try:
+            rows = [{**Flashcard(front).to_dict(), 'back': back, 'user_id': self.user_id} for front, back in pairs]
+            new_cards = self._insert_rows(rows)
         except Exception as e:
-            print(f"Error al añadir tarjeta a Supabase: {e}")
-            return None
+            print(f"Error al añadir {len(pairs)} tarjetas a Supabase: {e}")
+            return []
+        self.stats.record_added(len(new_cards))
+        print(f"Añadidas {len(new_cards)} tarjetas a Supabase.")
+        return new_cards
 
-    def update_card(self, index: int, new_front: str = None, new_back: str = None) -> bool:
-        """Actualiza el texto de una flashcard en Supabase y localmente."""
-        if not (0 <= index < len(self.cards)):
-            print(f"Error: Card index {index} out of bounds.")
-            return False
+    def _insert_rows(self, rows: List[Dict[str, Any]]) -> List[Flashcard]:
+        """Un insert por lote y las tarjetas creadas (con su id) al mapa local."""
+        with self._lock:
+            response = self.supabase.table("flashcards").insert(rows).execute()
+            new_cards = []
+            for row in response.data:
+                card = Flashcard.from_dict(row)
+                self._append_local(card, row.get('back'))
+                self._advance_watermark(row)
+                new_cards.append(card)
+            return new_cards
 
-        card = self.cards[index]
-        if card.id is None:
-            print("Error: La tarjeta no tiene ID, no se puede actualizar.")
-            return False
+    def get(self, card_id: int) -> Optional[Flashcard]:
+        """Busca una tarjeta por id en O(1). None si no existe."""
+        return self.cards.get(card_id)
+
+    def update_card(self, card_id: int, new_front: str = None, new_back: str = None) -> bool:
+        """Actualiza el texto de una flashcard en Supabase y localmente."""
+        with self._lock:
+            card = self.cards.get(card_id)
+            if card is None:
+                print(f"Error: No existe la tarjeta {card_id}.")
+                return False
 
-        updates = {}
-        if new_front is not None and card.front != new_front:
-            updates['front'] = new_front
-            card.front = new_front # Actualiza localmente
+            updates = {}
+            if new_front is not None and card.front != new_front:
+                updates['front'] = new_front
             
-        if new_back is not None and card.back != new_back:
-            updates['back'] = new_back
-            card.back = new_back # Actualiza localmente
+            if new_back is not None and self.get_back(card_id) != new_back:
+                updates['back'] = new_back
+
+            if not updates:
+                return False # No hubo cambios
 
-        if updates:
             try:
-                # Actualiza en Supabase usando el ID
-                self.supabase.table("flashcards").update(updates).eq("id", card.id).execute()
-                print(f"Tarjeta {card.id} actualizada en Supabase.")
-                return True
+                # Update condicional: sólo si nadie cambió la tarjeta desde que la leímos
+                response = (self.supabase.table("flashcards").update({**updates, 'version': card.version + 1})
+                            .eq("id", card.id).eq("user_id", self.user_id).eq("version", card.version).execute())
             except Exception as e:
                 print(f"Error al actualizar tarjeta {card.id}: {e}")
                 return False
-        
-        return False # No hubo cambios
 
-    def review_card(self, card_index: int, grade: int):
-        """Aplica SM-2 y actualiza la tarjeta en Supabase y localmente."""
-        if not (0 <= card_index < len(self.cards)):
-            print(f"Error: Card index {card_index} out of bounds.")
-            return
+            if not response.data:
+                print(f"Conflicto: la tarjeta {card.id} cambió en otra sesión; no se guardó la edición.")
+                with self._conflicts_lock:
+                    self._conflicts.add(card.id)
+                self._resolve_conflicts()
+                return False
 
-        card = self.cards[card_index]
-        if card.id is None:
-            print("Error: La tarjeta no tiene ID, no se puede revisar.")
-            return
+            if 'front' in updates:
+                card.front = updates['front'] # Actualiza localmente
+            self.backs.put(card.id, updates.get('back'))
+            card.version += 1
+            self.revision += 1
+            self._index_text(card, updates.get('back'))
+            print(f"Tarjeta {card.id} actualizada en Supabase.")
+            return True
+
+    def review_card(self, card_id: int, grade: int):
+        """Aplica SM-2 y actualiza la tarjeta en Supabase y localmente."""
+        with self._lock:
+            card = self.cards.get(card_id)
+            if card is None:
+                print(f"Error: No existe la tarjeta {card_id}.")
+                return
             
-        # --- Misma lógica SM-2 que tenías antes ---
-        if grade == 0: q = 1
-        elif grade == 1: q = 3
-        elif grade == 2: q = 4
-        elif grade == 3: q = 5
-        else: return
-
-        new_ef = card.easiness_factor + (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
-        card.easiness_factor = max(1.3, new_ef)
-
-        if q >= 3:
-            card.repetitions += 1
-            if card.repetitions == 1: new_interval = 1.0
-            elif card.repetitions == 2: new_interval = 6.0
-            else: new_interval = card.interval * card.easiness_factor
-            card.interval = new_interval
-        else:
-            card.repetitions = 0
-            card.interval = 1.0
+            # --- Misma lógica SM-2 que tenías antes ---
+            if grade == 0: q = 1
+            elif grade == 1: q = 3
+            elif grade == 2: q = 4
+            elif grade == 3: q = 5
+            else: return
+
+            self._review_base.setdefault(card.id, _schedule(card)) # Antes de aplicar SM-2
+            new_ef = card.easiness_factor + (0.1 - (5 - q) * (0.08 + (5 - q) * 0.02))
+            card.easiness_factor = max(1.3, new_ef)
+
+            if q >= 3:
+                card.repetitions += 1
+                if card.repetitions == 1: new_interval = 1.0
+                elif card.repetitions == 2: new_interval = 6.0
+                else: new_interval = card.interval * card.easiness_factor
+                card.interval = min(new_interval, MAX_INTERVAL_DAYS)
+            else:
+                card.repetitions = 0
+                card.interval = 1.0
             
-        days_to_add = int(round(card.interval))
-        card.next_review_date = (datetime.now() + timedelta(days=days_to_add)).isoformat()
+            days_to_add = int(round(card.interval))
+            old_due = card.due
+            now = datetime.now()
+            card.due = int((now + timedelta(days=days_to_add)).timestamp())
+            self._push_due(card, old_due)
         
-        # --- FIN Lógica SM-2 ---
+            # --- FIN Lógica SM-2 ---
 
-        # Ahora, guarda estos cambios en Supabase
-        try:
+            # Ahora, encola estos cambios: se envían a Supabase en el próximo lote
             updates_to_send = {
                 'next_review_date': card.next_review_date,
                 'interval': card.interval,
                 'easiness_factor': card.easiness_factor,
                 'repetitions': card.repetitions
             }
-            self.supabase.table("flashcards").update(updates_to_send).eq("id", card.id).execute()
-            print(f"Revisión de tarjeta {card.id} guardada en Supabase.")
+            self.review_writer.enqueue(card.id, updates_to_send, self._log_review(card, grade, now))
             return days_to_add
-        except Exception as e:
-            print(f"Error al guardar revisión de tarjeta {card.id}: {e}")
-            
-    def delete_card_by_index(self, index: int):
-        """Elimina una tarjeta de Supabase y de la lista local."""
-        if not (0 <= index < len(self.cards)):
-            print(f"Error: Card index {index} out of bounds.")
-            return False
+
+    def _log_review(self, card: Flashcard, grade: int, when: datetime) -> Dict[str, Any]:
+        """Suma la calificación a las métricas y devuelve su fila del historial (va con la revisión)."""
+        self.stats.record_review(grade, when)
+        return {'uid': uuid.uuid4().hex, 'user_id': self.user_id, 'card_id': card.id, 'grade': grade,
+                'reviewed_at': when.isoformat(timespec='seconds'), 'interval': card.interval}
             
-        card = self.cards[index]
-        if card.id is None:
-            print("Error: La tarjeta no tiene ID, no se puede eliminar.")
-            return False
+    # --- Tarjetas repetidas ---
+
+    @property
+    def duplicate_index(self) -> "DuplicateIndex":
+        """Índice de 'fronts' (exacto + MinHash). Se arma una vez y luego se mantiene incrementalmente."""
+        with self._lock:
+            if self._dup_index is None:
+                from modules.dedupe import DuplicateIndex
+                index = DuplicateIndex()
+                index.add_many((card.id, card.front) for card in self.cards.values())
+                self._dup_index = index
+            return self._dup_index
+
+    def find_duplicates(self, front: str, exclude: Optional[int] = None) -> Dict[str, list]:
+        """{'exact': [tarjetas], 'near': [(tarjeta, similitud)]} con el mismo 'front' o uno parecido."""
+        with self._lock:
+            found = self.duplicate_index.find(front, exclude)
+            return {'exact': [self.cards[card_id] for card_id in found['exact']],
+                    'near': [(self.cards[card_id], score) for card_id, score in found['near']]}
+
+    def duplicates_report(self) -> Dict[str, list]:
+        """Grupos de repetidos exactos y pares de casi-duplicados de todo el mazo."""
+        with self._lock:
+            return self.duplicate_index.report()
+
+    # --- Búsqueda ---
+
+    @property
+    def search_index(self) -> "SearchIndex":
+        """Índice invertido de 'front' y 'back'. Se arma una vez y luego se mantiene incrementalmente."""
+        with self._lock:
+            if self._search_index is None:
+                from modules.search_index import SearchIndex
+                index = SearchIndex()
+                # Los 'back' se leen de la BD por partes y no se guardan: sólo quedan sus términos
+                for card_id, back in self._scan_backs():
+                    card = self.cards.get(card_id)
+                    if card is not None:
+                        index.add(card_id, card.front, back or "")
+                self._search_index = index
+            return self._search_index
+
+    def _scan_backs(self, chunk: int = 1000) -> Iterator[Tuple[int, str]]:
+        """Recorre los 'back' de todo el mazo en páginas por id (keyset), sin cargarlos todos juntos."""
+        after_id = -1
+        while True:
+            rows = (self.supabase.table("flashcards").select("id,back").eq("user_id", self.user_id)
+                    .eq("deleted", False).gt("id", after_id).order("id").limit(chunk).execute().data)
+            for row in rows:
+                yield row['id'], row['back']
+            if len(rows) < chunk:
+                return
+            after_id = rows[-1]['id']
+
+    def search_cards(self, query: str = "", due_from: Optional[datetime] = None,
+                     due_to: Optional[datetime] = None,
+                     interval_range: Optional[Tuple[float, float]] = None,
+                     ef_range: Optional[Tuple[float, float]] = None,
+                     sort: str = "relevance", limit: Optional[int] = 100) -> List[Flashcard]:
+        """
+        Busca tarjetas por texto (ranking BM25 del índice invertido) y las filtra por
+        fecha de revisión, intervalo y EF. 'sort': relevance, next_review, interval o easiness_factor.
+        Sin texto se filtra todo el mazo (para fechas se usa el índice de vencimientos).
+        """
+        with self._lock:
+            low_due = _due_timestamp(due_from.isoformat()) if due_from else float('-inf')
+            high_due = _due_timestamp(due_to.isoformat()) if due_to else float('inf')
+
+            def keep(card_id: int) -> bool:
+                card = self.cards.get(card_id)
+                if card is None:
+                    return False
+                if due_from or due_to:
+                    if not low_due <= card.due <= high_due:
+                        return False
+                if interval_range and not interval_range[0] <= card.interval <= interval_range[1]:
+                    return False
+                if ef_range and not ef_range[0] <= card.easiness_factor <= ef_range[1]:
+                    return False
+                return True
+
+            if query.strip():
+                # El límite se aplica después de ordenar si el orden no es por relevancia
+                hits = self.search_index.search(query, limit if sort == "relevance" else None, keep)
+                cards = [self.cards[card_id] for card_id, _ in hits]
+            elif sort in ("relevance", "next_review") and not due_from and due_to:
+                # Sólo un tope de fecha: el heap ya da las tarjetas en orden, sin recorrer el resto
+                cards = []
+                for due, card_id in self._iter_due():
+                    if due > high_due or (limit is not None and len(cards) >= limit):
+                        break
+                    if keep(card_id):
+                        cards.append(self.cards[card_id])
+                return cards
+            else:
+                cards = [self.cards[card_id] for card_id in self._id_order if keep(card_id)] # keep saltea los muertos
+
+            if sort == "next_review":
+                cards.sort(key=lambda card: card.due)
+            elif sort in ("interval", "easiness_factor"):
+                cards.sort(key=lambda card: getattr(card, sort))
+            return cards if limit is None else cards[:limit]
+
+    # --- Vistas ordenadas / paginación ---
+
+    def ordered_cards(self) -> List[Flashcard]:
+        """Todas las tarjetas ordenadas por id (orden de creación)."""
+        with self._lock:
+            return [self.cards[card_id] for card_id in self._id_order if card_id in self.cards]
+
+    def cards_page(self, after_id: Optional[int] = None, limit: int = 20
+                   ) -> Tuple[List[Flashcard], Optional[int]]:
+        """
+        Paginación por keyset: hasta 'limit' tarjetas con id > after_id, ordenadas por id.
+        Devuelve (tarjetas, cursor de la página siguiente o None si es la última).
+        Cuesta O(log n + limit) más los ids muertos salteados (acotados por la compactación),
+        y las páginas no se corren cuando se borran tarjetas.
+        """
+        with self._lock:
+            order = self._id_order
+            index = 0 if after_id is None else bisect.bisect_right(order, after_id)
+            page = []
+            while index < len(order) and len(page) < limit:
+                card = self.cards.get(order[index])
+                index += 1
+                if card is not None:
+                    page.append(card)
+            while index < len(order) and order[index] not in self.cards:
+                index += 1
+            next_cursor = page[-1].id if page and index < len(order) else None
+            return page, next_cursor
+
+    def to_columns(self) -> "CardColumns":
+        """Snapshot columnar (NumPy) de los campos de scheduling de todo el mazo."""
+        from modules.columnar import CardColumns
+        with self._lock:
+            return CardColumns.from_cards(self.cards.values())
+
+    def review_cards_batch(self, card_ids: List[int], grades: List[int]) -> List[int]:
+        """
+        Califica muchas tarjetas de una sola vez con el SM-2 vectorizado
+        (importar historial, reprogramar el mazo...). Devuelve los días hasta la próxima revisión
+        de cada tarjeta existente (los ids desconocidos se ignoran).
+        """
+        from modules.columnar import CardColumns, review_batch
+        with self._lock:
+            pairs = [(card_id, g) for card_id, g in zip(card_ids, grades) if card_id in self.cards]
+            if not pairs:
+                return []
+            cards = [self.cards[card_id] for card_id, _ in pairs]
+            columns = CardColumns.from_cards(cards)
+            days = review_batch(columns, list(range(len(cards))), [g for _, g in pairs])
+
+            now = datetime.now()
+            for card, (_, grade), row, day in zip(cards, pairs, columns.to_rows(), days):
+                if day < 0:
+                    continue # Grado inválido: la tarjeta no cambia
+                self._review_base.setdefault(card.id, _schedule(card))
+                old_due = card.due
+                fields = {k: v for k, v in row.items() if k != 'id'}
+                for key, value in fields.items():
+                    setattr(card, key, value)
+                self._push_due(card, old_due)
+                self.review_writer.enqueue(card.id, fields, self._log_review(card, grade, now))
+            return [int(day) for day in days]
+
+    def delete_card(self, card_id: int):
+        """Elimina una tarjeta de Supabase y del mapa local."""
+        with self._lock:
+            card = self.cards.get(card_id)
+            if card is None:
+                print(f"Error: No existe la tarjeta {card_id}.")
+                return False
             
-        try:
-            # 1. Eliminar de Supabase
-            self.supabase.table("flashcards").delete().eq("id", card.id).execute()
+            try:
+                # 1. Eliminar de Supabase: tombstone para que la sync incremental lo propague
+                (self.supabase.table("flashcards").update({'deleted': True, 'version': card.version + 1})
+                 .eq("id", card.id).eq("user_id", self.user_id).execute())
             
-            # 2. Eliminar de la lista local
-            del self.cards[index]
-            print(f"Tarjeta {card.id} eliminada.")
-            return True
-        except Exception as e:
-            print(f"Error al eliminar tarjeta {card.id}: {e}")
-            return False
+                # 2. Eliminar de la lista local (y de la cola, para no resucitarla con el upsert)
+                self.review_writer.discard(card.id)
+                self._remove_local(card.id)
+                print(f"Tarjeta {card.id} eliminada.")
+                return True
+            except Exception as e:
+                print(f"Error al eliminar tarjeta {card.id}: {e}")
+                return False
 
 # --- 3. Global Manager Instance and Streamlit Wrapper Functions ---
 
-# Inicializa el manager. 
-# Esto se ejecutará una vez cuando Streamlit corra el script.
-manager = FlashcardsManager()
+class ManagerPool:
+    """
+    LRU acotado de managers, uno por usuario, compartido por todas las sesiones del proceso.
+    Dos pestañas del mismo usuario usan el mismo manager; el menos usado se cierra
+    (enviando sus revisiones pendientes) cuando hay más de 'max_managers' usuarios activos.
+    """
+    def __init__(self, max_managers: int = 64):
+        self.max_managers = max_managers
+        self._managers: "OrderedDict[str, FlashcardsManager]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._user_locks: Dict[str, threading.Lock] = {}
+
+    def get(self, user_id: str) -> FlashcardsManager:
+        with self._lock:
+            manager = self._managers.get(user_id)
+            if manager is not None:
+                self._managers.move_to_end(user_id)
+                return manager
+            user_lock = self._user_locks.setdefault(user_id, threading.Lock())
+
+        # La carga del mazo va fuera del lock global: un usuario nuevo no frena a los demás
+        with user_lock:
+            with self._lock:
+                manager = self._managers.get(user_id)
+            if manager is None:
+                storage = st.secrets.get("storage", {})
+                manager = FlashcardsManager(user_id, snapshot_path=_snapshot_path(user_id),
+                                            snapshot_interval=float(storage.get("snapshot_interval", 300.0)))
+                with self._lock:
+                    self._managers[user_id] = manager
+                    self._user_locks.pop(user_id, None)
+                    evicted = []
+                    while len(self._managers) > self.max_managers:
+                        evicted.append(self._managers.popitem(last=False)[1])
+                for old in evicted:
+                    old.close()
+        return manager
+
+    def close(self):
+        with self._lock:
+            managers, self._managers = list(self._managers.values()), OrderedDict()
+        for manager in managers:
+            manager.close()
+
+    def is_loaded(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._managers
+
+    def warm_up(self, user_id: str):
+        """Empieza a cargar el mazo de 'user_id' en segundo plano (no bloquea al que llama)."""
+        if not self.is_loaded(user_id):
+            threading.Thread(target=self.get, args=(user_id,), name="deck-warm-up", daemon=True).start()
+
+
+def current_user_id() -> str:
+    """
+    Usuario de la sesión actual: el de st.user si la app tiene login configurado
+    (st.login); si no, todas las sesiones comparten el mazo por defecto.
+    """
+    try:
+        if st.user.is_logged_in:
+            return st.user.get("email") or st.user.get("sub") or DEFAULT_USER
+    except Exception:
+        pass # Sin [auth] en los secrets
+    return DEFAULT_USER
+
+
+@st.cache_resource
+def get_pool() -> ManagerPool:
+    """
+    Pool de managers del proceso. Se crea la primera vez que una página necesita tarjetas,
+    no al importar el módulo: importar no conecta a la BD ni descarga el mazo.
+    """
+    pool = ManagerPool(int(st.secrets.get("storage", {}).get("max_users", 64)))
+    atexit.register(pool.close)
+    return pool
+
+
+def current_manager() -> FlashcardsManager:
+    """Manager (mazo) del usuario de la sesión actual."""
+    return get_pool().get(current_user_id())
+
+
+def warm_up():
+    """Carga en segundo plano el mazo del usuario actual, para que la página se dibuje sin esperarlo."""
+    get_pool().warm_up(current_user_id())
 
 # ---
-# ¡BUENAS NOTICIAS!
-# Todas tus funciones wrapper (las que usan tus páginas de Streamlit)
-# deberían funcionar EXACTAMENTE IGUAL, excepto 'delete_card_by_index'
-# que moví dentro del manager para que tenga acceso a 'self.supabase'.
+# Las funciones wrapper (las que usan las páginas de Streamlit) identifican
+# cada tarjeta por su 'card_id' de la BD, que no cambia al borrar otras tarjetas:
+# los ids guardados en st.session_state siguen siendo válidos sin recargar nada.
 # ---
 
 def load_all_cards() -> List[Dict[str, Any]]:
     """Carga todas las tarjetas (como dicts) desde el manager (que está en memoria)."""
-    # La 'card_index' ahora es el índice de la lista local 'manager.cards'
-    return [{'card': card.to_dict(), 'card_index': i} 
-            for i, card in enumerate(manager.cards)]
+    return [{'card': card.to_dict(), 'card_id': card.id}
+            for card in current_manager().ordered_cards()]
+
+def _with_backs(manager: FlashcardsManager, cards: List[Flashcard]) -> List[Dict[str, Any]]:
+    """Tarjetas como dicts, con el 'back' (los que falten se traen en una sola consulta)."""
+    backs = manager.backs.get_many([card.id for card in cards])
+    return [{'card': {**card.to_dict(), 'back': backs.get(card.id, "")}, 'card_id': card.id}
+            for card in cards]
+
+def load_cards_page(after_id: Optional[int] = None, limit: int = 20
+                    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Una página de tarjetas (como dicts, con 'back') y el cursor de la siguiente."""
+    manager = current_manager()
+    page, next_cursor = manager.cards_page(after_id, limit)
+    return _with_backs(manager, page), next_cursor
+
+def get_card(card_id: int) -> Optional[Dict[str, Any]]:
+    """Una tarjeta (como dict, con 'back') por id, o None si ya no existe."""
+    manager = current_manager()
+    card = manager.get(card_id)
+    if card is None:
+        return None
+    return {'card': {**card.to_dict(), 'back': manager.get_back(card_id) or ""}, 'card_id': card_id}
+
+def get_card_back(card_id: int, prefetch_ids: List[int] = ()) -> str:
+    """El 'back' de una tarjeta; si hay que pedirlo a la BD, se piden también los de 'prefetch_ids'."""
+    return current_manager().get_back(card_id, prefetch_ids) or ""
+
+def prefetch_backs(card_ids: List[int]):
+    """Trae en segundo plano los 'back' de estas tarjetas (p.ej. las próximas a revisar)."""
+    current_manager().backs.prefetch(card_ids)
+
+def find_duplicates(front: str) -> Dict[str, list]:
+    """Wrapper: tarjetas ya existentes iguales o parecidas a 'front' (como dicts)."""
+    found = current_manager().find_duplicates(front)
+    return {'exact': [{'card': card.to_dict(), 'card_id': card.id} for card in found['exact']],
+            'near': [{'card': card.to_dict(), 'card_id': card.id, 'similarity': score}
+                     for card, score in found['near']]}
+
+def search_cards(query: str = "", limit: Optional[int] = 100, **filters) -> List[Dict[str, Any]]:
+    """Wrapper: tarjetas (como dicts, con 'back') que coinciden con la búsqueda y los filtros."""
+    manager = current_manager()
+    return _with_backs(manager, manager.search_cards(query, limit=limit, **filters))
 
 def add_new_card(front: str, back: str):
     """Wrapper para añadir tarjeta."""
-    manager.add_card(front, back)
+    current_manager().add_card(front, back)
+
+def add_new_cards(pairs: List[Tuple[str, str]]) -> int:
+    """Wrapper para añadir muchas tarjetas de una vez. Devuelve cuántas se guardaron."""
+    return len(current_manager().add_cards(pairs))
 
-def update_card_by_index(index: int, new_front: str = None, new_back: str = None) -> bool:
+def update_card_by_id(card_id: int, new_front: str = None, new_back: str = None) -> bool:
     """Wrapper para actualizar tarjeta."""
-    return manager.update_card(index, new_front, new_back)
+    return current_manager().update_card(card_id, new_front, new_back)
 
-def delete_card_by_index(index: int):
+def delete_card_by_id(card_id: int):
     """Wrapper para eliminar tarjeta."""
-    # Llama al nuevo método del manager
-    return manager.delete_card_by_index(index)
+    return current_manager().delete_card(card_id)
 
 def get_due_cards() -> List[Dict[str, Any]]:
-    """Obtiene tarjetas vencidas desde la lista en memoria del manager."""
-    now = datetime.now()
-    due_cards_with_index = []
-    
-    # Itera sobre la lista local 'manager.cards'
-    for i, card in enumerate(manager.cards):
-        try:
-            # Asegúrate de que la fecha sea 'aware' (con timezone) o 'naive' de forma consistente
-            # datetime.now() es 'naive', así que convirtamos la de la BD a 'naive'
-            due_date = datetime.fromisoformat(card.next_review_date)
-            if due_date.tzinfo:
-                due_date = due_date.replace(tzinfo=None) # Hacerla naive para comparar
-                
-            if due_date <= now:
-                due_cards_with_index.append({
-                    'card': card.to_dict(),
-                    'card_index': i
-                })
-        except ValueError:
-            due_cards_with_index.append({
-                'card': card.to_dict(),
-                'card_index': i
-            })
-
-    due_cards_with_index.sort(key=lambda item: datetime.fromisoformat(item['card']['next_review_date']))
-    
-    return due_cards_with_index
+    """Obtiene tarjetas vencidas desde el índice de vencimientos del manager."""
+    # El índice ya está ordenado por fecha: sólo se recorren las tarjetas devueltas
+    return [{'card': card.to_dict(), 'card_id': card.id}
+            for card in current_manager().due_cards()]
+
+def flush_reviews(wait: bool = True) -> bool:
+    """Wrapper para enviar las revisiones pendientes al terminar la sesión."""
+    return current_manager().flush_reviews(wait)
+
+def sync_cards(max_age: float = 10.0) -> int:
+    """Wrapper: aplica los cambios del feed (o sincroniza por marca de agua, como mucho una cada 'max_age' segundos)."""
+    return current_manager().sync(max_age)
+
+def deck_revision() -> int:
+    """Wrapper: número que cambia con cada cambio del mazo del usuario (de esta u otra sesión)."""
+    return current_manager().revision
+
+def export_snapshot() -> bytes:
+    """Wrapper: backup del mazo del usuario actual en formato snapshot (.fcs)."""
+    fd, path = tempfile.mkstemp(suffix=".fcs")
+    os.close(fd)
+    try:
+        if not current_manager().save_snapshot(path):
+            return b""
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+def restore_snapshot(data: bytes) -> int:
+    """Wrapper: restaura un backup .fcs en el mazo del usuario actual. Devuelve cuántas tarjetas agregó."""
+    fd, path = tempfile.mkstemp(suffix=".fcs")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return current_manager().restore_snapshot(path)
+    finally:
+        os.remove(path)
+
+def is_loaded() -> bool:
+    """¿El mazo del usuario actual ya está en memoria? (Home no espera a que cargue)"""
+    return get_pool().is_loaded(current_user_id())
+
+def get_stats() -> Dict[str, Any]:
+    """Wrapper: métricas del usuario (racha, revisiones de hoy, retención, vencimientos)."""
+    return current_manager().stats.summary()
 
-def update_review_status(card_index: int, grade_string: str) -> int:
+def update_review_status(card_id: int, grade_string: str) -> int:
     """Wrapper para revisar tarjeta."""
     grade_map = {"Again": 0, "Hard": 1, "Good": 2, "Easy": 3}
     grade = grade_map.get(grade_string, -1)
     
     if grade == -1: return 0
     
-    return manager.review_card(card_index, grade)
\ No newline at end of file
+    return current_manager().review_card(card_id, grade)
\ No newline at end of file
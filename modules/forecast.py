@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from modules.columnar import CardColumns, sm2_batch
+
+# --- Simulador de carga de repaso ---
+# Proyecta cuántas revisiones habrá cada día durante los próximos N días, usando el
+# mismo SM-2 que review_card pero vectorizado: todas las tarjetas de todas las
+# simulaciones se procesan juntas en arrays de NumPy (una pasada por día).
+
+DEFAULT_GRADE_PROBS = (0.10, 0.15, 0.60, 0.15) # Again, Hard, Good, Easy
+
+
+def _start_of_day(now: datetime) -> datetime:
+    return now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def forecast_workload(columns: CardColumns, days: int = 30,
+                      grade_probs: Sequence[float] = DEFAULT_GRADE_PROBS,
+                      new_per_day: int = 0, runs: int = 20,
+                      seed: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+    """
+    Simula 'runs' futuros posibles del mazo durante 'days' días.
+    Cada día se revisan todas las tarjetas vencidas (lo atrasado cuenta para hoy) con
+    grados sorteados según 'grade_probs', y se agregan 'new_per_day' tarjetas nuevas
+    (que, como en add_card, vencen el mismo día).
+
+    Devuelve un dict con 'date' y, por día, 'mean', 'p10', 'p50', 'p90' y 'max' de las revisiones,
+    más 'new' (tarjetas nuevas revisadas) y 'samples' (matriz runs x days).
+    """
+    if days <= 0 or runs <= 0:
+        raise ValueError("'days' y 'runs' deben ser positivos")
+    probs = np.asarray(grade_probs, dtype=np.float64)
+    if probs.shape != (4,) or (probs < 0).any() or probs.sum() <= 0:
+        raise ValueError("'grade_probs' debe tener 4 probabilidades no negativas")
+    probs = probs / probs.sum()
+
+    rng = np.random.default_rng(seed)
+    now = now or datetime.now()
+    today = _start_of_day(now)
+
+    n = len(columns)
+    capacity = n + new_per_day * days # tarjetas por simulación al final del horizonte
+
+    # Vencimiento en días relativos a hoy (lo atrasado vence "hoy", día 0)
+    base_due = np.zeros(capacity, dtype=np.int32)
+    if n:
+        base_due[:n] = np.maximum(0, (columns.due - int(today.timestamp())) // 86400)
+
+    # Arrays aplanados (runs * capacity): la simulación r usa el bloque [r*capacity, (r+1)*capacity)
+    due = np.tile(base_due, runs)
+    ef = np.tile(np.concatenate([columns.easiness_factor, np.full(capacity - n, 2.5)]), runs)
+    interval = np.tile(np.concatenate([columns.interval, np.zeros(capacity - n)]), runs)
+    reps = np.tile(np.concatenate([columns.repetitions, np.zeros(capacity - n, np.int32)]), runs).astype(np.int32)
+    run_of = np.repeat(np.arange(runs), capacity)
+    slot = np.tile(np.arange(capacity), runs)
+
+    samples = np.zeros((runs, days), dtype=np.int64)
+    for day in range(days):
+        active = slot < n + new_per_day * (day + 1) # las nuevas de hoy ya existen
+        # Las tarjetas nuevas se agregan con vencimiento = día en que se crean
+        new_today = (slot >= n + new_per_day * day) & active
+        due[new_today] = day
+
+        todo = np.flatnonzero(active & (due <= day))
+        if todo.size == 0:
+            continue
+        grades = rng.choice(4, size=todo.size, p=probs)
+        new_ef, new_interval, new_reps, step = sm2_batch(ef[todo], interval[todo], reps[todo], grades)
+        ef[todo], interval[todo], reps[todo] = new_ef, new_interval, new_reps
+        due[todo] = day + np.maximum(step, 1) # 0 días se revisaría de nuevo "hoy": lo pasamos a mañana
+        samples[:, day] = np.bincount(run_of[todo], minlength=runs)
+
+    return {
+        'date': np.array([today + timedelta(days=d) for d in range(days)]),
+        'mean': samples.mean(axis=0),
+        'p10': np.percentile(samples, 10, axis=0),
+        'p50': np.percentile(samples, 50, axis=0),
+        'p90': np.percentile(samples, 90, axis=0),
+        'max': samples.max(axis=0),
+        'new': np.full(days, new_per_day),
+        'samples': samples,
+    }
+
+
+def max_sustainable_new_cards(columns: CardColumns, daily_limit: int, days: int = 60,
+                              grade_probs: Sequence[float] = DEFAULT_GRADE_PROBS,
+                              runs: int = 10, upper: int = 200, seed: Optional[int] = 0) -> int:
+    """
+    Mayor cantidad de tarjetas nuevas por día tal que el p90 de la carga en la última
+    semana del horizonte no supere 'daily_limit'. Búsqueda binaria sobre forecast_workload.
+    """
+    def fits(new_per_day: int) -> bool:
+        result = forecast_workload(columns, days=days, grade_probs=grade_probs,
+                                   new_per_day=new_per_day, runs=runs, seed=seed)
+        return bool(result['p90'][-7:].max() <= daily_limit)
+
+    if not fits(0):
+        return 0
+    low, high = 0, upper
+    while low < high:
+        mid = (low + high + 1) // 2
+        if fits(mid):
+            low = mid
+        else:
+            high = mid - 1
+    return low
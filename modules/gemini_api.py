@@ -1,24 +1,209 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+
 import streamlit as st
-import google.generativeai as genai
+
+if TYPE_CHECKING:
+    import google.generativeai as genai # Imported lazily in get_model (the SDK takes ~1s to import)
+
+from modules.instrumentation import metrics
+from modules.response_cache import ResponseCache
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+FLASHCARD_CONTEXT = """You are a USA native english professor. Give me the back of a simple flashcard (use simple markdown). The first line of your response must be the word/expression (use '####'), then give the meaning/s of the following word/expression and a few diffrent examples For example, for the word 'court' your response should look like:
+'#### court
+
+A place where legal cases are heard, or the judicial body itself.
+* The lawyer presented her arguments to the judge and jury in **court**.
+
+An area specifically prepared and marked out for playing certain ball games, like tennis, basketball, or volleyball.
+* We need to reserve the tennis **court** for an hour this afternoon.
+
+To try to win the affection, support or attention of someone, often with romantic intentions. Example:
+* In the old days, a gentleman would **court** a lady with gifts and visits before proposing marriage.
+* The candidate is trying to **court** voters in swing states with promises of tax cuts.
+
+To risk something, often something negative or undesirable.
+* By not wearing a helmet, he was actively **courting** a serious injury.
+* Her rebellious attitude always seemed to **court** controversy.'
+Do not add redundant examples. The word/expression is: """
 
 
-def askGemini(prompt: str, context: str = "") -> str:
+@st.cache_resource
+def get_model(model_name: str = MODEL_NAME) -> "genai.GenerativeModel":
+    """Configures the SDK once and returns a model instance shared by every call and session."""
+    import google.generativeai as genai
+    genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
+    return genai.GenerativeModel(model_name)
+
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """Persistent cache of generated responses, shared by every session."""
+    return ResponseCache()
+
+
+@metrics.timed("gemini.generate")
+def _generate(final_prompt: str, model: Optional["genai.GenerativeModel"] = None) -> str:
+    """Single Gemini call. Raises on failure (callers decide how to report it)."""
+    return (model or get_model()).generate_content(final_prompt).text
+
+
+@metrics.timed("gemini.ask")
+def askGemini(prompt: str, context: str = "", use_cache: bool = True) -> str:
     """
     Generates content using the Gemini API, reading the API key from a specified file.
 
     Args:
         prompt: The text prompt to send to the Gemini model.
+        use_cache: If False, skips the response cache and regenerates (the new answer is cached).
     Returns:
         The generated text response from the model, or an error message.
     """
     final_prompt = context + prompt
-    api_key = st.secrets["GEMINI_API_KEY"]
+    cache = get_response_cache()
+    key = cache.key(MODEL_NAME, context, prompt)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        response = model.generate_content(final_prompt)
-        return response.text
+        response = _generate(final_prompt)
+        cache.put(key, response) # Errors are never cached
+        return response
 
     except Exception as e:
-        return f"An unexpected error occurred during content generation: {e}"
\ No newline at end of file
+        return f"An unexpected error occurred during content generation: {e}"
+
+
+def stream_gemini(prompt: str, context: str = "", use_cache: bool = True) -> Iterator[str]:
+    """
+    Streaming version of askGemini: yields the text in chunks as the model produces them.
+
+    A cached answer is yielded as a single chunk. The full answer is cached only once the stream
+    completes; failures are raised to the caller (nothing partial should be saved).
+    Records gemini.ttft (time to the first chunk) and gemini.stream (whole generation).
+    """
+    cache = get_response_cache()
+    key = cache.key(MODEL_NAME, context, prompt)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    start = time.perf_counter()
+    chunks: List[str] = []
+    try:
+        for chunk in get_model().generate_content(context + prompt, stream=True):
+            text = chunk.text
+            if not text:
+                continue
+            if not chunks:
+                metrics.record("gemini.ttft", time.perf_counter() - start)
+            chunks.append(text)
+            yield text
+    except GeneratorExit:
+        raise # The reader stopped early (e.g. a rerun): neither an error nor a full generation
+    except Exception:
+        metrics.record("gemini.stream", time.perf_counter() - start, error=True)
+        raise
+    metrics.record("gemini.stream", time.perf_counter() - start, error=not chunks)
+    if not chunks:
+        raise ValueError("The model returned an empty response")
+    cache.put(key, "".join(chunks))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: 'rate' requests per second with bursts of up to 'capacity'."""
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _generate_with_retry(final_prompt: str, model: "genai.GenerativeModel", bucket: TokenBucket,
+                         retries: int, base_delay: float) -> str:
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            return _generate(final_prompt, model)
+        except Exception:
+            if attempt == retries:
+                raise
+            # Exponential backoff with full jitter
+            time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+
+
+def generate_backs(words: List[str], context: str = FLASHCARD_CONTEXT, max_workers: int = 16,
+                   requests_per_minute: float = 1000, retries: int = 3, base_delay: float = 1.0,
+                   use_cache: bool = True,
+                   on_result: Optional[Callable[[str, Optional[str], Optional[str]], None]] = None
+                   ) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    """
+    Generates the backs of many cards concurrently through the shared model.
+
+    Args:
+        words: Words/expressions to generate (the fronts).
+        max_workers: Maximum number of requests in flight at once.
+        use_cache: If False, every word is regenerated even if a cached answer exists.
+        requests_per_minute: Rate limit shared by all the workers.
+        on_result: Called as on_result(word, back, error) in the caller's thread
+            as each word finishes (useful for progress bars).
+    Returns:
+        {word: (back, None)} on success or {word: (None, error message)} on failure.
+    """
+    results: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+    cache = get_response_cache()
+    keys = {word: cache.key(MODEL_NAME, context, word) for word in words}
+
+    # Cached words are answered right away and never reach the API
+    pending = []
+    for word in words:
+        cached = cache.get(keys[word]) if use_cache else None
+        if cached is None:
+            pending.append(word)
+            continue
+        results[word] = (cached, None)
+        if on_result:
+            on_result(word, cached, None)
+    if not pending:
+        return results
+
+    # The model is resolved here, in the script thread, and shared with the workers
+    model = get_model()
+    bucket = TokenBucket(requests_per_minute / 60.0, capacity=max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini") as pool:
+        futures = {pool.submit(_generate_with_retry, context + word, model, bucket, retries, base_delay): word
+                   for word in pending}
+        for future in as_completed(futures):
+            word = futures[future]
+            try:
+                back, error = future.result(), None
+                cache.put(keys[word], back)
+            except Exception as e:
+                back, error = None, str(e)
+            results[word] = (back, error)
+            if on_result:
+                on_result(word, back, error)
+    return results
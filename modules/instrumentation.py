@@ -0,0 +1,244 @@
+import functools
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Latencies are bucketed on a log scale: 20 buckets per decade (~12% resolution)
+# from 10µs to 1000s. Recording is one log10 and a list increment, cheap enough to leave on.
+_MIN_SECONDS = 1e-5
+_BUCKETS_PER_DECADE = 20
+_NUM_BUCKETS = 8 * _BUCKETS_PER_DECADE + 2
+
+# Streamlit uses exceptions for st.stop()/st.rerun(); those are not errors
+_CONTROL_FLOW = ("StopException", "RerunException")
+
+
+def _bucket(seconds: float) -> int:
+    if seconds <= _MIN_SECONDS:
+        return 0
+    return min(int(math.log10(seconds / _MIN_SECONDS) * _BUCKETS_PER_DECADE) + 1, _NUM_BUCKETS - 1)
+
+
+def _bucket_upper(index: int) -> float:
+    return _MIN_SECONDS * 10 ** (index / _BUCKETS_PER_DECADE)
+
+
+class _Slice:
+    __slots__ = ("id", "counts", "count", "errors", "total", "max")
+
+    def __init__(self, slice_id: int):
+        self.id = slice_id
+        self.counts = [0] * _NUM_BUCKETS
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Histogram:
+    """
+    Rolling latency histogram: a ring of 'slices' time slices covering the last 'window' seconds.
+    Percentiles are computed from the bucket counts of the live slices.
+    """
+    def __init__(self, window: float = 600.0, slices: int = 10):
+        self.slice_seconds = window / slices
+        self._slices: List[Optional[_Slice]] = [None] * slices
+        self._lock = threading.Lock()
+        self.total_count = 0
+        self.total_errors = 0
+
+    def record(self, seconds: float, error: bool = False, now: Optional[float] = None):
+        slice_id = int((time.time() if now is None else now) // self.slice_seconds)
+        position = slice_id % len(self._slices)
+        with self._lock:
+            current = self._slices[position]
+            if current is None or current.id != slice_id:
+                current = self._slices[position] = _Slice(slice_id)
+            current.counts[_bucket(seconds)] += 1
+            current.count += 1
+            current.total += seconds
+            if seconds > current.max:
+                current.max = seconds
+            self.total_count += 1
+            if error:
+                current.errors += 1
+                self.total_errors += 1
+
+    def summary(self, now: Optional[float] = None) -> Dict[str, float]:
+        """count/errors/mean/p50/p95/p99/max (seconds) over the rolling window."""
+        oldest = int((time.time() if now is None else now) // self.slice_seconds) - len(self._slices) + 1
+        counts = [0] * _NUM_BUCKETS
+        count = errors = 0
+        total = longest = 0.0
+        with self._lock:
+            for current in self._slices:
+                if current is None or current.id < oldest:
+                    continue
+                counts = [a + b for a, b in zip(counts, current.counts)]
+                count += current.count
+                errors += current.errors
+                total += current.total
+                longest = max(longest, current.max)
+        result = {'count': count, 'errors': errors, 'mean': total / count if count else 0.0,
+                  'max': longest, 'total_count': self.total_count, 'total_errors': self.total_errors}
+        for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99)):
+            result[name] = self._percentile(counts, count, q, longest)
+        return result
+
+    @staticmethod
+    def _percentile(counts: List[int], count: int, q: float, longest: float) -> float:
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return min(_bucket_upper(index), longest)
+        return longest
+
+
+class _Timer:
+    """Context manager / decorator returned by Metrics.timed()."""
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self._metrics = metrics
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        error = exc_type is not None and exc_type.__name__ not in _CONTROL_FLOW
+        self._metrics.record(self._name, time.perf_counter() - self._start, error)
+        return False
+
+    def __call__(self, func):
+        metrics, name = self._metrics, self._name
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Timer(metrics, name):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class Metrics:
+    """
+    Process-wide registry of named latency histograms (db.select.flashcards, gemini.generate, ...).
+    Optionally appends a snapshot to a JSONL file every 'interval' seconds from a daemon thread.
+    """
+    def __init__(self, window: float = 600.0, slices: int = 10):
+        self.window = window
+        self.slices = slices
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._exporter: Optional[threading.Thread] = None
+        self.export_path: Optional[str] = None
+        self.started = time.time()
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(self.window, self.slices))
+        return histogram
+
+    def record(self, name: str, seconds: float, error: bool = False):
+        self.histogram(name).record(seconds, error)
+
+    def timed(self, name: str) -> _Timer:
+        """`with metrics.timed("x"):` or `@metrics.timed("x")`."""
+        return _Timer(self, name)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            items = sorted(self._histograms.items())
+        return [{'name': name, **histogram.summary(now)} for name, histogram in items]
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    # --- Export ---
+
+    def export(self, path: Optional[str] = None):
+        """Appends one line {'ts', 'metrics': [...]} to the JSONL file."""
+        path = path or self.export_path
+        if not path:
+            return
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        line = json.dumps({'ts': time.time(), 'metrics': self.snapshot()})
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def start_exporter(self, path: str = ".flashcards/metrics.jsonl", interval: float = 60.0):
+        """Starts the periodic export (once per process)."""
+        with self._lock:
+            self.export_path = path
+            if self._exporter is not None:
+                return
+            self._exporter = threading.Thread(target=self._export_loop, args=(interval,),
+                                              name="metrics-exporter", daemon=True)
+        self._exporter.start()
+
+    def _export_loop(self, interval: float):
+        while True:
+            time.sleep(interval)
+            try:
+                self.export()
+            except OSError as e:
+                print(f"Error exporting metrics: {e}")
+
+
+metrics = Metrics()
+
+_QUERY_OPS = frozenset(("select", "insert", "upsert", "update", "delete"))
+
+
+class _QueryProxy:
+    """Wraps a query builder so that execute() is timed as db.<op>.<table>."""
+    __slots__ = ("_query", "_table", "_op")
+
+    def __init__(self, query, table: str, op: str = "select"):
+        self._query = query
+        self._table = table
+        self._op = op
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._query, name)
+        if not callable(attr):
+            return attr
+        op = name if name in _QUERY_OPS else self._op
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return _QueryProxy(result, self._table, op) if hasattr(result, "execute") else result
+        return call
+
+    def execute(self):
+        with _Timer(metrics, f"db.{self._op}.{self._table}"):
+            return self._query.execute()
+
+
+class InstrumentedClient:
+    """Supabase/LocalClient wrapper: same table API, every execute() is recorded in 'metrics'."""
+    def __init__(self, client):
+        self.client = client
+
+    def table(self, name: str) -> _QueryProxy:
+        return _QueryProxy(self.client.table(name), name)
+
+    def rpc(self, name: str, params=None) -> _QueryProxy:
+        return _QueryProxy(self.client.rpc(name, params), name, "rpc")
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
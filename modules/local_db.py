@@ -0,0 +1,584 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# --- Esquema local ---
+# Mismas columnas que la tabla de Supabase. 'updated_at' lo pone este "servidor"
+# en cada escritura, igual que el trigger de Supabase.
+
+SCHEMAS: Dict[str, Dict[str, str]] = {
+    "flashcards": {
+        "id": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "front": "TEXT NOT NULL",
+        "back": "TEXT NOT NULL DEFAULT ''",
+        "next_review_date": "TEXT",
+        "interval": "REAL NOT NULL DEFAULT 0",
+        "easiness_factor": "REAL NOT NULL DEFAULT 2.5",
+        "repetitions": "INTEGER NOT NULL DEFAULT 0",
+        "updated_at": "TEXT",
+        "deleted": "BOOLEAN NOT NULL DEFAULT 0",
+        "user_id": "TEXT NOT NULL DEFAULT 'default'",
+        "version": "INTEGER NOT NULL DEFAULT 1",
+        "uid": "TEXT", # Identifica la tarjeta en Supabase: el id local sólo vale en este dispositivo
+    },
+    # Historial append-only: una fila por calificación
+    "review_log": {
+        "id": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "user_id": "TEXT NOT NULL DEFAULT 'default'",
+        "card_id": "INTEGER NOT NULL",
+        "grade": "INTEGER NOT NULL",
+        "reviewed_at": "TEXT NOT NULL",
+        "interval": "REAL NOT NULL DEFAULT 0",
+        "uid": "TEXT", # Lo genera el cliente: repetir el envío de una fila no la duplica
+    },
+    # Agregados por usuario y día (lo que se lee al arrancar en lugar del historial)
+    "daily_stats": {
+        "id": "INTEGER PRIMARY KEY AUTOINCREMENT",
+        "user_id": "TEXT NOT NULL DEFAULT 'default'",
+        "day": "TEXT NOT NULL",
+        "again": "INTEGER NOT NULL DEFAULT 0",
+        "hard": "INTEGER NOT NULL DEFAULT 0",
+        "good": "INTEGER NOT NULL DEFAULT 0",
+        "easy": "INTEGER NOT NULL DEFAULT 0",
+        "added": "INTEGER NOT NULL DEFAULT 0",
+    },
+}
+
+INDEXES: Dict[str, List[str]] = {
+    "flashcards": ["next_review_date", "updated_at", "user_id"],
+    "review_log": ["user_id", "card_id"],
+    "daily_stats": ["user_id"],
+}
+
+# Claves únicas (como en Supabase): son las que se pueden usar en upsert(..., on_conflict=...)
+UNIQUE_KEYS: Dict[str, List[str]] = {
+    "flashcards": ["uid"],
+    "daily_stats": ["user_id", "day"],
+    "review_log": ["uid"],
+}
+
+# Columnas con un identificador global (uuid en hex). Si una fila llega sin él se genera al insertar,
+# y las filas de bases anteriores a la columna lo reciben en la migración
+UID_COLUMNS: Dict[str, str] = {
+    "flashcards": "uid",
+    "review_log": "uid",
+}
+
+# Cómo replica cada tabla el Replicator. Los ids AUTOINCREMENT de dos dispositivos se repiten,
+# así que nunca se envían: 'flashcards' y 'review_log' van por su 'uid' (Supabase asigna su propio id)
+# y 'daily_stats' se resuelve por su clave única (aunque la app no la escribe directo: suma con
+# add_daily_stats, que se replica repitiendo la llamada).
+REPLICATION_KEYS: Dict[str, str] = {
+    "flashcards": "uid",
+    "review_log": "uid",
+    "daily_stats": "user_id,day",
+}
+# Tablas append-only: una fila que ya está en Supabase no se vuelve a escribir (ignore-duplicates)
+APPEND_ONLY = {"review_log"}
+# Columnas con el id local de otra tabla: al replicar se cambian por el id de esa fila en Supabase
+REFERENCES: Dict[str, Tuple[str, str]] = {
+    "review_log": ("card_id", "flashcards"),
+}
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class LocalResponse:
+    """Imita el APIResponse de supabase-py: sólo expone '.data'."""
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+
+
+class LocalQuery:
+    """
+    Builder con el subconjunto de la API de tablas de supabase-py que usa la app:
+    select/insert/upsert/update/delete + eq/neq/gt/gte/lt/lte/in_ + order/limit/range.
+    upsert(..., on_conflict="a,b") resuelve por esa clave única en lugar de por 'id';
+    con ignore_duplicates=True las filas que ya existen se dejan como están.
+    """
+    def __init__(self, client: "LocalClient", table: str):
+        if table not in SCHEMAS:
+            raise ValueError(f"Tabla desconocida: {table}")
+        self.client = client
+        self.table = table
+        self.columns = SCHEMAS[table]
+        self._op = "select"
+        self._select = "*"
+        self._payload: Any = None
+        self._on_conflict: List[str] = []
+        self._ignore_duplicates = False
+        self._where: List[str] = []
+        self._params: List[Any] = []
+        self._order: List[str] = []
+        self._limit: Optional[int] = None
+        self._offset: Optional[int] = None
+
+    # --- Operaciones ---
+
+    def select(self, columns: str = "*", **kwargs):
+        self._op = "select"
+        self._select = columns
+        return self
+
+    def insert(self, data, **kwargs):
+        self._op = "insert"
+        self._payload = data
+        return self
+
+    def upsert(self, data, on_conflict: str = "", ignore_duplicates: bool = False, **kwargs):
+        self._op = "upsert"
+        self._payload = data
+        self._on_conflict = [column.strip() for column in on_conflict.split(",") if column.strip()]
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: Dict[str, Any], **kwargs):
+        self._op = "update"
+        self._payload = data
+        return self
+
+    def delete(self, **kwargs):
+        self._op = "delete"
+        return self
+
+    # --- Filtros ---
+
+    def _filter(self, column: str, sql_op: str, value: Any):
+        self._where.append(f"{self._col(column)} {sql_op} ?")
+        self._params.append(value)
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, "=", value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, ">", value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, "<", value)
+
+    def lte(self, column: str, value: Any):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column: str, values):
+        values = list(values)
+        if not values:
+            self._where.append("0")
+            return self
+        self._where.append(f"{self._col(column)} IN ({', '.join('?' * len(values))})")
+        self._params.extend(values)
+        return self
+
+    def order(self, column: str, desc: bool = False, **kwargs):
+        self._order.append(f"{self._col(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size: int, **kwargs):
+        self._limit = int(size)
+        return self
+
+    def range(self, start: int, end: int, **kwargs):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    # --- Ejecución ---
+
+    def execute(self) -> LocalResponse:
+        with self.client.lock:
+            conn = self.client.conn
+            try:
+                if self._op == "select":
+                    data = self._run_select(conn)
+                elif self._op in ("insert", "upsert"):
+                    data = self._run_insert(conn, upsert=self._op == "upsert")
+                elif self._op == "update":
+                    data = self._run_update(conn)
+                else:
+                    data = self._run_delete(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return LocalResponse(data)
+
+    def _col(self, column: str) -> str:
+        column = column.strip()
+        if column not in self.columns:
+            raise ValueError(f"Columna desconocida en {self.table}: {column}")
+        return f'"{column}"'
+
+    def _where_sql(self) -> str:
+        return f" WHERE {' AND '.join(self._where)}" if self._where else ""
+
+    def _run_select(self, conn, select: Optional[str] = None, where: Optional[str] = None,
+                    params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        select = select or self._select
+        cols = "*" if select.strip() == "*" else ", ".join(self._col(c) for c in select.split(","))
+        sql = f'SELECT {cols} FROM "{self.table}"' + (self._where_sql() if where is None else where)
+        if self._order:
+            sql += " ORDER BY " + ", ".join(self._order)
+        if self._limit is not None:
+            sql += f" LIMIT {self._limit}"
+            if self._offset is not None:
+                sql += f" OFFSET {self._offset}"
+        rows = conn.execute(sql, self._params if params is None else params).fetchall()
+        return [self.client.to_dict(self.table, row) for row in rows]
+
+    def _rows_by_id(self, conn, ids: List[int]) -> List[Dict[str, Any]]:
+        if not ids:
+            return []
+        rows = conn.execute(f'SELECT * FROM "{self.table}" WHERE "id" IN ({", ".join("?" * len(ids))})',
+                            ids).fetchall()
+        return [self.client.to_dict(self.table, row) for row in rows]
+
+    def _run_insert(self, conn, upsert: bool) -> List[Dict[str, Any]]:
+        rows = self._payload if isinstance(self._payload, list) else [self._payload]
+        ids = []
+        uid_column = UID_COLUMNS.get(self.table)
+        for row in rows:
+            row = dict(row)
+            if "updated_at" in self.columns:
+                row["updated_at"] = _now_iso()
+            if uid_column and not row.get(uid_column):
+                row[uid_column] = uuid.uuid4().hex
+            cols = [self._col(c) for c in row]
+            sql = f'INSERT INTO "{self.table}" ({", ".join(cols)}) VALUES ({", ".join("?" * len(row))})'
+            if upsert and (self._on_conflict or "id" in row):
+                target = [self._col(c) for c in self._on_conflict or ["id"]]
+                updates = ", ".join(f"{c} = excluded.{c}" for c in cols if c not in target and c != '"id"')
+                action = "NOTHING" if self._ignore_duplicates or not updates else f"UPDATE SET {updates}"
+                sql += f' ON CONFLICT({", ".join(target)}) DO {action} RETURNING "id"'
+                inserted = conn.execute(sql, list(row.values())).fetchone()
+                if inserted is not None: # None: ya existía y se ignoró
+                    ids.append(inserted[0])
+                continue
+            cursor = conn.execute(sql, list(row.values()))
+            ids.append(row.get("id", cursor.lastrowid))
+        self.client.record_changes(self.table, ids, "upsert")
+        return self._rows_by_id(conn, ids)
+
+    def _run_update(self, conn) -> List[Dict[str, Any]]:
+        payload = dict(self._payload)
+        if "updated_at" in self.columns:
+            payload["updated_at"] = _now_iso()
+        ids = [r[0] for r in conn.execute(f'SELECT "id" FROM "{self.table}"' + self._where_sql(),
+                                          self._params).fetchall()]
+        if not ids:
+            return []
+        sets = ", ".join(f"{self._col(c)} = ?" for c in payload)
+        conn.execute(f'UPDATE "{self.table}" SET {sets} WHERE "id" IN ({", ".join("?" * len(ids))})',
+                     list(payload.values()) + ids)
+        self.client.record_changes(self.table, ids, "upsert")
+        return self._rows_by_id(conn, ids)
+
+    def _run_delete(self, conn) -> List[Dict[str, Any]]:
+        deleted = self._run_select(conn, select="*")
+        ids = [row["id"] for row in deleted]
+        if ids:
+            conn.execute(f'DELETE FROM "{self.table}" WHERE "id" IN ({", ".join("?" * len(ids))})', ids)
+            self.client.record_changes(self.table, ids, "delete")
+        return deleted
+
+
+def _apply_reviews(client: "LocalClient", rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Igual que la función apply_reviews de Supabase (ver flashcards_manager): un update condicional
+    por fila (id y versión), todos en la misma transacción. Devuelve {id, version} de los aplicados.
+    """
+    columns = SCHEMAS["flashcards"]
+    applied = []
+    for row in rows:
+        fields = {k: v for k, v in row.items() if k in columns and k not in ("id", "version")}
+        fields["updated_at"] = _now_iso()
+        sets = ", ".join(f'"{k}" = ?' for k in fields)
+        cursor = client.conn.execute(
+            f'UPDATE "flashcards" SET {sets}, "version" = "version" + 1 WHERE "id" = ? AND "version" = ?',
+            list(fields.values()) + [row["id"], row["version"]])
+        if cursor.rowcount:
+            applied.append({"id": row["id"], "version": row["version"] + 1})
+    client.record_changes("flashcards", [row["id"] for row in applied], "upsert")
+    return applied
+
+
+def _add_daily_stats(client: "LocalClient", rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Igual que la función add_daily_stats de Supabase: suma los contadores de cada fila a la del
+    mismo (user_id, day), o la crea. Al replicar se envía la misma llamada (los incrementos, no
+    los totales de esta base), para no pisar lo que sumaron otros dispositivos.
+    """
+    counters = [c for c in SCHEMAS["daily_stats"] if c not in ("id", "user_id", "day")]
+    cols = ", ".join(f'"{c}"' for c in ["user_id", "day"] + counters)
+    sums = ", ".join(f'"{c}" = "{c}" + excluded."{c}"' for c in counters)
+    client.conn.executemany(
+        f'INSERT INTO "daily_stats" ({cols}) VALUES ({", ".join("?" * (len(counters) + 2))}) '
+        f'ON CONFLICT("user_id", "day") DO UPDATE SET {sums}',
+        [[row["user_id"], row["day"]] + [int(row.get(c) or 0) for c in counters] for row in rows])
+    client.record_rpc("add_daily_stats", {"rows": rows})
+    return []
+
+
+# Funciones que se pueden llamar con client.rpc(nombre, parámetros), como en Supabase
+RPCS = {"apply_reviews": _apply_reviews, "add_daily_stats": _add_daily_stats}
+
+
+class LocalRpc:
+    def __init__(self, client: "LocalClient", name: str, params: Dict[str, Any]):
+        if name not in RPCS:
+            raise ValueError(f"Función desconocida: {name}")
+        self.client = client
+        self.function = RPCS[name]
+        self.params = params
+
+    def execute(self) -> LocalResponse:
+        with self.client.lock:
+            try:
+                data = self.function(self.client, **self.params)
+                self.client.conn.commit()
+            except Exception:
+                self.client.conn.rollback()
+                raise
+        return LocalResponse(data)
+
+
+class LocalClient:
+    """
+    Base de datos SQLite local (modo WAL) con la misma API de tablas que el cliente de Supabase,
+    así FlashcardsManager funciona igual con cualquiera de los dos.
+    Si 'track_changes' está activo, cada escritura deja una entrada en la tabla '_outbox'
+    para que el Replicator la envíe a Supabase en segundo plano (y las funciones que suman,
+    como add_daily_stats, su llamada en '_rpc_outbox'); con 'change_log', otra en
+    '_changes' para el LocalChangeFeed (avisos de cambios a los managers de este u otro proceso).
+    """
+    def __init__(self, path: str = ".flashcards/flashcards.db", track_changes: bool = False,
+                 change_log: bool = False):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.track_changes = track_changes
+        self.change_log = change_log
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def table(self, name: str) -> LocalQuery:
+        return LocalQuery(self, name)
+
+    def rpc(self, name: str, params: Optional[Dict[str, Any]] = None) -> LocalRpc:
+        return LocalRpc(self, name, params or {})
+
+    def _create_schema(self):
+        with self.lock:
+            for table, columns in SCHEMAS.items():
+                cols = ", ".join(f'"{name}" {ddl}' for name, ddl in columns.items())
+                self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({cols})')
+                # Migración simple: columnas nuevas del esquema que la BD todavía no tiene
+                existing = {r["name"] for r in self.conn.execute(f'PRAGMA table_info("{table}")')}
+                for name, ddl in columns.items():
+                    if name not in existing:
+                        ddl = ddl.replace("PRIMARY KEY AUTOINCREMENT", "")
+                        self.conn.execute(f'ALTER TABLE "{table}" ADD COLUMN "{name}" {ddl}')
+                if table in UID_COLUMNS:
+                    self.conn.execute(f'UPDATE "{table}" SET "{UID_COLUMNS[table]}" = lower(hex(randomblob(16))) '
+                                      f'WHERE "{UID_COLUMNS[table]}" IS NULL')
+                for column in INDEXES.get(table, []):
+                    self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_{column}" '
+                                      f'ON "{table}" ("{column}")')
+                if table in UNIQUE_KEYS:
+                    key = ", ".join(f'"{column}"' for column in UNIQUE_KEYS[table])
+                    # Bases anteriores a la clave única pueden tener repetidos: queda la última fila
+                    self.conn.execute(f'DELETE FROM "{table}" WHERE "id" NOT IN '
+                                      f'(SELECT MAX("id") FROM "{table}" GROUP BY {key})')
+                    self.conn.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "uq_{table}" ON "{table}" ({key})')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS "_outbox" ('
+                              '"seq" INTEGER PRIMARY KEY AUTOINCREMENT, "tbl" TEXT NOT NULL, '
+                              '"row_id" INTEGER NOT NULL, "op" TEXT NOT NULL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS "_rpc_outbox" ('
+                              '"seq" INTEGER PRIMARY KEY AUTOINCREMENT, "name" TEXT NOT NULL, '
+                              '"params" TEXT NOT NULL)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS "_changes" ('
+                              '"seq" INTEGER PRIMARY KEY AUTOINCREMENT, "tbl" TEXT NOT NULL, '
+                              '"row_id" INTEGER NOT NULL)')
+            self.conn.commit()
+
+    def to_dict(self, table: str, row: sqlite3.Row) -> Dict[str, Any]:
+        data = dict(row)
+        for name, ddl in SCHEMAS[table].items():
+            if ddl.startswith("BOOLEAN") and data.get(name) is not None:
+                data[name] = bool(data[name])
+        return data
+
+    def record_changes(self, table: str, ids: List[int], op: str):
+        """Anota los cambios en el outbox y/o en '_changes' (dentro de la misma transacción que la escritura)."""
+        if self.track_changes and ids:
+            self.conn.executemany('INSERT INTO "_outbox" ("tbl", "row_id", "op") VALUES (?, ?, ?)',
+                                  [(table, row_id, op) for row_id in ids])
+        if self.change_log and ids:
+            self.conn.executemany('INSERT INTO "_changes" ("tbl", "row_id") VALUES (?, ?)',
+                                  [(table, row_id) for row_id in ids])
+
+    def record_rpc(self, name: str, params: Dict[str, Any]):
+        """Anota una llamada para repetirla en Supabase (dentro de la misma transacción que la escritura)."""
+        if self.track_changes:
+            self.conn.execute('INSERT INTO "_rpc_outbox" ("name", "params") VALUES (?, ?)',
+                              (name, json.dumps(params)))
+
+    def is_empty(self, table: str) -> bool:
+        with self.lock:
+            return self.conn.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone() is None
+
+    def bulk_load(self, table: str, rows: List[Dict[str, Any]]):
+        """Carga filas tal cual (con sus ids) sin pasar por el outbox. Usado para el bootstrap."""
+        columns = SCHEMAS[table]
+        uid_column = UID_COLUMNS.get(table)
+        with self.lock:
+            for row in rows:
+                row = {k: v for k, v in row.items() if k in columns}
+                if uid_column and not row.get(uid_column):
+                    row[uid_column] = uuid.uuid4().hex
+                cols = ", ".join(f'"{c}"' for c in row)
+                self.conn.execute(f'INSERT OR REPLACE INTO "{table}" ({cols}) '
+                                  f'VALUES ({", ".join("?" * len(row))})', list(row.values()))
+            self.conn.commit()
+
+
+class Replicator:
+    """
+    Replica en segundo plano los cambios del outbox local hacia Supabase.
+    Las filas se envían por lote según REPLICATION_KEYS (upsert por 'uid' o por otra clave única,
+    sin el id local; las referencias a otra tabla se traducen con REFERENCES). Los borrados físicos
+    no se replican: la app borra tarjetas con tombstones ('deleted'), que viajan como un cambio más.
+    Cada tabla se quita del outbox apenas se replica.
+    Las llamadas anotadas en '_rpc_outbox' se repiten en Supabase una por una y en orden.
+    Si Supabase no responde, el outbox se conserva y se reintenta en la próxima vuelta.
+    """
+    def __init__(self, local: LocalClient, remote, interval: float = 5.0, batch_size: int = 500):
+        self.local = local
+        self.remote = remote
+        self.interval = interval
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="supabase-replicator", daemon=True)
+
+    def bootstrap(self, table: str = "flashcards"):
+        """Si la base local está vacía, la llena con lo que haya en Supabase (conservando ids)."""
+        if not self.local.is_empty(table):
+            return
+        try:
+            rows = self.remote.table(table).select("*").execute().data
+        except Exception as e:
+            print(f"Error al copiar Supabase a la base local: {e}")
+            return
+        self.local.bulk_load(table, rows)
+        print(f"Copiadas {len(rows)} filas de Supabase a la base local.")
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """Detiene el hilo tras un último envío."""
+        self._stop = True
+        self._wake.set()
+        self.push()
+
+    def _push_rpcs(self) -> int:
+        """Repite en Supabase las llamadas anotadas; cada una se borra apenas se aplica."""
+        with self.local.lock:
+            entries = self.local.conn.execute(
+                'SELECT "seq", "name", "params" FROM "_rpc_outbox" ORDER BY "seq" LIMIT ?',
+                (self.batch_size,)).fetchall()
+        done = 0
+        for entry in entries:
+            try:
+                self.remote.rpc(entry["name"], json.loads(entry["params"])).execute()
+            except Exception as e:
+                print(f"Error al replicar {entry['name']} en Supabase: {e}")
+                break
+            with self.local.lock:
+                self.local.conn.execute('DELETE FROM "_rpc_outbox" WHERE "seq" = ?', (entry["seq"],))
+                self.local.conn.commit()
+            done += 1
+        return done
+
+    def push(self) -> int:
+        """Envía un lote del outbox. Devuelve cuántas entradas se replicaron."""
+        return self._push_rpcs() + self._push_rows()
+
+    def _push_rows(self) -> int:
+        with self.local.lock:
+            entries = self.local.conn.execute(
+                'SELECT "seq", "tbl", "row_id", "op" FROM "_outbox" ORDER BY "seq" LIMIT ?',
+                (self.batch_size,)).fetchall()
+        if not entries:
+            return 0
+
+        # Para cada fila sólo importa la última operación
+        latest: Dict[tuple, str] = {}
+        for entry in entries:
+            latest[(entry["tbl"], entry["row_id"])] = entry["op"]
+
+        last = entries[-1]["seq"]
+        pushed = 0
+        for table in [tbl for tbl in SCHEMAS if any(t == tbl for t, _ in latest)]:
+            upserts = [row_id for (tbl, row_id), op in latest.items() if tbl == table and op == "upsert"]
+            try:
+                rows = self.local.table(table).select("*").in_("id", upserts).execute().data if upserts else []
+                if rows and table in REFERENCES:
+                    rows = self._map_references(table, rows)
+                if rows:
+                    rows = [{k: v for k, v in row.items() if k != "id"} for row in rows]
+                    self.remote.table(table).upsert(rows, on_conflict=REPLICATION_KEYS[table],
+                                                    ignore_duplicates=table in APPEND_ONLY).execute()
+            except Exception as e:
+                print(f"Error al replicar {table} en Supabase: {e}")
+                break
+            # Lo de esta tabla ya está en Supabase: si falla la siguiente, no se vuelve a enviar
+            with self.local.lock:
+                pushed += self.local.conn.execute('DELETE FROM "_outbox" WHERE "seq" <= ? AND "tbl" = ?',
+                                                  (last, table)).rowcount
+                self.local.conn.commit()
+        return pushed
+
+    def _map_references(self, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cambia el id local de la columna de REFERENCES por el de Supabase (id local -> uid -> id remoto)."""
+        column, target = REFERENCES[table]
+        uid_column = UID_COLUMNS[target]
+        uids = {row["id"]: row[uid_column] for row in self.local.table(target).select(f"id,{uid_column}")
+                .in_("id", sorted({row[column] for row in rows})).execute().data}
+        remote_ids = {}
+        if uids:
+            remote_ids = {row[uid_column]: row["id"] for row in self.remote.table(target)
+                          .select(f"id,{uid_column}").in_(uid_column, sorted(set(uids.values()))).execute().data}
+        mapped = []
+        for row in rows:
+            remote_id = remote_ids.get(uids.get(row[column]))
+            if remote_id is None:
+                print(f"Sin la fila de {target} en Supabase para {table} (id local {row[column]}); no se replica.")
+                continue
+            mapped.append({**row, column: remote_id})
+        return mapped
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop:
+                break
+            while self.push() >= self.batch_size:
+                pass # Quedan más entradas: seguir vaciando el outbox
@@ -0,0 +1,279 @@
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ReviewWriteBehind:
+    """
+    Cola write-behind para las revisiones.
+    El SM-2 se aplica en memoria al instante y los campos de scheduling se envían
+    a Supabase en lotes (un 'upsert' por intervalo o cada 'batch_size' revisiones).
+    Cada revisión se escribe antes en un journal local (append-only) para que
+    no se pierda si el proceso muere antes del siguiente flush.
+
+    Si las filas traen 'version', cada una se escribe con un update condicional
+    (... where id = ? and version = ?) en lugar del upsert: si otra sesión cambió la
+    tarjeta mientras tanto, la escritura no pisa nada y se avisa con 'on_conflict'
+    (el llamador decide si la revisión se vuelve a encolar sobre la versión nueva).
+    Todo el lote va en una sola llamada a la función 'bulk_rpc' (apply_reviews); si la BD
+    no la tiene, se vuelve a un update condicional por fila.
+
+    Además lleva el historial: cada calificación es una fila nueva de 'log_table'
+    (append-only, un único envío por flush), también protegida por el journal. Cada fila lleva
+    un 'uid' generado al calificar y se envía con upsert(..., ignore_duplicates=True) sobre él:
+    reenviar un lote que quizá llegó (timeout, crash antes de compactar el journal) no la duplica.
+    Después de cada flush se llama a 'after_flush' (p.ej. para guardar las métricas diarias).
+    """
+    def __init__(self, supabase, row_provider: Callable[[int], Optional[Dict[str, Any]]],
+                 journal_path: str = ".flashcards/review_journal.jsonl",
+                 batch_size: int = 20, flush_interval: float = 5.0,
+                 table: str = "flashcards",
+                 on_written: Optional[Callable[[int, int], None]] = None,
+                 on_conflict: Optional[Callable[[int], None]] = None,
+                 log_table: str = "review_log",
+                 bulk_rpc: Optional[str] = "apply_reviews",
+                 after_flush: Optional[Callable[[], None]] = None):
+        self.supabase = supabase
+        self.row_provider = row_provider # id -> fila completa a enviar (None si ya no existe)
+        self.on_written = on_written # (id, nueva versión) tras una escritura condicional
+        self.on_conflict = on_conflict # id cuya versión en la BD ya no era la esperada
+        self.journal_path = journal_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.table = table
+        self.log_table = log_table
+        self.bulk_rpc = bulk_rpc
+        self.after_flush = after_flush
+
+        self._pending: Dict[int, Dict[str, Any]] = {} # id -> campos de scheduling
+        self._inflight: Dict[int, Dict[str, Any]] = {} # Lote que se está enviando ahora
+        self._log: List[Dict[str, Any]] = [] # filas del historial sin enviar, en orden
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock() # un solo flush a la vez
+        self._wake = threading.Event()
+        self._closed = False
+
+        journal_dir = os.path.dirname(self.journal_path)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+        self._worker = threading.Thread(target=self._run, name="review-write-behind", daemon=True)
+        self._worker.start()
+
+    # --- API pública ---
+
+    def recover(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Lee el journal de una ejecución anterior y devuelve las revisiones no enviadas
+        (la última por tarjeta). Quedan en cola para el próximo flush.
+        """
+        recovered: Dict[int, Dict[str, Any]] = {}
+        log: List[Dict[str, Any]] = []
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        if "id" in entry:
+                            recovered[int(entry["id"])] = entry["fields"]
+                        if "log" in entry:
+                            # Journals anteriores al 'uid': se le da uno ahora (desde acá ya no cambia)
+                            entry["log"].setdefault("uid", uuid.uuid4().hex)
+                            log.append(entry["log"])
+                    except (ValueError, KeyError, TypeError):
+                        continue # Línea cortada por un crash a mitad de escritura
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            for card_id, fields in recovered.items():
+                self._pending.setdefault(card_id, fields)
+            self._log[:0] = log
+        if recovered:
+            # No despertamos al hilo: el llamador aplica los campos en memoria antes del flush
+            print(f"Recuperadas {len(recovered)} revisiones pendientes del journal.")
+        return recovered
+
+    def enqueue(self, card_id: int, fields: Dict[str, Any], log: Optional[Dict[str, Any]] = None):
+        """
+        Registra una revisión (y, si viene, su fila del historial, que se inserta y nunca se pisa).
+        No toca la red: el envío lo hace el hilo de fondo.
+        """
+        entry = {"id": card_id, "fields": fields, "ts": time.time()}
+        if log is not None:
+            entry["log"] = log
+        line = json.dumps(entry)
+        with self._lock:
+            self._journal.write(line + "\n")
+            self._journal.flush()
+            self._pending[card_id] = fields
+            if log is not None:
+                self._log.append(log)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def discard(self, card_id: int):
+        """Olvida las revisiones pendientes de una tarjeta (p.ej. porque se eliminó)."""
+        with self._lock:
+            self._pending.pop(card_id, None)
+
+    def flush_soon(self):
+        """Pide al hilo de fondo que envíe lo pendiente ya, sin esperar el intervalo ni bloquear."""
+        self._wake.set()
+
+    def is_pending(self, card_id: int) -> bool:
+        """¿Hay una revisión de la tarjeta sin confirmar (en cola o enviándose)?"""
+        with self._lock:
+            return card_id in self._pending or card_id in self._inflight
+
+    def pending(self) -> Dict[int, Dict[str, Any]]:
+        """Campos de scheduling aún no confirmados por la BD (en cola o enviándose), por id."""
+        with self._lock:
+            return {**self._inflight, **self._pending}
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending) + len(self._log)
+
+    def flush(self) -> bool:
+        """Envía todas las revisiones pendientes (un único upsert, o updates condicionales). Devuelve True si no queda nada."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+                log, self._log = self._log, []
+            if not batch and not log:
+                if self.after_flush:
+                    self.after_flush()
+                return True
+
+            log_ok = self._write_log(log)
+
+            rows = []
+            for card_id in batch:
+                row = self.row_provider(card_id)
+                if row is not None:
+                    rows.append(row)
+
+            failed = set()
+            if rows and all('version' in row for row in rows):
+                failed = self._write_conditional(rows)
+            elif rows:
+                try:
+                    self.supabase.table(self.table).upsert(rows).execute()
+                    print(f"Guardadas {len(rows)} revisiones en Supabase.")
+                except Exception as e:
+                    print(f"Error al guardar revisiones en Supabase: {e}")
+                    failed = set(batch)
+
+            with self._lock:
+                # Lo que llegó durante el envío es más nuevo: no lo pisamos
+                for card_id in failed:
+                    self._pending.setdefault(card_id, batch[card_id])
+                self._inflight = {}
+                if not log_ok:
+                    self._log[:0] = log
+                ok = not failed and log_ok
+                self._rewrite_journal()
+                done = ok and not self._pending and not self._log
+            if self.after_flush:
+                self.after_flush()
+            return done
+
+    def _write_log(self, log) -> bool:
+        """Un único envío con todas las filas nuevas del historial (las que ya estaban, por 'uid', se ignoran)."""
+        if not log:
+            return True
+        try:
+            self.supabase.table(self.log_table).upsert(log, on_conflict="uid", ignore_duplicates=True).execute()
+            return True
+        except Exception as e:
+            print(f"Error al guardar el historial de revisiones: {e}")
+            return False
+
+    def _write_conditional(self, rows) -> set:
+        """Updates condicionales de todo el lote. Devuelve los ids que hay que reintentar."""
+        if self.bulk_rpc:
+            try:
+                applied = self.supabase.rpc(self.bulk_rpc, {"rows": rows}).execute().data
+            except Exception as e:
+                failed = self._write_rows(rows)
+                if not failed:
+                    # La BD responde pero no tiene la función: no se vuelve a intentar
+                    print(f"Sin la función {self.bulk_rpc} en la BD ({e}); se usa un update por fila.")
+                    self.bulk_rpc = None
+                return failed
+            versions = {item['id']: item['version'] for item in applied}
+            self._report(versions, [row['id'] for row in rows if row['id'] not in versions])
+            return set()
+        return self._write_rows(rows)
+
+    def _report(self, versions: Dict[int, int], conflicts: List[int]):
+        if versions:
+            print(f"Guardadas {len(versions)} revisiones en Supabase.")
+        for card_id, version in versions.items():
+            if self.on_written:
+                self.on_written(card_id, version)
+        for card_id in conflicts:
+            print(f"Conflicto: la tarjeta {card_id} cambió en otra sesión; la revisión no se guardó.")
+            if self.on_conflict:
+                self.on_conflict(card_id)
+
+    def _write_rows(self, rows) -> set:
+        """Un update condicional por fila. Devuelve los ids que hay que reintentar."""
+        failed, versions, conflicts = set(), {}, []
+        for row in rows:
+            card_id, version = row['id'], row['version']
+            fields = {k: v for k, v in row.items() if k != 'id'}
+            fields['version'] = version + 1
+            try:
+                response = (self.supabase.table(self.table).update(fields)
+                            .eq("id", card_id).eq("version", version).execute())
+            except Exception as e:
+                print(f"Error al guardar la revisión de la tarjeta {card_id}: {e}")
+                failed.add(card_id)
+                continue
+            if response.data:
+                versions[card_id] = version + 1
+            else:
+                conflicts.append(card_id)
+        self._report(versions, conflicts)
+        return failed
+
+    def close(self):
+        """Flush final al terminar la sesión o el proceso."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self.flush()
+        with self._lock:
+            self._journal.close()
+
+    # --- Internos ---
+
+    def _rewrite_journal(self):
+        """Compacta el journal dejando sólo lo pendiente. Se llama con self._lock tomado."""
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for card_id, fields in self._pending.items():
+                f.write(json.dumps({"id": card_id, "fields": fields, "ts": time.time()}) + "\n")
+            for row in self._log:
+                f.write(json.dumps({"log": row, "ts": time.time()}) + "\n")
+        self._journal.close()
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._closed:
+                break
+            # Aunque no haya revisiones puede haber métricas sin guardar (after_flush)
+            if self.pending_count() or self.after_flush:
+                self.flush()
@@ -0,0 +1,209 @@
+import functools
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+GRADE_NAMES = ("again", "hard", "good", "easy")
+DAY_COLUMNS = GRADE_NAMES + ("added",)
+FORECAST_DAYS = 7
+# Estados HTTP y clases de SQLSTATE (conexión, conflicto de transacción, recursos) que se reintentan
+RETRY_STATUS = frozenset((408, 425, 429, 500, 502, 503, 504))
+RETRY_SQLSTATE = ("08", "40", "53", "57")
+MAX_SAVE_DELAY = 300.0
+
+
+def _is_transient(error: Exception) -> bool:
+    """¿Falla de red o de carga (vale la pena reintentar) y no un rechazo de la BD?"""
+    if isinstance(error, sqlite3.Error):
+        return isinstance(error, sqlite3.OperationalError) # 'database is locked'
+    status = getattr(error, "status", None) # DataAccessError (AsyncPostgrest); None si no hubo respuesta
+    if isinstance(status, int):
+        return status in RETRY_STATUS
+    code = getattr(error, "code", None) # APIError de supabase-py: SQLSTATE o código de PostgREST
+    if isinstance(code, str) and code:
+        return code.startswith(RETRY_SQLSTATE)
+    return True # Sin respuesta del servidor (conexión, timeout)
+
+
+@functools.lru_cache(maxsize=8192)
+def _local_date(quarter: int) -> date:
+    """Fecha local de un cuarto de hora (ts // 900): todos los husos horarios son múltiplos de 15 minutos."""
+    return datetime.fromtimestamp(quarter * 900).date()
+
+
+class ReviewStats:
+    """
+    Métricas de un usuario mantenidas de forma incremental: cada revisión o alta
+    actualiza contadores en O(1), sin recorrer el historial (la tabla 'review_log').
+
+    - Por día ('daily_stats', una fila por usuario y día): revisiones por nota y tarjetas añadidas.
+      Al arrancar se leen estas filas (una por día con actividad), nunca el log.
+    - Totales por nota, retención (revisiones que no fueron 'Again') y racha de días seguidos.
+    - Vencimientos por día: lo vencido de días anteriores se acumula en el balde de hoy.
+    """
+    def __init__(self, today: Optional[date] = None):
+        self.days: Dict[str, List[int]] = {} # 'YYYY-MM-DD' -> [again, hard, good, easy, added]
+        self.grades = [0, 0, 0, 0]
+        self.total = 0
+        self.streak = 0 # Días seguidos con revisiones hasta 'last_day'
+        self.longest_streak = 0
+        self.last_day: Optional[date] = None
+        self._today = today or date.today()
+        self._due: Dict[date, int] = {} # Día -> tarjetas que vencen ese día (las vencidas, en hoy)
+        self._unsaved: Dict[str, List[int]] = {} # Día -> lo sumado desde el último guardado (no el total)
+        self._failures = 0 # Guardados seguidos que fallaron por errores transitorios
+        self._retry_at = 0.0 # time.monotonic() desde el que se vuelve a intentar
+        self._lock = threading.Lock()
+
+    # --- Carga ---
+
+    def load_days(self, rows: List[Dict[str, Any]]):
+        """Arma los totales y la racha desde las filas de 'daily_stats' (una por día, no por revisión)."""
+        with self._lock:
+            for row in sorted(rows, key=lambda row: row['day']):
+                counts = [int(row.get(column) or 0) for column in DAY_COLUMNS]
+                self.days[row['day']] = counts
+                if any(counts[:4]):
+                    self._count_day(date.fromisoformat(row['day']))
+                for grade in range(4):
+                    self.grades[grade] += counts[grade]
+                self.total += sum(counts[:4])
+
+    def rebuild_due(self, timestamps):
+        """Recalcula los vencimientos por día (al cargar el mazo, que ya se recorre entero)."""
+        with self._lock:
+            self._roll(date.today())
+            self._due = {}
+            for ts in timestamps:
+                key = self._due_key(ts)
+                self._due[key] = self._due.get(key, 0) + 1
+
+    # --- Actualización incremental ---
+
+    def record_review(self, grade: int, when: Optional[datetime] = None):
+        """Una revisión: suma a la nota del día y actualiza la racha."""
+        day = (when or datetime.now()).date()
+        with self._lock:
+            self._add(day.isoformat(), grade, 1)
+            self.grades[grade] += 1
+            self.total += 1
+            self._count_day(day)
+
+    def record_added(self, count: int = 1, when: Optional[datetime] = None):
+        with self._lock:
+            self._add((when or datetime.now()).date().isoformat(), 4, count)
+
+    def move_due(self, old_ts: Optional[int], new_ts: Optional[int]):
+        """Una tarjeta cambió de vencimiento (None: no estaba / ya no está en el mazo)."""
+        with self._lock:
+            self._roll(date.today())
+            if old_ts is not None:
+                key = self._due_key(old_ts)
+                self._due[key] = self._due.get(key, 0) - 1
+                if self._due[key] <= 0:
+                    del self._due[key]
+            if new_ts is not None:
+                key = self._due_key(new_ts)
+                self._due[key] = self._due.get(key, 0) + 1
+
+    # --- Lectura ---
+
+    def current_streak(self, today: Optional[date] = None) -> int:
+        """La racha sigue viva si se revisó hoy o ayer."""
+        today = today or date.today()
+        if self.last_day is None or (today - self.last_day).days > 1:
+            return 0
+        return self.streak
+
+    def summary(self, today: Optional[date] = None) -> Dict[str, Any]:
+        """Todo lo que muestra el panel de Home, en O(1): no depende del tamaño del mazo ni del historial."""
+        today = today or date.today()
+        with self._lock:
+            self._roll(today)
+            counts = self.days.get(today.isoformat(), [0] * len(DAY_COLUMNS))
+            forecast = [(today + timedelta(days=i)).isoformat() for i in range(FORECAST_DAYS)]
+            return {
+                'total_reviews': self.total,
+                'reviews_today': sum(counts[:4]),
+                'added_today': counts[4],
+                'grades': dict(zip(GRADE_NAMES, self.grades)),
+                'retention': (self.total - self.grades[0]) / self.total if self.total else None,
+                'streak': self.current_streak(today),
+                'longest_streak': self.longest_streak,
+                'due_today': self._due.get(today, 0),
+                'due_forecast': {day: self._due.get(today + timedelta(days=i), 0)
+                                 for i, day in enumerate(forecast)},
+            }
+
+    # --- Persistencia ---
+
+    def save(self, client, user_id: str, rpc: str = "add_daily_stats"):
+        """
+        Suma a 'daily_stats' lo contado desde el último guardado, en una llamada a la función
+        'rpc' (insert ... on conflict (user_id, day) do update set x = daily_stats.x + excluded.x).
+        Cada sesión o dispositivo envía sólo sus incrementos, así que nadie pisa los de otro.
+        Se llama desde el hilo del write-behind. Los errores transitorios se reintentan con
+        backoff exponencial (los incrementos vuelven a la cola); un rechazo de la BD no, porque
+        repetirlo daría lo mismo: esos incrementos se pierden y se avisa.
+        """
+        with self._lock:
+            if not self._unsaved or time.monotonic() < self._retry_at:
+                return
+            unsaved, self._unsaved = self._unsaved, {}
+        rows = [{'user_id': user_id, 'day': day, **dict(zip(DAY_COLUMNS, counts))}
+                for day, counts in sorted(unsaved.items())]
+        try:
+            client.rpc(rpc, {"rows": rows}).execute()
+        except Exception as e:
+            with self._lock:
+                if not _is_transient(e):
+                    print(f"Error al guardar las métricas diarias (no se reintenta): {e}")
+                    return
+                self._failures += 1
+                delay = min(MAX_SAVE_DELAY, 2.0 ** self._failures)
+                self._retry_at = time.monotonic() + delay
+                for day, counts in unsaved.items():
+                    pending = self._unsaved.setdefault(day, [0] * len(DAY_COLUMNS))
+                    for i, count in enumerate(counts):
+                        pending[i] += count
+            print(f"Error al guardar las métricas diarias (reintento en {delay:.0f} s): {e}")
+            return
+        with self._lock:
+            self._failures = 0
+            self._retry_at = 0.0
+
+    # --- Internos (con self._lock tomado) ---
+
+    def _add(self, day: str, column: int, count: int):
+        """Suma al total del día y a lo que falta guardar."""
+        for counts in (self.days, self._unsaved):
+            if day not in counts:
+                counts[day] = [0] * len(DAY_COLUMNS)
+            counts[day][column] += count
+
+    def _count_day(self, day: date):
+        if self.last_day is not None and day <= self.last_day:
+            return # Ya contado (o una revisión con fecha anterior)
+        gap = (day - self.last_day).days if self.last_day is not None else None
+        self.streak = self.streak + 1 if gap == 1 else 1
+        self.longest_streak = max(self.longest_streak, self.streak)
+        self.last_day = day
+
+    def _due_key(self, ts: int) -> date:
+        day = _local_date(ts // 900) if ts else self._today
+        return max(day, self._today)
+
+    def _roll(self, today: date):
+        """Al cambiar el día, lo que vencía en los días que pasaron se suma al balde de hoy."""
+        if today <= self._today:
+            return
+        overdue = self._due.pop(self._today, 0)
+        day = self._today + timedelta(days=1)
+        while day <= today:
+            overdue += self._due.pop(day, 0)
+            day += timedelta(days=1)
+        self._today = today
+        if overdue:
+            self._due[today] = self._due.get(today, 0) + overdue
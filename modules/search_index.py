@@ -0,0 +1,141 @@
+import bisect
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules.dedupe import stem
+
+# --- Búsqueda de texto completo ---
+# Índice invertido sobre 'front' y 'back' (markdown) con ranking BM25.
+# Se mantiene incrementalmente (add/update/remove), así buscar no recorre el mazo:
+# sólo las listas de postings de los términos de la consulta.
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset("""a an and are as at be but by for from has have he her his i in is it its
+of on or she that the their them they this to was were will with you your""".split())
+
+FRONT_WEIGHT = 3 # Una coincidencia en el 'front' vale como 3 en el 'back'
+
+
+@lru_cache(maxsize=1 << 16)
+def _term(token: str) -> str:
+    return stem(token.strip("'"))
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sin markdown ni puntuación, sin stopwords y con raíces (court/courting -> court)."""
+    return [_term(token) for token in _TOKEN_RE.findall(text.casefold())
+            if token not in _STOPWORDS and token.strip("'")]
+
+
+class SearchIndex:
+    """Índice invertido con BM25 y expansión por prefijo de la última palabra (búsqueda mientras se escribe)."""
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_prefix_terms: int = 50):
+        self.k1 = k1
+        self.b = b
+        self.max_prefix_terms = max_prefix_terms
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict) # término -> {id: frecuencia}
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+        self._vocabulary: List[str] = [] # ordenado, para buscar por prefijo
+        self._vocabulary_dirty = False
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    # --- Mantenimiento ---
+
+    def add(self, card_id: int, front: str, back: str):
+        if card_id in self._doc_terms:
+            self.remove(card_id)
+        terms = Counter()
+        for term in tokenize(front):
+            terms[term] += FRONT_WEIGHT
+        terms.update(tokenize(back or ""))
+        self._doc_terms[card_id] = terms
+        length = sum(terms.values())
+        self._doc_len[card_id] = length
+        self._total_len += length
+        for term, freq in terms.items():
+            postings = self._postings[term]
+            if not postings:
+                self._vocabulary_dirty = True
+            postings[card_id] = freq
+
+    update = add
+
+    def remove(self, card_id: int):
+        terms = self._doc_terms.pop(card_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(card_id)
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(card_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_dirty = True
+
+    # --- Consultas ---
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        terms = []
+        for term in self._vocabulary[start:start + self.max_prefix_terms]:
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query: str, limit: Optional[int] = 50,
+               keep: Optional[Callable[[int], bool]] = None) -> List[Tuple[int, float]]:
+        """
+        Devuelve [(id, puntaje)] ordenado por relevancia.
+        La última palabra también se busca como prefijo ("cour" encuentra "court").
+        'keep' filtra los candidatos (fecha, intervalo, EF...) antes de ordenarlos.
+        """
+        raw_tokens = _TOKEN_RE.findall(query.casefold())
+        terms = tokenize(query)
+        if not raw_tokens:
+            return []
+        groups = [[term] for term in terms]
+        # Mientras se escribe, la última palabra puede estar incompleta
+        if not query[-1:].isspace() and raw_tokens[-1] not in _STOPWORDS:
+            prefix_terms = self._expand_prefix(raw_tokens[-1])
+            if prefix_terms:
+                if groups and terms[-1] == _term(raw_tokens[-1]):
+                    groups[-1] = sorted(set(groups[-1]) | set(prefix_terms))
+                else:
+                    groups.append(prefix_terms)
+        if not groups:
+            return []
+
+        n_docs = max(len(self._doc_terms), 1)
+        avg_len = self._total_len / n_docs if self._total_len else 1.0
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        for group in groups:
+            group_hits = set()
+            for term in group:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for card_id, freq in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[card_id] / avg_len)
+                    scores[card_id] += idf * freq * (self.k1 + 1) / (freq + norm)
+                    group_hits.add(card_id)
+            for card_id in group_hits:
+                matched[card_id] += 1
+
+        # Todas las palabras de la consulta tienen que aparecer (AND)
+        results = [(card_id, score) for card_id, score in scores.items()
+                   if matched[card_id] == len(groups) and (keep is None or keep(card_id))]
+        results.sort(key=lambda item: -item[1])
+        return results if limit is None else results[:limit]
@@ -0,0 +1,284 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# --- Snapshot binario del mazo (.fcs) ---
+# Para arrancar sin descargar el mazo entero y como backup/restore rápido.
+#
+#   [cabecera]  MAGIC (8 bytes) + '<HHI': versión del formato, flags, largo del JSON de metadatos
+#   [metadatos] JSON: usuario, marca de agua, cantidad, tamaño de bloque y secciones (offset, largo)
+#   [columnas]  arrays de ancho fijo, ordenados por id y alineados a 8 bytes: se leen con mmap
+#               sin copiar (id, due, interval, easiness_factor, repetitions, version)
+#   [textos]    'front' y 'back' en secciones aparte, comprimidos (zlib) en bloques de
+#               'block_size' tarjetas: una tabla de offsets y después los bloques. Cada bloque
+#               descomprimido es '<I' * k con los largos en bytes y luego los textos UTF-8 seguidos.
+#
+# Los 'back' se leen a pedido, un bloque por vez: abrir un snapshot no descomprime nada.
+
+MAGIC = b"FCSNAP\x00\x01"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<HHI")
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("id", "<i8"),
+    ("due", "<i8"), # epoch en segundos (Flashcard.due)
+    ("interval", "<f8"),
+    ("easiness_factor", "<f8"),
+    ("repetitions", "<i4"),
+    ("version", "<i4"),
+)
+TEXT_FIELDS = ("front", "back")
+
+
+class SnapshotError(Exception):
+    """El archivo no es un snapshot válido (o es de una versión del formato que no se conoce)."""
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+def _pack_block(texts: Sequence[str], level: int) -> bytes:
+    encoded = [text.encode("utf-8") for text in texts]
+    lengths = struct.pack(f"<{len(encoded)}I", *(len(data) for data in encoded))
+    return zlib.compress(lengths + b"".join(encoded), level)
+
+
+def _unpack_block(data: bytes, count: int) -> List[str]:
+    raw = zlib.decompress(data)
+    lengths = struct.unpack_from(f"<{count}I", raw)
+    texts, offset = [], 4 * count
+    for length in lengths:
+        texts.append(raw[offset:offset + length].decode("utf-8"))
+        offset += length
+    return texts
+
+
+def write_snapshot(path: str, rows: Iterable[Tuple], user_id: str, watermark: Optional[str] = None,
+                   block_size: int = 256, level: int = 1) -> int:
+    """
+    Escribe un snapshot. 'rows' son tuplas (id, front, back, due, interval, easiness_factor,
+    repetitions, version) ordenadas por id; se consumen de a un bloque, así que pueden venir
+    de un generador que va pidiendo los 'back' a la BD por lotes.
+    Se escribe a un temporal y se renombra: quien lea el archivo nunca ve uno a medio escribir.
+    zlib nivel 1: comprime ~4 veces más rápido que el 6 y el archivo queda ~35% más grande.
+    Devuelve el tamaño en bytes.
+    """
+    columns: Dict[str, list] = {name: [] for name, _ in COLUMNS}
+    blocks: Dict[str, List[bytes]] = {field: [] for field in TEXT_FIELDS}
+    pending: Dict[str, List[str]] = {field: [] for field in TEXT_FIELDS}
+
+    def close_block():
+        for field in TEXT_FIELDS:
+            if pending[field]:
+                blocks[field].append(_pack_block(pending[field], level))
+                pending[field] = []
+
+    for card_id, front, back, due, interval, easiness_factor, repetitions, version in rows:
+        for name, value in zip(("id", "due", "interval", "easiness_factor", "repetitions", "version"),
+                               (card_id, due, interval, easiness_factor, repetitions, version)):
+            columns[name].append(value)
+        pending["front"].append(front or "")
+        pending["back"].append(back or "")
+        if len(pending["front"]) == block_size:
+            close_block()
+    close_block()
+
+    count = len(columns["id"])
+    arrays = {name: np.asarray(columns[name], dtype=dtype) for name, dtype in COLUMNS}
+    if count > 1 and np.any(np.diff(arrays["id"]) <= 0):
+        raise ValueError("Las filas del snapshot tienen que venir ordenadas por id (sin repetidos)")
+
+    # Secciones: offsets relativos al final de la cabecera + metadatos (que tienen largo variable)
+    sections: Dict[str, List[int]] = {}
+    payload: List[bytes] = []
+    offset = 0
+    for name, _ in COLUMNS:
+        data = arrays[name].tobytes()
+        sections[name] = [offset, len(data)]
+        payload += [data, b"\x00" * _pad(len(data))]
+        offset += len(data) + _pad(len(data))
+    for field in TEXT_FIELDS:
+        table = np.cumsum([0] + [len(block) for block in blocks[field]], dtype="<u8")
+        data = table.tobytes() + b"".join(blocks[field])
+        sections[field] = [offset, len(data)]
+        payload += [data, b"\x00" * _pad(len(data))]
+        offset += len(data) + _pad(len(data))
+
+    column_bytes = b"".join(payload[:2 * len(COLUMNS)])
+    meta = json.dumps({
+        'user_id': user_id, 'watermark': watermark, 'count': count, 'created_at': time.time(),
+        'block_size': block_size, 'codec': "zlib", 'sections': sections,
+        'columns_crc32': zlib.crc32(column_bytes),
+    }).encode("utf-8")
+    meta += b" " * _pad(len(MAGIC) + _HEADER.size + len(meta)) # Las columnas quedan alineadas a 8
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC + _HEADER.pack(FORMAT_VERSION, 0, len(meta)) + meta)
+            for data in payload:
+                f.write(data)
+            size = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return size
+
+
+class DeckSnapshot:
+    """
+    Snapshot abierto con mmap. Las columnas (self.ids, self.due, ...) son arrays de numpy
+    sobre el archivo, sin copiar. Los textos se descomprimen por bloque y se guardan
+    los últimos 'cached_blocks' bloques leídos.
+    """
+    def __init__(self, path: str, cached_blocks: int = 8):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Archivo vacío
+            self._file.close()
+            raise SnapshotError(f"{path}: archivo vacío") from None
+        self._blocks: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+        self._cached_blocks = cached_blocks
+        self._lock = threading.Lock()
+        try:
+            self._parse()
+        except SnapshotError:
+            self.close()
+            raise
+        except (KeyError, TypeError, ValueError, struct.error) as e: # Metadatos incompletos o corruptos
+            self.close()
+            raise SnapshotError(f"{path}: snapshot inválido ({e!r})") from None
+
+    def _parse(self):
+        mm = self._mm
+        if mm[:len(MAGIC)] != MAGIC:
+            raise SnapshotError(f"{self.path}: no es un snapshot de flashcards")
+        version, _, meta_len = _HEADER.unpack_from(mm, len(MAGIC))
+        if version != FORMAT_VERSION:
+            raise SnapshotError(f"{self.path}: versión de formato {version} no soportada")
+        start = len(MAGIC) + _HEADER.size
+        try:
+            self.meta: Dict[str, Any] = json.loads(mm[start:start + meta_len].decode("utf-8"))
+        except ValueError as e:
+            raise SnapshotError(f"{self.path}: metadatos ilegibles ({e})") from None
+        self._base = start + meta_len
+        self.count: int = self.meta['count']
+        self.block_size: int = self.meta['block_size']
+        sections = self.meta['sections']
+        if self._base + max(offset + length for offset, length in sections.values()) > len(mm):
+            raise SnapshotError(f"{self.path}: archivo truncado")
+
+        first, _ = sections[COLUMNS[0][0]]
+        last, last_len = sections[COLUMNS[-1][0]]
+        if zlib.crc32(mm[self._base + first:self._base + last + last_len + _pad(last_len)]) \
+                != self.meta['columns_crc32']:
+            raise SnapshotError(f"{self.path}: las columnas no coinciden con su checksum")
+        for name, dtype in COLUMNS:
+            offset, _ = sections[name]
+            setattr(self, "ids" if name == "id" else name,
+                    np.frombuffer(mm, dtype=dtype, count=self.count, offset=self._base + offset))
+        self._tables = {}
+        for field in TEXT_FIELDS:
+            offset, _ = sections[field]
+            blocks = -(-self.count // self.block_size)
+            self._tables[field] = np.frombuffer(mm, dtype="<u8", count=blocks + 1, offset=self._base + offset)
+
+    @property
+    def user_id(self) -> str:
+        return self.meta['user_id']
+
+    @property
+    def watermark(self) -> Optional[str]:
+        return self.meta.get('watermark')
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Primero los arrays: mientras haya vistas sobre el mmap no se puede cerrar
+        for name in ("ids", "due", "interval", "easiness_factor", "repetitions", "version", "_tables"):
+            self.__dict__.pop(name, None)
+        try:
+            self._mm.close()
+        except BufferError:
+            pass # Alguien conserva una vista de las columnas: se libera con ella
+        self._file.close()
+
+    # --- Textos ---
+
+    def _block(self, field: str, block: int) -> List[str]:
+        key = (field, block)
+        with self._lock:
+            texts = self._blocks.get(key)
+            if texts is not None:
+                self._blocks.move_to_end(key)
+                return texts
+        table = self._tables[field]
+        start = self._base + self.meta['sections'][field][0] + table.nbytes
+        count = min(self.block_size, self.count - block * self.block_size)
+        try:
+            texts = _unpack_block(self._mm[start + int(table[block]):start + int(table[block + 1])], count)
+        except (zlib.error, struct.error, UnicodeDecodeError) as e:
+            raise SnapshotError(f"{self.path}: bloque {block} de '{field}' dañado ({e})") from None
+        with self._lock:
+            self._blocks[key] = texts
+            while len(self._blocks) > self._cached_blocks:
+                self._blocks.popitem(last=False)
+        return texts
+
+    def texts(self, field: str) -> Iterator[str]:
+        """Todos los textos de un campo, en el orden de las columnas (bloque a bloque, sin cachearlos)."""
+        table = self._tables[field]
+        start = self._base + self.meta['sections'][field][0] + table.nbytes
+        for block in range(len(table) - 1):
+            count = min(self.block_size, self.count - block * self.block_size)
+            yield from _unpack_block(self._mm[start + int(table[block]):start + int(table[block + 1])], count)
+
+    def positions(self, card_ids: Sequence[int]) -> np.ndarray:
+        """Posición de cada id en las columnas (-1 si no está): búsqueda binaria sobre los ids ordenados."""
+        card_ids = np.asarray(card_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, card_ids)
+        found = positions < self.count
+        found[found] = self.ids[positions[found]] == card_ids[found]
+        return np.where(found, positions, -1)
+
+    def backs(self, card_ids: Sequence[int], versions: Optional[Sequence[int]] = None) -> Dict[int, str]:
+        """
+        Los 'back' de las tarjetas que están en el snapshot. Con 'versions', sólo los de las que
+        siguen en la misma versión (si la tarjeta cambió después, su 'back' puede estar viejo).
+        """
+        result = {}
+        for i, position in enumerate(self.positions(card_ids).tolist()):
+            if position < 0 or (versions is not None and int(self.version[position]) != versions[i]):
+                continue
+            block, index = divmod(position, self.block_size)
+            result[int(card_ids[i])] = self._block("back", block)[index]
+        return result
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Cada tarjeta como dict (con 'due' como timestamp y el 'back'), para restaurar."""
+        columns = [(name, getattr(self, "ids" if name == "id" else name)) for name, _ in COLUMNS]
+        for position, (front, back) in enumerate(zip(self.texts("front"), self.texts("back"))):
+            row = {name: values[position].item() for name, values in columns}
+            row['front'], row['back'] = front, back
+            yield row
@@ -0,0 +1,129 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from modules.instrumentation import metrics
+
+
+class TTSCache:
+    """
+    Content-addressed cache for gTTS audio.
+    Entries are keyed by (text, lang, slow). Hot entries live in memory (already base64-encoded,
+    ready for the <audio> tag); everything else is stored as MP3 files on disk with LRU
+    eviction once the directory grows past 'max_bytes'.
+    """
+    def __init__(self, directory: str = ".flashcards/tts", max_bytes: int = 50 * 1024 * 1024,
+                 memory_items: int = 64, workers: int = 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, str]" = OrderedDict() # key -> base64 mp3
+        self._inflight: dict = {} # key -> Future, so a click during a prefetch waits for it
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts-prefetch")
+
+        # Disk index in LRU order (oldest first), rebuilt from file mtimes
+        files = [entry for entry in os.scandir(directory) if entry.name.endswith(".mp3")]
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        self._disk: "OrderedDict[str, int]" = OrderedDict(
+            (entry.name[:-4], entry.stat().st_size) for entry in files)
+        self._disk_bytes = sum(self._disk.values())
+
+    @staticmethod
+    def key(text: str, lang: str = "en", slow: bool = False) -> str:
+        return hashlib.sha256(f"{lang}\0{int(slow)}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_base64(self, text: str, lang: str = "en", slow: bool = False) -> str:
+        """Returns the base64-encoded MP3 for 'text', synthesizing it only on a cache miss."""
+        key = self.key(text, lang, slow)
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                return cached
+        return self._load(key, text, lang, slow).result()
+
+    def prefetch(self, texts: Iterable[str], lang: str = "en", slow: bool = False):
+        """Synthesizes upcoming texts in the background so playback starts immediately."""
+        for text in texts:
+            if not text:
+                continue
+            key = self.key(text, lang, slow)
+            with self._lock:
+                if key in self._memory:
+                    continue
+            self._load(key, text, lang, slow)
+
+    def _load(self, key: str, text: str, lang: str, slow: bool) -> Future:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._pool.submit(self._fetch, key, text, lang, slow)
+                self._inflight[key] = future
+        return future
+
+    def _fetch(self, key: str, text: str, lang: str, slow: bool) -> str:
+        try:
+            audio = self._read_disk(key)
+            if audio is None:
+                audio = self._synthesize(text, lang, slow)
+                self._write_disk(key, audio)
+            encoded = base64.b64encode(audio).decode("utf-8")
+            with self._lock:
+                self._memory[key] = encoded
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.memory_items:
+                    self._memory.popitem(last=False)
+            return encoded
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    @staticmethod
+    def _synthesize(text: str, lang: str, slow: bool) -> bytes:
+        from gtts import gTTS # Imported on first synthesis, not when the page loads
+        audio_bytes = io.BytesIO()
+        with metrics.timed("tts.synthesize"):
+            gTTS(text=text, lang=lang, slow=slow).write_to_fp(audio_bytes)
+        return audio_bytes.getvalue()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".mp3")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            if key not in self._disk:
+                return None
+            self._disk.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                audio = f.read()
+            os.utime(self._path(key)) # Keeps the LRU order across restarts
+            return audio
+        except OSError:
+            with self._lock:
+                self._disk_bytes -= self._disk.pop(key, 0)
+            return None
+
+    def _write_disk(self, key: str, audio: bytes):
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._disk_bytes += len(audio) - self._disk.pop(key, 0)
+            self._disk[key] = len(audio)
+            while self._disk_bytes > self.max_bytes and len(self._disk) > 1:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
@@ -1,13 +1,228 @@
+import argparse
 import json
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
 import streamlit as st
 from supabase import create_client, Client
-import sys
 
-def upload_data():
+# Columnas que se aceptan del archivo (el 'id' lo genera Supabase)
+IMPORT_FIELDS = {
+    'front': str,
+    'back': str,
+    'next_review_date': str,
+    'interval': (int, float),
+    'easiness_factor': (int, float),
+    'repetitions': int,
+}
+
+
+def iter_records(path: str, chunk_bytes: int = 1 << 16) -> Iterator[Any]:
+    """
+    Lee un arreglo JSON ('[{...}, {...}]') o un archivo JSONL de forma incremental,
+    sin cargarlo entero en memoria. Devuelve los objetos de a uno.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_bytes).lstrip()
+        if not buffer:
+            return
+        if not buffer.startswith('['):
+            # JSONL: un objeto por línea
+            f.seek(0)
+            for line_number, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        raise ValueError(f"Línea {line_number} inválida: {e}")
+            return
+
+        buffer = buffer[1:]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except ValueError:
+                # Objeto cortado al final del buffer: leer más
+                if eof:
+                    raise ValueError("El JSON termina a mitad de un objeto")
+                more = f.read(chunk_bytes)
+                eof = not more
+                buffer += more
+                continue
+            yield obj
+            buffer = buffer[end:]
+            if len(buffer) < chunk_bytes and not eof:
+                more = f.read(chunk_bytes)
+                eof = not more
+                buffer += more
+
+
+def validate_record(record: Any) -> Optional[Dict[str, Any]]:
+    """Devuelve la fila limpia para insertar, o None si el registro no es una tarjeta válida."""
+    if not isinstance(record, dict):
+        return None
+    row = {}
+    for key, expected in IMPORT_FIELDS.items():
+        if record.get(key) is None:
+            continue
+        value = record[key]
+        if isinstance(value, bool) or not isinstance(value, expected):
+            return None
+        row[key] = value
+    if not row.get('front', '').strip() or 'back' not in row:
+        return None
+    return row
+
+
+def _normalize_front(front: str) -> str:
+    return " ".join(front.casefold().split())
+
+
+class Checkpoint:
+    """Guarda cuántos registros del archivo ya se subieron, para retomar una importación cortada."""
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> int:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return int(json.load(f)['records_done'])
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0
+
+    def save(self, records_done: int):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'records_done': records_done, 'saved_at': time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _existing_fronts(supabase: Client, rows: List[Dict[str, Any]], user_id: Optional[str],
+                     page_size: int = 100) -> set:
+    """'front' de las filas del lote que ya están en la tabla (por partes, para no armar URLs enormes)."""
+    fronts = [row['front'] for row in rows]
+    found = set()
+    for start in range(0, len(fronts), page_size):
+        query = supabase.table("flashcards").select("front").in_("front", fronts[start:start + page_size])
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        found.update(row['front'] for row in query.execute().data)
+    return found
+
+
+def _insert_with_retry(supabase: Client, rows: List[Dict[str, Any]], retries: int,
+                       check_existing: bool = False, user_id: Optional[str] = None) -> int:
     """
-    Script de una sola vez para leer flashcards.json y subirlo a Supabase.
+    Inserta el lote y devuelve cuántas filas se insertaron. Un insert que falló (p.ej. por timeout)
+    pudo haber llegado igual: antes de reintentar, y con 'check_existing' (primer lote al retomar,
+    que pudo subirse justo antes del corte), se descartan las filas que ya están en la tabla.
     """
-    
+    for attempt in range(retries + 1):
+        try:
+            if attempt or check_existing:
+                existing = _existing_fronts(supabase, rows, user_id)
+                if existing:
+                    print(f"{len(existing)} filas del lote ya estaban en la tabla: no se vuelven a subir.")
+                    rows = [row for row in rows if row['front'] not in existing]
+                if not rows:
+                    return 0
+            supabase.table("flashcards").insert(rows).execute()
+            return len(rows)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = random.uniform(0, 2 ** attempt)
+            print(f"Error al subir un lote ({e}). Reintentando en {delay:.1f}s...")
+            time.sleep(delay)
+
+
+def import_cards(supabase: Client, path: str, chunk_size: int = 500, retries: int = 5,
+                 skip_existing: bool = False, resume: bool = True,
+                 user_id: Optional[str] = None) -> Dict[str, float]:
+    """
+    Sube el archivo por lotes de 'chunk_size' filas. Después de cada lote guarda un checkpoint
+    ('<path>.checkpoint.json'), así una importación interrumpida sigue desde donde quedó
+    sin volver a subir el lote que quizás llegó antes del corte.
+    Con 'user_id' las tarjetas van al mazo de ese usuario (si no, al mazo por defecto).
+    Devuelve un resumen con filas subidas, inválidas, duplicadas y filas por segundo.
+    """
+    checkpoint = Checkpoint(path + '.checkpoint.json')
+    start_at = checkpoint.load() if resume else 0
+    if start_at:
+        print(f"Retomando la importación desde el registro {start_at}.")
+
+    seen = set()
+    if skip_existing:
+        # Una sola consulta liviana (sólo 'front') para no duplicar lo que ya está en la tabla
+        query = supabase.table("flashcards").select("front")
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        existing = query.execute().data
+        seen.update(_normalize_front(row['front']) for row in existing)
+
+    stats = {'uploaded': 0, 'invalid': 0, 'duplicates': 0}
+    batch: List[Dict[str, Any]] = []
+    records_done = 0
+    started = time.monotonic()
+    # Si se cortó entre el insert y el checkpoint, el primer lote al retomar ya está en la tabla
+    check_existing = [bool(start_at)]
+
+    def flush():
+        stats['uploaded'] += _insert_with_retry(supabase, batch, retries, check_existing[0], user_id)
+        check_existing[0] = False
+        checkpoint.save(records_done)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print(f"  {stats['uploaded']} filas subidas ({stats['uploaded'] / elapsed:.0f} filas/s)")
+        batch.clear()
+
+    for record in iter_records(path):
+        records_done += 1
+        row = validate_record(record)
+        if row is None:
+            if records_done > start_at:
+                stats['invalid'] += 1
+            continue
+        front = _normalize_front(row['front'])
+        if front in seen:
+            if records_done > start_at:
+                stats['duplicates'] += 1
+            continue
+        seen.add(front) # También para lo ya subido, así el dedupe sigue valiendo al retomar
+        if records_done <= start_at:
+            continue
+        if user_id is not None:
+            row['user_id'] = user_id
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            flush()
+    if batch:
+        flush()
+
+    checkpoint.clear()
+    elapsed = max(time.monotonic() - started, 1e-9)
+    stats['seconds'] = elapsed
+    stats['rows_per_second'] = stats['uploaded'] / elapsed
+    return stats
+
+
+def upload_data(path: str = 'flashcards.json', chunk_size: int = 500, retries: int = 5,
+                skip_existing: bool = False, resume: bool = True, user_id: Optional[str] = None):
+    """
+    Script para leer flashcards.json (arreglo JSON o JSONL) y subirlo a Supabase por lotes.
+    """
+
     # --- 1. Conectarse a Supabase ---
     print("Conectando a Supabase...")
     try:
@@ -20,42 +235,33 @@ def upload_data():
         print(f"Error: {e}")
         sys.exit(1) # Salir del script si falla la conexión
 
-    # --- 2. Leer el archivo JSON local ---
-    print("Leyendo 'flashcards.json'...")
-    try:
-        with open('flashcards.json', 'r', encoding='utf-8') as f:
-            data_to_upload = json.load(f)
-        
-        if not isinstance(data_to_upload, list):
-             print("Error: El JSON no es una lista de tarjetas.")
-             sys.exit(1)
-             
-        print(f"Se encontraron {len(data_to_upload)} tarjetas para subir.")
-        
-    except FileNotFoundError:
-        print("Error: No se encontró el archivo 'flashcards.json' en este directorio.")
-        sys.exit(1)
-    except Exception as e:
-        print(f"Error al leer el JSON: {e}")
+    # --- 2. Leer y subir el archivo por partes ---
+    if not os.path.exists(path):
+        print(f"Error: No se encontró el archivo '{path}' en este directorio.")
         sys.exit(1)
 
-    # --- 3. Subir los datos a Supabase ---
-    # Usamos .insert() con la lista completa. 
-    # Supabase es lo suficientemente inteligente para manejarlo como un lote.
-    print("Iniciando subida a la tabla 'flashcards'...")
+    print(f"Importando '{path}' a la tabla 'flashcards' en lotes de {chunk_size}...")
     try:
-        response = supabase.table("flashcards").insert(data_to_upload).execute()
-        
-        # 'response.data' contendrá los datos insertados
-        if response.data:
-            print(f"¡ÉXITO! Se subieron {len(response.data)} tarjetas a Supabase.")
-        else:
-            print("La subida se completó, pero Supabase no devolvió datos. Revisa la tabla.")
-            if response.error:
-                print(f"Error de Supabase: {response.error}")
-
+        stats = import_cards(supabase, path, chunk_size=chunk_size, retries=retries,
+                             skip_existing=skip_existing, resume=resume, user_id=user_id)
     except Exception as e:
         print(f"Error durante la subida a Supabase: {e}")
-        
+        print("El progreso quedó guardado: vuelve a ejecutar el script para continuar.")
+        sys.exit(1)
+
+    print(f"¡ÉXITO! Se subieron {stats['uploaded']} tarjetas en {stats['seconds']:.1f}s "
+          f"({stats['rows_per_second']:.0f} filas/s). "
+          f"Inválidas: {stats['invalid']}, duplicadas: {stats['duplicates']}.")
+
+
 if __name__ == "__main__":
-    upload_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Importa tarjetas a Supabase por lotes.")
+    parser.add_argument("path", nargs="?", default="flashcards.json", help="Arreglo JSON o archivo JSONL")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--skip-existing", action="store_true", help="No subir tarjetas cuyo 'front' ya existe")
+    parser.add_argument("--restart", action="store_true", help="Ignorar el checkpoint y empezar de cero")
+    parser.add_argument("--user", default=None, help="Usuario dueño de las tarjetas (user_id)")
+    args = parser.parse_args()
+    upload_data(args.path, args.chunk_size, args.retries, args.skip_existing, resume=not args.restart,
+                user_id=args.user)
@@ -1,16 +1,39 @@
 import streamlit as st
-from gtts import gTTS
-import io
-import base64
 import random
 import modules.flashcards_manager as fm
 from modules.gemini_api import askGemini
+from modules.tts_cache import TTSCache
+from modules.instrumentation import metrics
 from datetime import datetime
 
+PREFETCH_AUDIO_CARDS = 3
+PREFETCH_BACKS = 10 # Respuestas de las próximas tarjetas que se traen junto con la actual
+
+@st.cache_resource
+def get_tts_cache() -> TTSCache:
+    """One audio cache per server process, shared by every session."""
+    return TTSCache()
+
+def prefetch_audio(texts):
+    """Synthesizes the audio of the next cards in the background."""
+    get_tts_cache().prefetch(texts)
+
+@st.cache_resource
+def start_metrics_export():
+    """Periodic export of the latency metrics to a JSONL file (once per server process)."""
+    config = st.secrets.get("metrics", {})
+    metrics.start_exporter(config.get("path", ".flashcards/metrics.jsonl"),
+                           float(config.get("export_interval", 60.0)))
+
+def page_timer(name):
+    """Times a full run of a page: `with page_timer("review"): ...`"""
+    start_metrics_export()
+    return metrics.timed(f"page.{name}")
+
 def initialize_session_state():
-    if "flashcards" not in st.session_state:
+    if "due_cards" not in st.session_state:
         print("initializing session state")
-        st.session_state.flashcards = fm.load_all_cards()
+        st.session_state.deck_revision = fm.deck_revision()
         st.session_state.due_cards = fm.get_due_cards()
         st.session_state.current_index = 0
         st.session_state.show_answer = False
@@ -19,12 +42,37 @@ def initialize_session_state():
         st.session_state.card_to_edit = None
         st.session_state.tts = ""
 
-def delete_flashcard_action(original_index):
-    fm.delete_card_by_index(original_index)
+def refresh_due_cards():
+    """
+    Only if the in-memory deck revision moved, rebuilds the rest of the review queue (the cards
+    already reviewed and the current one stay). Reads memory only: the changes made in other
+    sessions are applied by fm.sync_cards() on full page reruns, never while grading.
+    """
+    revision = fm.deck_revision()
+    if st.session_state.get("deck_revision") == revision:
+        return
+    st.session_state.deck_revision = revision
+    due_cards = st.session_state.due_cards
+    index = st.session_state.current_index
+    fresh = {item['card_id']: item for item in fm.get_due_cards()}
+    queue = due_cards[:index]
+    if index < len(due_cards) and due_cards[index]['card_id'] in fresh:
+        queue.append(fresh[due_cards[index]['card_id']])
+    else:
+        st.session_state.show_answer = False # The current card was deleted or rescheduled elsewhere
+    seen = {item['card_id'] for item in queue}
+    st.session_state.due_cards = queue + [item for card_id, item in fresh.items() if card_id not in seen]
+
+def delete_flashcard_action(card_id):
+    fm.delete_card_by_id(card_id)
     st.session_state.show_answer = False
 
-def update_review_status_action(original_index, grade_string):
-    fm.update_review_status(original_index, grade_string)
+def update_review_status_action(card_id, grade_string):
+    revision = fm.deck_revision()
+    fm.update_review_status(card_id, grade_string)
+    if st.session_state.get("deck_revision") == revision:
+        # Our own review doesn't need a queue rebuild
+        st.session_state.deck_revision = fm.deck_revision()
     st.session_state.show_answer = False
     st.session_state.current_index += 1
 
@@ -40,12 +88,8 @@ def speak(placeholder, text_to_speak):
     """Generates audio from text and plays it automatically in a placeholder."""
     if text_to_speak:
         try:
-            audio_bytes = io.BytesIO()
-            tts = gTTS(text=text_to_speak, lang='en', slow=False)
-            tts.write_to_fp(audio_bytes)
-            
-            audio_bytes.seek(0)
-            audio_base64 = base64.b64encode(audio_bytes.read()).decode('utf-8')
+            with metrics.timed("tts.speak"):
+                audio_base64 = get_tts_cache().get_base64(text_to_speak, lang='en', slow=False)
             key = random.random()
             audio_html = f"""
                 <audio autoplay style="display:none;" id="audio-{key}" onended="this.remove()">
@@ -1,49 +1,115 @@
 from modules.utils import *
+from modules.gemini_api import FLASHCARD_CONTEXT, generate_backs, stream_gemini
 
 
-initialize_session_state()
+with page_timer("add"):
+    initialize_session_state()
 
-st.set_page_config(page_title="Add", layout="centered", page_icon="📝")
-st.title("📝 Add Flashcards")
-st.write("")
+    st.set_page_config(page_title="Add", layout="centered", page_icon="📝")
+    st.title("📝 Add Flashcards")
+    st.write("")
 
-with st.form("new_card_form_manage", clear_on_submit=True):
-    word = st.text_input("Enter a word or expression", key="manage_q")
-    submitted = st.form_submit_button("Add Card")
-    
-    if submitted and word:
-        context = """You are a USA native english professor. Give me the back of a simple flashcard (use simple markdown). The first line of your response must be the word/expression (use '####'), then give the meaning/s of the following word/expression and a few diffrent examples For example, for the word 'court' your response should look like:
-'#### court
+    tab_single, tab_bulk = st.tabs(["Single", "Bulk"])
 
-A place where legal cases are heard, or the judicial body itself.
-* The lawyer presented her arguments to the judge and jury in **court**.
+    with tab_single:
+        generating = None # Palabra cuya respuesta se genera (en streaming) en esta ejecución
+        with st.form("new_card_form_manage", clear_on_submit=True):
+            word = st.text_input("Enter a word or expression", key="manage_q")
+            regenerate = st.checkbox("Regenerate (ignore cached answer)", key="regenerate_single")
+            allow_repeated = st.checkbox("Add even if it is repeated", key="allow_repeated_single")
+            submitted = st.form_submit_button("Add Card")
 
-An area specifically prepared and marked out for playing certain ball games, like tennis, basketball, or volleyball.
-* We need to reserve the tennis **court** for an hour this afternoon.
+            # Se revisa antes de llamar a Gemini: una tarjeta repetida no gasta API
+            duplicates = fm.find_duplicates(word) if submitted and word and not allow_repeated else None
 
-To try to win the affection, support or attention of someone, often with romantic intentions. Example:
-* In the old days, a gentleman would **court** a lady with gifts and visits before proposing marriage.
-* The candidate is trying to **court** voters in swing states with promises of tax cuts.
+            if duplicates and (duplicates['exact'] or duplicates['near']):
+                existing = duplicates['exact'] + duplicates['near']
+                fronts = ", ".join(f"**{item['card']['front']}**" for item in existing[:5])
+                st.warning(f"You already have a similar card: {fronts}. Check the box to add it anyway.")
+                # Las tarjetas en memoria no guardan el 'back': se pide para mostrar la existente
+                st.session_state.last_card = {**existing[0]['card'],
+                                              'back': fm.get_card_back(existing[0]['card_id'])}
+            elif submitted and word:
+                generating = word
+            elif submitted:
+                st.error("Please write a word or expression")
 
-To risk something, often something negative or undesirable.
-* By not wearing a helmet, he was actively **courting** a serious injury.
-* Her rebellious attitude always seemed to **court** controversy.'
-Do not add redundant examples. The word/expression is: """
-        response = askGemini(word, context)
-        fm.add_new_card(word, response)
-        st.session_state.last_card = {"front": word, "back": response}
-    elif submitted:
-        st.error("Please write a word or expression")
+        if generating or st.session_state.last_card:
+            st.write("")
+            with st.container(border=True):
+                _, col_text_back, col_speak_back = st.columns([0.001, 1, 0.1])
+                with col_text_back:
+                    if generating:
+                        # La respuesta se muestra a medida que llega; la tarjeta se guarda sólo si terminó bien
+                        try:
+                            response = st.write_stream(stream_gemini(generating, FLASHCARD_CONTEXT,
+                                                                     use_cache=not regenerate))
+                            fm.add_new_card(generating, response)
+                            st.session_state.last_card = {"front": generating, "back": response}
+                        except Exception as e:
+                            st.error(f"An unexpected error occurred during content generation: {e}")
+                    else:
+                        st.write(st.session_state.last_card["back"])
+                with col_speak_back:
+                    speaker(generating or st.session_state.last_card['front'])
+                _, caption_col = st.columns([1, 0.15])
+                caption_col.caption("Last card")
 
-if st.session_state.last_card:
-    st.write("")
-    with st.container(border=True):
-        _, col_text_back, col_speak_back = st.columns([0.001, 1, 0.1])
-        with col_text_back:
-            st.write(st.session_state.last_card["back"])
-        with col_speak_back:
-            speaker(st.session_state.last_card['front'])
-        _, caption_col = st.columns([1, 0.15])
-        caption_col.caption("Last card")
+    with tab_bulk:
+        with st.form("bulk_add_form", clear_on_submit=True):
+            pasted = st.text_area("One word or expression per line", height=200)
+            uploaded = st.file_uploader("...or upload a .txt / .csv file", type=["txt", "csv"])
+            bulk_regenerate = st.checkbox("Regenerate (ignore cached answers)", key="regenerate_bulk")
+            bulk_allow_repeated = st.checkbox("Add words already in the deck", key="allow_repeated_bulk")
+            bulk_submitted = st.form_submit_button("Add Cards")
+
+        if bulk_submitted:
+            lines = pasted.splitlines()
+            if uploaded is not None:
+                lines += uploaded.getvalue().decode("utf-8", errors="ignore").splitlines()
+            # First column of each line, without blanks or repeated words (keeps the order)
+            words = list(dict.fromkeys(w for w in (line.split(",")[0].strip() for line in lines) if w))
+            repeated, similar = [], []
+            if not bulk_allow_repeated:
+                # Only the same text is skipped; a similar card (take off / take-off, courts / court)
+                # may be a different word, so it is added and listed for the user to check
+                for w in words:
+                    duplicates = fm.find_duplicates(w)
+                    if duplicates['exact']:
+                        repeated.append(w)
+                    elif duplicates['near']:
+                        similar.append(f"{w} ≈ {duplicates['near'][0]['card']['front']}")
+                words = [w for w in words if w not in repeated]
+            if repeated:
+                st.info(f"Skipped {len(repeated)} words already in the deck: {', '.join(repeated[:20])}")
+            if similar:
+                st.warning(f"{len(similar)} words look like cards already in the deck and were added anyway: "
+                           f"{', '.join(similar[:20])}.")
+
+            if not words:
+                if not repeated:
+                    st.error("Please write or upload at least one word or expression")
+            else:
+                progress = st.progress(0.0, text=f"Generating 0 / {len(words)}")
+                done = []
+
+                def on_result(word, back, error):
+                    done.append(word)
+                    progress.progress(len(done) / len(words), text=f"Generating {len(done)} / {len(words)}")
 
+                # Rate limit of the API key plan (requests per minute), configurable in secrets.toml
+                limits = st.secrets.get("gemini", {})
+                results = generate_backs(words, FLASHCARD_CONTEXT, on_result=on_result,
+                                         use_cache=not bulk_regenerate,
+                                         max_workers=int(limits.get("max_concurrency", 16)),
+                                         requests_per_minute=float(limits.get("requests_per_minute", 1000)))
+                pairs = [(w, results[w][0]) for w in words if results[w][0] is not None]
+                failed = {w: results[w][1] for w in words if results[w][0] is None}
 
+                added = fm.add_new_cards(pairs)
+                progress.empty()
+                st.success(f"Added {added} cards.")
+                if failed:
+                    with st.expander(f"{len(failed)} words failed"):
+                        for w, error in failed.items():
+                            st.write(f"**{w}**: {error}")
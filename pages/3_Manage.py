@@ -1,76 +1,187 @@
 from modules.utils import *
 
 
-initialize_session_state()
-st.session_state.flashcards = fm.load_all_cards()
-
-st.set_page_config(page_title="Manage ", layout="centered", page_icon="📚")
-st.title("📚 Manage Flashcards")
-st.write("")
-
-cards = st.session_state.flashcards
-if not cards:
-    st.info("No flashcards added yet.")
-else:
-    cols = st.columns(2)
-    col_index = 0
-
-    for item in cards:
-        card = item['card']
-        card_index = item['card_index']
-        
-        with cols[col_index]:
-            
-            if st.session_state.card_to_edit == card_index:
-                
-                with st.expander(f"#### Editing Card {card_index + 1}...", expanded=True):
-                    with st.form(key=f"edit_form_{card_index}"):
-                        st.caption("Modify the fields and save.")
-                        new_front = st.text_input("Front", value=card['front'])
-                        new_back = st.text_area("Back", value=card['back'], height=600)
-
-                        col_save, _, col_cancel = st.columns(3)
-                        
-                        with col_save:
-                            if st.form_submit_button("Save", type="primary"):
-                                fm.update_card_by_index(card_index, new_front, new_back)
-                                st.session_state.card_to_edit = None
-                                st.rerun() 
-                        
-                        with col_cancel:
-                            if st.form_submit_button("Cancel"):
-                                st.session_state.card_to_edit = None 
-                                st.rerun() 
+SEARCH_LIMIT = 100
+SORT_OPTIONS = {"Relevance": "relevance", "Next review": "next_review",
+                "Interval": "interval", "EF": "easiness_factor"}
 
+
+def save_card_action(card_id):
+    fm.update_card_by_id(card_id,
+                         st.session_state[f"edit_front_{card_id}"],
+                         st.session_state[f"edit_back_{card_id}"])
+    st.session_state.card_to_edit = None
+
+
+@st.fragment
+def backup_view():
+    """Backup y restore del mazo en el formato snapshot (.fcs): binario, comprimido y por lotes."""
+    with st.expander("💾 Backup & restore"):
+        if st.button("Prepare backup", key="backup_btn"):
+            data = fm.export_snapshot()
+            if data:
+                st.download_button(f"Download backup ({len(data) / 1024:.0f} KB)", data,
+                                   file_name="flashcards.fcs", mime="application/octet-stream",
+                                   key="backup_download")
+            else:
+                st.error("The backup could not be created.")
+        uploaded = st.file_uploader("Restore from a backup (cards already in the deck are skipped)",
+                                    type=["fcs"], key="restore_file")
+        if uploaded is not None and st.button("Restore", key="restore_btn"):
+            try:
+                restored = fm.restore_snapshot(uploaded.getvalue())
+            except Exception as e:
+                st.error(f"Could not restore the backup: {e}")
             else:
-                with st.expander(f"#### Card {card_index + 1}: {card['front']}"):
-                    st.markdown(f"**Answer:**\n> {card['back']}")
-                    
-                    review_date_dt = datetime.fromisoformat(card['next_review_date'])
-                    review_date_display = review_date_dt.strftime('%Y-%m-%d')
-                    
-                    st.markdown(f"**Next Review:** `{review_date_display}`")
-                    st.markdown(f"**Interval:** `{int(round(card['interval']))}` days")
-                    st.markdown(f"**EF:** `{card['easiness_factor']:.2f}`")
-                    st.write("") 
-                    
-                    col_edit, _, col_delete = st.columns([1, 3, 1])
-                    
-                    with col_edit:
-                        st.button(
-                            "✏️", 
-                            key=f"edit_btn_{card_index}",
-                            on_click=lambda idx=card_index: st.session_state.update(card_to_edit=idx)
-                        )
-
-                    with col_delete:
-                        st.button(
-                            "❌", 
-                            key=f"delete_btn_{card_index}", 
-                            on_click=delete_flashcard_action, 
-                            args=(card_index,)
-                        )
-
-        col_index = (col_index + 1) % 2
-        
-    st.caption(f"Total flashcards: {len(cards)}")
\ No newline at end of file
+                st.success(f"Restored {restored} card(s).")
+
+
+@st.fragment
+def card_view(card_id, number):
+    """Una tarjeta. Editarla o borrarla sólo vuelve a ejecutar este fragmento."""
+    item = fm.get_card(card_id)
+    if item is None:
+        return # Borrada
+    card = item['card']
+
+    if st.session_state.card_to_edit == card_id:
+
+        with st.expander(f"#### Editing Card {number}...", expanded=True):
+            with st.form(key=f"edit_form_{card_id}"):
+                st.caption("Modify the fields and save.")
+                st.text_input("Front", value=card['front'], key=f"edit_front_{card_id}")
+                st.text_area("Back", value=card['back'], height=600, key=f"edit_back_{card_id}")
+
+                col_save, _, col_cancel = st.columns(3)
+
+                with col_save:
+                    st.form_submit_button("Save", type="primary", on_click=save_card_action, args=(card_id,))
+
+                with col_cancel:
+                    st.form_submit_button("Cancel", on_click=lambda: st.session_state.update(card_to_edit=None))
+
+    else:
+        with st.expander(f"#### Card {number}: {card['front']}"):
+            st.markdown(f"**Answer:**\n> {card['back']}")
+
+            review_date_dt = datetime.fromisoformat(card['next_review_date'])
+            review_date_display = review_date_dt.strftime('%Y-%m-%d')
+
+            st.markdown(f"**Next Review:** `{review_date_display}`")
+            st.markdown(f"**Interval:** `{int(round(card['interval']))}` days")
+            st.markdown(f"**EF:** `{card['easiness_factor']:.2f}`")
+            st.write("")
+
+            col_edit, _, col_delete = st.columns([1, 3, 1])
+
+            with col_edit:
+                st.button(
+                    "✏️",
+                    key=f"edit_btn_{card_id}",
+                    on_click=lambda: st.session_state.update(card_to_edit=card_id)
+                )
+
+            with col_delete:
+                st.button(
+                    "❌",
+                    key=f"delete_btn_{card_id}",
+                    on_click=delete_flashcard_action,
+                    args=(card_id,)
+                )
+
+
+def search_filters():
+    """Filtros elegidos en el panel de búsqueda (sólo los que están activos)."""
+    filters = {}
+    with st.expander("Filters & sorting"):
+        col_from, col_to = st.columns(2)
+        with col_from:
+            due_from = st.date_input("Next review from", value=None, key="search_due_from")
+        with col_to:
+            due_to = st.date_input("Next review to", value=None, key="search_due_to")
+        interval_range = st.slider("Interval (days)", 0, 365, (0, 365), key="search_interval")
+        ef_range = st.slider("EF", 1.3, 3.0, (1.3, 3.0), step=0.05, key="search_ef")
+        sort = st.selectbox("Sort by", list(SORT_OPTIONS), key="search_sort")
+
+    if due_from:
+        filters['due_from'] = datetime.combine(due_from, datetime.min.time())
+    if due_to:
+        filters['due_to'] = datetime.combine(due_to, datetime.max.time())
+    if interval_range != (0, 365):
+        # El extremo del slider significa "o más"
+        filters['interval_range'] = (interval_range[0], float('inf') if interval_range[1] == 365 else interval_range[1])
+    if ef_range != (1.3, 3.0):
+        filters['ef_range'] = (ef_range[0], float('inf') if ef_range[1] == 3.0 else ef_range[1])
+    if SORT_OPTIONS[sort] != "relevance":
+        filters['sort'] = SORT_OPTIONS[sort]
+    return filters
+
+
+with page_timer("manage"):
+    initialize_session_state()
+    fm.sync_cards() # Sólo trae lo que cambió desde la última sincronización
+
+    st.set_page_config(page_title="Manage ", layout="centered", page_icon="📚")
+    st.title("📚 Manage Flashcards")
+    st.write("")
+
+    if "manage_cursors" not in st.session_state:
+        # Pila de cursores (keyset): el último es el 'after_id' de la página actual
+        st.session_state.manage_cursors = [None]
+
+    total = len(fm.current_manager().cards)
+    if not total:
+        st.info("No flashcards added yet.")
+    else:
+        query = st.text_input("🔍 Search", key="search_query", placeholder="Search fronts and backs...")
+        filters = search_filters()
+
+        if query.strip() or filters:
+            # Resultados servidos desde el índice invertido, no recorriendo todas las tarjetas
+            results = fm.search_cards(query, limit=SEARCH_LIMIT, **filters)
+            if not results:
+                st.info("No cards match the search.")
+            cols = st.columns(2)
+            for number, item in enumerate(results, 1):
+                with cols[(number - 1) % 2]:
+                    card_view(item['card_id'], number)
+            st.caption(f"{len(results)} result(s)" + (f" (showing the first {SEARCH_LIMIT})"
+                                                       if len(results) == SEARCH_LIMIT else ""))
+        else:
+            page_size = st.selectbox("Cards per page", [10, 20, 50, 100], index=1, key="manage_page_size",
+                                     on_change=lambda: st.session_state.update(manage_cursors=[None]))
+            cursors = st.session_state.manage_cursors
+            page, next_cursor = fm.load_cards_page(cursors[-1], page_size)
+            first_number = (len(cursors) - 1) * page_size + 1
+
+            cols = st.columns(2)
+            col_index = 0
+
+            for number, item in enumerate(page, first_number):
+                with cols[col_index]:
+                    card_view(item['card_id'], number)
+                col_index = (col_index + 1) % 2
+
+            col_prev, col_caption, col_next = st.columns([1, 3, 1])
+            with col_prev:
+                st.button("◀", key="prev_page", disabled=len(cursors) == 1,
+                          on_click=lambda: cursors.pop())
+            with col_caption:
+                st.caption(f"Page {len(cursors)} · Total flashcards: {total}")
+            with col_next:
+                st.button("▶", key="next_page", disabled=next_cursor is None,
+                          on_click=lambda: cursors.append(next_cursor))
+
+        with st.expander("🔁 Repeated cards"):
+            if st.button("Find repeated cards", key="dedupe_report_btn"):
+                manager = fm.current_manager()
+                report = manager.duplicates_report()
+                if not report['exact'] and not report['near']:
+                    st.success("No repeated cards found.")
+                for group in report['exact']:
+                    st.markdown("**Same word:** " + ", ".join(f"`{manager.get(i).front}`" for i in group))
+                for first, second, score in report['near'][:100]:
+                    st.markdown(f"**Similar ({score:.0%}):** `{manager.get(first).front}` · "
+                                f"`{manager.get(second).front}`")
+
+    backup_view()
@@ -0,0 +1,44 @@
+from modules.utils import *
+import pandas as pd
+from modules.forecast import forecast_workload, max_sustainable_new_cards
+
+
+with page_timer("forecast"):
+    initialize_session_state()
+
+    st.set_page_config(page_title="Forecast", layout="centered", page_icon="📈")
+    st.title("📈 Review Forecast")
+    st.write("")
+
+    columns = fm.current_manager().to_columns()
+    if not len(columns):
+        st.info("No flashcards added yet.")
+    else:
+        col_days, col_new, col_runs = st.columns(3)
+        days = col_days.slider("Days ahead", 7, 180, 30)
+        new_per_day = col_new.number_input("New cards per day", 0, 500, 10)
+        runs = col_runs.slider("Simulations", 5, 100, 20)
+
+        st.caption("Expected answers (%)")
+        col0, col1, col2, col3 = st.columns(4)
+        probs = (col0.number_input("Again", 0, 100, 10), col1.number_input("Hard", 0, 100, 15),
+                 col2.number_input("Good", 0, 100, 60), col3.number_input("Easy", 0, 100, 15))
+
+        if sum(probs) == 0:
+            st.error("At least one answer must have a probability above 0")
+        else:
+            result = forecast_workload(columns, days=days, grade_probs=probs, new_per_day=new_per_day, runs=runs)
+            chart = pd.DataFrame({"p10": result['p10'], "median": result['p50'], "p90": result['p90']},
+                                 index=pd.to_datetime(result['date']))
+            st.line_chart(chart)
+
+            col_today, col_peak, col_avg = st.columns(3)
+            col_today.metric("Due today", int(result['p50'][0]))
+            col_peak.metric("Peak (p90)", int(result['p90'].max()))
+            col_avg.metric("Average per day", f"{result['mean'].mean():.0f}")
+
+            st.divider()
+            daily_limit = st.number_input("Max reviews per day I can handle", 10, 2000, 100)
+            if st.button("How many new cards per day can I add?"):
+                limit = max_sustainable_new_cards(columns, daily_limit, grade_probs=probs)
+                st.success(f"Up to **{limit}** new cards per day keeps the load under {daily_limit} reviews.")
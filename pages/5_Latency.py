@@ -0,0 +1,38 @@
+from modules.utils import *
+import pandas as pd
+
+
+st.set_page_config(page_title="Latency", layout="centered", page_icon="⏱️")
+st.title("⏱️ Latency")
+st.write("")
+
+# Esta página no se mide a sí misma: sólo muestra lo que registraron las demás
+start_metrics_export()
+snapshot = [row for row in metrics.snapshot() if row['count']]
+window_minutes = metrics.window / 60
+
+if not snapshot:
+    st.info("No measurements yet. Use the app for a while and come back.")
+else:
+    table = pd.DataFrame(snapshot).set_index('name')
+    for column in ('mean', 'p50', 'p95', 'p99', 'max'):
+        table[column] = (table[column] * 1000).round(1) # ms
+    table = table[['count', 'errors', 'mean', 'p50', 'p95', 'p99', 'max']]
+
+    st.caption(f"Last {window_minutes:.0f} minutes · times in ms · every Supabase call (db.*), "
+               "Gemini (gemini.*), text to speech (tts.*) and full page runs (page.*)")
+    st.dataframe(table, width='stretch')
+
+    st.bar_chart(table[['p50', 'p95', 'p99']], horizontal=True)
+
+    errors = table[table['errors'] > 0]
+    if len(errors):
+        st.warning("Errors: " + ", ".join(f"`{name}` ({int(n)})" for name, n in errors['errors'].items()))
+
+col_export, col_reset = st.columns(2)
+with col_export:
+    if st.button("Export now", width='stretch'):
+        metrics.export()
+        st.success(f"Saved to `{metrics.export_path}`")
+with col_reset:
+    st.button("Reset", width='stretch', on_click=metrics.reset)
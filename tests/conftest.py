@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.local_db import LocalClient
+import modules.flashcards_manager as fm
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Directorio de trabajo temporal: los journals de los managers van a '.flashcards/'."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def local(workdir):
+    """Base SQLite local con la misma API de tablas que Supabase (el backend de los tests)."""
+    return LocalClient(str(workdir / "flashcards.db"), change_log=True)
+
+
+@pytest.fixture
+def make_manager(local):
+    """Crea managers sobre 'local' (varios = varias sesiones o dispositivos) y los cierra al final."""
+    managers = []
+
+    def make(user_id: str = "user", **kwargs) -> fm.FlashcardsManager:
+        manager = fm.FlashcardsManager(user_id=user_id, client=kwargs.pop("client", local), **kwargs)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.close()
+
+
+def db_row(local: LocalClient, card_id: int) -> dict:
+    """La fila de la tarjeta tal como está en la BD."""
+    return local.table("flashcards").select("*").eq("id", card_id).execute().data[0]
@@ -0,0 +1,102 @@
+import httpx
+import pytest
+
+from benchmarks.fake_postgrest import FakePostgrest
+from modules.async_db import AsyncPostgrest, DataAccessError
+
+
+@pytest.fixture
+def make_client():
+    """AsyncPostgrest sobre un transport en proceso (sin red); se cierran al final."""
+    clients = []
+
+    def make(transport, **kwargs) -> AsyncPostgrest:
+        kwargs.setdefault("base_delay", 0.001)
+        client = AsyncPostgrest("http://supabase.test", "key", transport=transport, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def _flaky(statuses, error=None):
+    """Transport que responde con 'statuses' en orden (o lanza 'error' en los None) y luego 200."""
+    calls = []
+
+    def handle(request):
+        calls.append(request)
+        if len(calls) <= len(statuses):
+            status = statuses[len(calls) - 1]
+            if status is None:
+                raise error
+            return httpx.Response(status, json={"message": "error"})
+        return httpx.Response(200, json=[{"id": 1}])
+    return httpx.MockTransport(handle), calls
+
+
+def test_same_api_as_supabase_py(make_client):
+    server = FakePostgrest()
+    client = make_client(server.transport())
+    client.table("flashcards").insert([{'front': "court", 'user_id': "user"},
+                                       {'front': "run, fast", 'user_id': "user"}]).execute()
+
+    rows = (client.table("flashcards").select("id,front").eq("user_id", "user")
+            .in_("front", ["court", "run, fast"]).order("id", desc=True).limit(1).execute().data)
+    assert [row['front'] for row in rows] == ["run, fast"]
+    applied = client.rpc("apply_reviews", {"rows": [{'id': rows[0]['id'], 'version': 1, 'repetitions': 2}]}).execute()
+    assert applied.data == [{'id': rows[0]['id'], 'version': 2}]
+
+
+def test_upsert_resolutions(make_client):
+    client = make_client(FakePostgrest().transport())
+    log = {'uid': "abc", 'user_id': "user", 'card_id': 1, 'grade': 2, 'reviewed_at': "2026-01-01T10:00:00"}
+    client.table("review_log").upsert([log], on_conflict="uid", ignore_duplicates=True).execute()
+    client.table("review_log").upsert([{**log, 'grade': 0}], on_conflict="uid", ignore_duplicates=True).execute()
+    assert [row['grade'] for row in client.table("review_log").select("grade").execute().data] == [2]
+
+    client.table("review_log").upsert([{**log, 'grade': 3}], on_conflict="uid").execute()
+    assert [row['grade'] for row in client.table("review_log").select("grade").execute().data] == [3]
+
+
+def test_transient_errors_are_retried(make_client):
+    transport, calls = _flaky([503, 502])
+    client = make_client(transport)
+
+    assert client.table("flashcards").select("id").execute().data == [{"id": 1}]
+    assert (len(calls), client.retried) == (3, 2)
+
+
+def test_rejections_are_not_retried(make_client):
+    transport, calls = _flaky([400])
+    client = make_client(transport)
+
+    with pytest.raises(DataAccessError) as error:
+        client.table("flashcards").insert({'front': "court"}).execute()
+    assert error.value.status == 400
+    assert len(calls) == 1
+
+
+def test_insert_is_not_resent_after_a_read_timeout(make_client):
+    transport, calls = _flaky([None], httpx.ReadTimeout("timeout"))
+    client = make_client(transport)
+    with pytest.raises(DataAccessError):
+        client.table("flashcards").insert({'front': "court"}).execute() # Pudo haber llegado
+    assert len(calls) == 1
+
+    transport, calls = _flaky([None], httpx.ReadTimeout("timeout"))
+    client = make_client(transport)
+    client.table("flashcards").upsert({'id': 1, 'front': "court"}).execute() # Idempotente: se reintenta
+    assert len(calls) == 2
+
+
+def test_identical_concurrent_reads_are_coalesced(make_client):
+    server = FakePostgrest(latency=0.05)
+    client = make_client(server.transport())
+    queries = [client.table("flashcards").select("id").eq("user_id", "user") for _ in range(5)]
+    queries.append(client.table("flashcards").select("id").eq("user_id", "other"))
+
+    results = client.execute_many(queries)
+    assert all(result.data == [] for result in results)
+    assert (server.requests, client.coalesced) == (2, 4)
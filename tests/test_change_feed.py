@@ -0,0 +1,84 @@
+import pytest
+
+from modules.change_feed import LocalChangeFeed
+
+
+@pytest.fixture
+def feed(local):
+    """Feed local sin su hilo: los tests llaman a poll() para repartir los avisos cuando quieren."""
+    feed = LocalChangeFeed(local)
+    feed.healthy = True
+    return feed
+
+
+def test_feed_patches_the_deck(feed, make_manager):
+    session = make_manager(feed=feed)
+    other = make_manager() # Otro proceso que escribe en la misma BD
+    card = other.add_card("court", "a place")
+    revision = session.revision
+
+    assert feed.poll() == 1
+    assert session.sync() == 1
+    assert session.cards[card.id].front == "court"
+    assert session.revision > revision # Las sesiones ven el cambio comparando números
+
+    other.update_card(card.id, new_front="the court")
+    feed.poll()
+    session.sync()
+    assert session.cards[card.id].front == "the court"
+
+    other.delete_card(card.id)
+    feed.poll()
+    session.sync()
+    assert card.id not in session.cards
+
+
+def test_feed_delivers_only_the_users_rows(feed, make_manager):
+    session = make_manager(feed=feed)
+    make_manager(user_id="someone else").add_card("court", "a place")
+
+    feed.poll()
+    assert session.sync() == 0
+    assert session.cards == {}
+
+
+def test_own_writes_echo_without_changes(feed, make_manager):
+    session = make_manager(feed=feed)
+    card = session.add_card("court", "a place")
+    session.review_card(card.id, 3)
+    session.flush_reviews()
+    revision = session.revision
+
+    feed.poll() # El alta y la revisión de esta misma sesión
+    assert session.sync() == 0 # Misma versión que en memoria: no cambia nada
+    assert session.revision == revision
+
+
+def test_healthy_feed_skips_the_watermark_query(feed, local, make_manager):
+    session = make_manager(feed=feed)
+    make_manager().add_card("court", "a place")
+
+    assert session.sync() == 0 # Sin poll() el aviso no llegó, y con el feed sano no se consulta la BD
+    feed.healthy = False
+    assert session.sync() == 1 # Feed caído: sincronización por marca de agua
+
+
+def test_gap_forces_one_watermark_sync(feed, make_manager):
+    session = make_manager(feed=feed)
+    card = make_manager().add_card("court", "a place")
+
+    feed._gap() # p.ej. Realtime reconectó: pudieron perderse avisos
+    session.sync()
+    assert card.id in session.cards
+    assert not session._feed_gap
+
+
+def test_prune_keeps_the_latest_changes(feed, local, make_manager):
+    feed.retention = 2
+    make_manager().add_cards([(f"word {i}", "") for i in range(5)])
+    feed.poll()
+    feed._prune()
+
+    assert len(local.table("flashcards").select("id").execute().data) == 5
+    with local.lock:
+        assert local.conn.execute('SELECT COUNT(*) FROM "_changes"').fetchone()[0] == 2
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import numpy as np
+
+from modules.columnar import CardColumns, review_batch, sm2_batch
+
+# (repetitions, interval, easiness_factor) de partida: nuevas, aprendidas y con el EF en el mínimo
+STATES = [(0, 0.0, 2.5), (1, 1.0, 2.5), (2, 6.0, 2.36), (5, 40.0, 1.3), (3, 15.0, 2.9)]
+
+
+def _insert_pairs(manager):
+    """Cada estado dos veces: una copia se califica con review_card y la otra en lote."""
+    rows = [{'front': f"{copy} {i}", 'back': "", 'interval': interval, 'easiness_factor': ef,
+             'repetitions': reps, 'next_review_date': datetime(2026, 1, 1).isoformat(), 'user_id': manager.user_id}
+            for copy in ("single", "batch") for i, (reps, interval, ef) in enumerate(STATES)]
+    cards = manager._insert_rows(rows)
+    return cards[:len(STATES)], cards[len(STATES):]
+
+
+def test_batch_matches_review_card(make_manager):
+    manager = make_manager()
+    for grade in range(4):
+        singles, batch = _insert_pairs(manager)
+        expected_days = [manager.review_card(card.id, grade) for card in singles]
+        days = manager.review_cards_batch([card.id for card in batch], [grade] * len(batch))
+
+        assert days == expected_days
+        for single, batched in zip(singles, batch):
+            assert batched.repetitions == single.repetitions
+            assert np.isclose(batched.interval, single.interval)
+            assert np.isclose(batched.easiness_factor, single.easiness_factor)
+            assert abs(batched.due - single.due) <= 2 # Mismo día (calculados con segundos de diferencia)
+
+
+def test_batch_queues_reviews_for_the_write_behind(make_manager):
+    manager = make_manager()
+    _, batch = _insert_pairs(manager)
+    manager.review_cards_batch([card.id for card in batch], [2] * len(batch))
+
+    assert all(manager.review_writer.is_pending(card.id) for card in batch)
+    assert manager.stats.summary()['reviews_today'] == len(batch)
+
+
+def test_invalid_grades_and_unknown_ids_are_ignored(make_manager):
+    manager = make_manager()
+    _, batch = _insert_pairs(manager)
+    before = (batch[0].repetitions, batch[0].interval, batch[0].due)
+
+    days = manager.review_cards_batch([batch[0].id, 10 ** 9], [7, 2])
+    assert days == [-1]
+    assert (batch[0].repetitions, batch[0].interval, batch[0].due) == before
+
+
+def test_sm2_rounds_half_to_even_like_round():
+    ef, interval, reps, days = sm2_batch(np.array([2.5, 2.5]), np.array([1.0, 1.0]),
+                                         np.array([2, 2]), np.array([1, 2]))
+    # Tercera repetición: interval * EF. Hard deja 2.36 días y Good 2.5, que redondea al par (2)
+    assert reps.tolist() == [3, 3]
+    assert days.tolist() == [round(1.0 * 2.36), round(1.0 * 2.5)]
+
+
+def test_review_batch_updates_columns_in_place():
+    columns = CardColumns([1, 2, 3], [2.5] * 3, [0.0] * 3, [0] * 3, [0] * 3)
+    now = 1_700_000_000
+    days = review_batch(columns, columns.positions([3, 1]), [0, 3], now=now)
+
+    assert days.tolist() == [1, 1]
+    assert columns.repetitions.tolist() == [1, 0, 0]
+    assert columns.due.tolist() == [now + 86400, 0, now + 86400]
+    assert columns.positions([2, 99]).tolist() == [1, -1]
+
+
+def test_interval_is_capped_after_many_good_reviews(make_manager):
+    manager = make_manager()
+    single, batched = manager.add_cards([("court", ""), ("courts", "")])
+    for _ in range(60): # Sin tope, el intervalo desborda la fecha en ~30 revisiones
+        manager.review_card(single.id, 3)
+        manager.review_cards_batch([batched.id], [3])
+
+    assert single.interval == batched.interval == 36500.0
+    assert single.next_review_date[:4] == batched.next_review_date[:4]
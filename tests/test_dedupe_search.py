@@ -0,0 +1,147 @@
+from modules.dedupe import DuplicateIndex, stem
+from modules.search_index import SearchIndex
+
+
+# --- Repetidos ---
+
+def test_stem_reduces_simple_inflections():
+    assert [stem(word) for word in ("courting", "courts", "studies", "running", "stopped", "class")] == \
+        ["court", "court", "study", "run", "stop", "class"]
+
+
+def test_stem_does_not_cut_word_endings():
+    words = ("news", "speed", "agreed", "string", "status", "apply", "kings")
+    assert [stem(word) for word in words] == ["news", "speed", "agreed", "string", "status", "apply", "king"]
+    index = DuplicateIndex()
+    index.add_many([(1, "new"), (2, "spell"), (3, "app")])
+    found = [index.find(front) for front in ("news", "spelled", "apply")]
+    assert [ids['exact'] for ids in found] == [[], [], []]
+    assert [[card_id for card_id, _ in ids['near']] for ids in found] == [[], [2], []]
+
+
+def test_exact_duplicates_ignore_case_and_punctuation():
+    index = DuplicateIndex()
+    index.add_many([(1, "Court"), (2, "take off"), (3, "break the ice")])
+
+    assert index.find(" court! ")['exact'] == [1]
+    assert index.find("Take-off")['exact'] == [2]
+    assert index.find("court", exclude=1)['exact'] == []
+
+
+def test_same_stem_is_near_not_exact():
+    index = DuplicateIndex()
+    index.add_many([(1, "Court"), (2, "break the ice"), (3, "wed"), (4, "even"), (5, "ceil")])
+
+    found = index.find(" courts! ")
+    assert found['exact'] == [] and [card_id for card_id, _ in found['near']] == [1]
+    found = index.find("breaking the ice")
+    assert found['exact'] == [] and [card_id for card_id, _ in found['near']] == [2]
+    # El stemmer corta de más, pero el usuario lo ve como parecido y decide
+    for front, card_id in (("wedding", 3), ("evening", 4), ("ceiling", 5)):
+        found = index.find(front)
+        assert found['exact'] == [] and card_id in [near_id for near_id, _ in found['near']]
+
+
+def test_near_duplicates_by_minhash():
+    index = DuplicateIndex()
+    index.add_many([(1, "accommodation"), (2, "break the ice"), (3, "photosynthesis")])
+
+    found = index.find("acommodation") # Error de tipeo
+    assert found['exact'] == []
+    assert [card_id for card_id, _ in found['near']] == [1]
+    assert 0.5 <= found['near'][0][1] < 1
+    assert index.find("zebra crossing") == {'exact': [], 'near': []}
+
+
+def test_index_is_maintained_incrementally():
+    index = DuplicateIndex()
+    index.add(1, "court")
+    index.update(1, "photosynthesis")
+    assert index.find("court")['exact'] == []
+    assert index.find("photosynthesis")['exact'] == [1]
+
+    index.remove(1)
+    assert len(index) == 0
+    assert index.find("photosynthesis") == {'exact': [], 'near': []}
+
+
+def test_report_groups_the_whole_deck():
+    index = DuplicateIndex()
+    index.add_many([(1, "court"), (2, "Court!"), (3, "accommodation"), (4, "acommodation"),
+                    (5, "run"), (6, "courts")])
+
+    report = index.report()
+    assert report['exact'] == [[1, 2]]
+    assert sorted((first, second) for first, second, _ in report['near']) == [(1, 6), (2, 6), (3, 4)]
+
+
+def test_manager_finds_duplicates_before_adding(make_manager):
+    manager = make_manager()
+    card = manager.add_card("court", "a place")
+    manager.add_card("accommodation", "a place to stay")
+
+    assert [duplicate.id for duplicate in manager.find_duplicates("Court")['exact']] == [card.id]
+    found = manager.find_duplicates("Courts")
+    assert found['exact'] == [] and [duplicate.id for duplicate, _ in found['near']] == [card.id]
+    manager.delete_card(card.id)
+    assert manager.find_duplicates("Court") == {'exact': [], 'near': []}
+
+
+# --- Búsqueda ---
+
+def _search_index() -> SearchIndex:
+    index = SearchIndex()
+    index.add(1, "court", "A place where trials are held")
+    index.add(2, "trial", "An examination of evidence in a court")
+    index.add(3, "run", "Move fast")
+    index.add(4, "courtship", "The period before marriage")
+    return index
+
+
+def test_front_matches_rank_above_back_matches():
+    hits = _search_index().search("court ")
+    assert [card_id for card_id, _ in hits] == [1, 2]
+    assert hits[0][1] > hits[1][1]
+
+
+def test_rarer_terms_score_higher():
+    index = SearchIndex()
+    for card_id in range(1, 6):
+        index.add(card_id, f"word {card_id}", "common")
+    index.add(6, "other", "rare common")
+
+    scores = dict(index.search("common "))
+    assert dict(index.search("rare "))[6] > scores[6]
+
+
+def test_all_query_words_must_match():
+    index = _search_index()
+    assert [card_id for card_id, _ in index.search("court evidence ")] == [2]
+    assert index.search("court marriage ") == []
+
+
+def test_last_word_is_also_a_prefix():
+    index = _search_index()
+    assert {card_id for card_id, _ in index.search("cour")} == {1, 2, 4}
+    assert {card_id for card_id, _ in index.search("cour ")} == set() # Palabra completa: sin prefijo
+
+
+def test_search_index_follows_updates():
+    index = _search_index()
+    index.update(3, "sprint", "Run very fast")
+    index.remove(1)
+
+    assert [card_id for card_id, _ in index.search("sprint ")] == [3]
+    assert [card_id for card_id, _ in index.search("court ")] == [2]
+    assert len(index) == 3
+
+
+def test_manager_search_with_filters(make_manager):
+    manager = make_manager()
+    court, trial = manager.add_card("court", "a place where trials are held"), manager.add_card("trial", "in a court")
+    manager.review_card(trial.id, 3)
+
+    assert [card.id for card in manager.search_cards("court")] == [court.id, trial.id]
+    assert [card.id for card in manager.search_cards("court", interval_range=(1, 365))] == [trial.id]
+    manager.update_card(court.id, new_back="a tennis court")
+    assert [card.id for card in manager.search_cards("tennis")] == [court.id]
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+
+def _set_due(manager, card, when: datetime):
+    """Mueve el vencimiento de una tarjeta (como lo haría una revisión) y la reindexa."""
+    old_due = card.due
+    card.due = int(when.timestamp())
+    manager._push_due(card, old_due)
+
+
+def test_due_cards_are_ordered_by_date(make_manager):
+    manager = make_manager()
+    now = datetime.now()
+    late, early, future = manager.add_cards([("late", ""), ("early", ""), ("future", "")])
+    _set_due(manager, late, now - timedelta(days=1))
+    _set_due(manager, early, now - timedelta(days=3))
+    _set_due(manager, future, now + timedelta(days=2))
+
+    assert [card.id for card in manager.due_cards()] == [early.id, late.id]
+    assert [card.id for card in manager.due_cards(now + timedelta(days=3))] == [early.id, late.id, future.id]
+
+
+def test_reviewed_and_deleted_cards_leave_the_due_list(make_manager):
+    manager = make_manager()
+    kept, reviewed, deleted = manager.add_cards([("court", ""), ("run", ""), ("walk", "")])
+
+    manager.review_card(reviewed.id, 2)
+    manager.delete_card(deleted.id)
+    assert [card.id for card in manager.due_cards()] == [kept.id]
+
+
+def test_next_due_cards_includes_future_ones(make_manager):
+    manager = make_manager()
+    now = datetime.now()
+    cards = manager.add_cards([(f"word {i}", "") for i in range(5)])
+    for i, card in enumerate(cards):
+        _set_due(manager, card, now + timedelta(days=5 - i))
+
+    assert [card.id for card in manager.next_due_cards(3)] == [card.id for card in reversed(cards)][:3]
+    assert manager.next_due_cards(0) == []
+    assert len(manager.next_due_cards(10)) == 5
+
+
+def test_stale_heap_entries_are_compacted(make_manager):
+    manager = make_manager()
+    cards = manager.add_cards([(f"word {i}", "") for i in range(10)])
+    for _ in range(50):
+        for card in cards:
+            manager.review_card(card.id, 0) # Again: el intervalo vuelve a 1 día
+
+    # Cada revisión deja una entrada obsoleta: la compactación las mantiene acotadas
+    assert len(manager._due_heap) <= 2 * len(cards) + 64 + 1
+    assert sorted(card.id for card in manager.next_due_cards(20)) == sorted(card.id for card in cards)
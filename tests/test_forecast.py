@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from modules.columnar import CardColumns
+from modules.forecast import forecast_workload, max_sustainable_new_cards
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def _columns(due_days, repetitions=0, interval=0.0):
+    """Tarjetas que vencen 'due_days' días después de hoy (negativo: atrasadas)."""
+    n = len(due_days)
+    due = [int((NOW + timedelta(days=d)).timestamp()) for d in due_days]
+    return CardColumns(list(range(1, n + 1)), [2.5] * n, [interval] * n, [repetitions] * n, due)
+
+
+def test_overdue_cards_count_for_today():
+    result = forecast_workload(_columns([-3, -1, 0, 2]), days=5, runs=3, seed=1, now=NOW)
+
+    assert result['samples'].shape == (3, 5)
+    assert result['samples'][:, 0].tolist() == [3, 3, 3] # Las atrasadas y las de hoy
+    assert result['date'][0] == datetime(2026, 3, 1)
+
+
+def test_same_seed_same_forecast():
+    columns = _columns(list(range(-5, 20)))
+    first = forecast_workload(columns, days=30, runs=5, seed=7, now=NOW)
+    second = forecast_workload(columns, days=30, runs=5, seed=7, now=NOW)
+    assert np.array_equal(first['samples'], second['samples'])
+
+
+def test_new_cards_are_reviewed_the_day_they_are_added():
+    result = forecast_workload(_columns([]), days=3, new_per_day=4, runs=2,
+                               grade_probs=(0, 0, 1, 0), seed=0, now=NOW)
+    # Good siempre: la nueva de hoy vuelve en 1 día, después en 6
+    assert result['samples'][0].tolist() == [4, 8, 8]
+    assert result['mean'].tolist() == [4, 8, 8]
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        forecast_workload(_columns([0]), days=0)
+    with pytest.raises(ValueError):
+        forecast_workload(_columns([0]), grade_probs=(1, 0, 0))
+
+
+def test_sustainable_new_cards_respect_the_limit():
+    columns = _columns([0] * 20)
+    assert max_sustainable_new_cards(columns, daily_limit=0, days=20) == 0
+    few, many = (max_sustainable_new_cards(columns, daily_limit=limit, days=20, upper=50) for limit in (20, 60))
+    assert 0 < few <= many
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+from modules.upload_to_supabase import Checkpoint, import_cards, iter_records, validate_record
+
+
+def _cards(n: int, start: int = 0):
+    return [{'front': f"word {i}", 'back': f"meaning {i}"} for i in range(start, start + n)]
+
+
+def _fronts(local, user_id="user"):
+    return sorted(row['front'] for row in local.table("flashcards").select("front").eq("user_id", user_id)
+                  .execute().data)
+
+
+class FailingInserts:
+    """
+    Supabase que falla en el insert número 'fail_at' (p.ej. se cortó la red a mitad de la importación).
+    Con 'committed' el insert llega a la tabla y lo que falla es la respuesta (un timeout).
+    """
+    def __init__(self, local, fail_at: int, committed: bool = False):
+        self.local = local
+        self.fail_at = fail_at
+        self.committed = committed
+        self.inserts = 0
+
+    def table(self, name):
+        query = self.local.table(name)
+        insert = query.insert
+
+        def failing_insert(rows, **kwargs):
+            self.inserts += 1
+            if self.inserts == self.fail_at:
+                if self.committed:
+                    insert(rows, **kwargs).execute()
+                raise ConnectionError("sin red")
+            return insert(rows, **kwargs)
+        query.insert = failing_insert
+        return query
+
+
+# --- Lectura ---
+
+def test_reads_a_json_array_in_small_chunks(tmp_path):
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(_cards(50)), encoding="utf-8")
+    assert list(iter_records(str(path), chunk_bytes=16)) == _cards(50)
+
+
+def test_reads_jsonl_and_reports_bad_lines(tmp_path):
+    path = tmp_path / "cards.jsonl"
+    path.write_text("\n".join(json.dumps(card) for card in _cards(3)) + "\n\n", encoding="utf-8")
+    assert list(iter_records(str(path))) == _cards(3)
+
+    path.write_text('{"front": "a", "back": "b"}\n{"front": \n', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_records(str(path)))
+
+
+def test_truncated_json_array_raises(tmp_path):
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(_cards(5))[:-20], encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_records(str(path), chunk_bytes=16))
+
+
+def test_validate_record():
+    assert validate_record({'front': "court", 'back': "a place", 'interval': 3, 'extra': 1}) == \
+        {'front': "court", 'back': "a place", 'interval': 3}
+    assert validate_record({'front': "  ", 'back': "x"}) is None
+    assert validate_record({'front': "court"}) is None
+    assert validate_record({'front': "court", 'back': "x", 'repetitions': True}) is None
+    assert validate_record(["court", "a place"]) is None
+
+
+# --- Importación ---
+
+def test_import_counts_invalid_and_duplicate_rows(tmp_path, local):
+    path = tmp_path / "cards.json"
+    records = _cards(5) + [{'front': "WORD  1", 'back': "again"}, {'front': ""}, "junk"]
+    path.write_text(json.dumps(records), encoding="utf-8")
+
+    stats = import_cards(local, str(path), chunk_size=2, user_id="user")
+    assert (stats['uploaded'], stats['invalid'], stats['duplicates']) == (5, 2, 1)
+    assert _fronts(local) == [f"word {i}" for i in range(5)]
+    assert not Checkpoint(str(path) + ".checkpoint.json").load() # Terminó: sin checkpoint
+
+
+def test_interrupted_import_resumes_from_the_checkpoint(tmp_path, local):
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(_cards(10)), encoding="utf-8")
+
+    with pytest.raises(ConnectionError):
+        import_cards(FailingInserts(local, fail_at=3), str(path), chunk_size=3, retries=0, user_id="user")
+    assert Checkpoint(str(path) + ".checkpoint.json").load() == 6
+    assert len(_fronts(local)) == 6
+
+    stats = import_cards(local, str(path), chunk_size=3, user_id="user")
+    assert stats['uploaded'] == 4 # Sólo lo que faltaba
+    assert _fronts(local) == sorted(f"word {i}" for i in range(10))
+
+
+def test_retry_after_a_timeout_does_not_insert_twice(tmp_path, local, monkeypatch):
+    monkeypatch.setattr("modules.upload_to_supabase.time.sleep", lambda seconds: None)
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(_cards(10)), encoding="utf-8")
+
+    stats = import_cards(FailingInserts(local, fail_at=2, committed=True), str(path), chunk_size=3,
+                         retries=1, user_id="user")
+    assert stats['uploaded'] == 7 # El lote que llegó antes del timeout no se cuenta dos veces
+    assert _fronts(local) == sorted(f"word {i}" for i in range(10))
+
+
+def test_crash_between_insert_and_checkpoint_does_not_insert_twice(tmp_path, local, monkeypatch):
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(_cards(10)), encoding="utf-8")
+    save = Checkpoint.save
+    saves = []
+
+    def crashing_save(self, records_done):
+        saves.append(records_done)
+        if len(saves) == 2:
+            raise KeyboardInterrupt # Se cerró el proceso justo después del insert
+        save(self, records_done)
+
+    monkeypatch.setattr(Checkpoint, "save", crashing_save)
+    with pytest.raises(KeyboardInterrupt):
+        import_cards(local, str(path), chunk_size=3, user_id="user")
+    monkeypatch.setattr(Checkpoint, "save", save)
+    assert (Checkpoint(str(path) + ".checkpoint.json").load(), len(_fronts(local))) == (3, 6)
+
+    stats = import_cards(local, str(path), chunk_size=3, user_id="user")
+    assert stats['uploaded'] == 4
+    assert _fronts(local) == sorted(f"word {i}" for i in range(10))
+
+
+def test_skip_existing_fronts(tmp_path, local):
+    local.table("flashcards").insert({'front': "Word 2", 'back': "already here", 'user_id': "user"}).execute()
+    path = tmp_path / "cards.json"
+    path.write_text(json.dumps(_cards(4)), encoding="utf-8")
+
+    stats = import_cards(local, str(path), skip_existing=True, user_id="user")
+    assert (stats['uploaded'], stats['duplicates']) == (3, 1)
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from modules.instrumentation import Histogram, InstrumentedClient, Metrics
+
+
+def test_percentiles_follow_the_recorded_latencies():
+    histogram = Histogram()
+    for _ in range(90):
+        histogram.record(0.010, now=1000.0)
+    for _ in range(10):
+        histogram.record(1.0, now=1000.0)
+
+    summary = histogram.summary(now=1000.0)
+    assert summary['count'] == 100
+    assert 0.009 <= summary['p50'] <= 0.0115 # Buckets de ~12%
+    assert 0.9 <= summary['p99'] <= 1.0
+    assert summary['max'] == 1.0
+    assert summary['mean'] == pytest.approx(0.109)
+
+
+def test_old_slices_leave_the_window():
+    histogram = Histogram(window=60.0, slices=6)
+    histogram.record(0.5, error=True, now=0.0)
+    histogram.record(0.1, now=100.0)
+
+    summary = histogram.summary(now=100.0)
+    assert (summary['count'], summary['errors'], summary['max']) == (1, 0, 0.1)
+    assert (summary['total_count'], summary['total_errors']) == (2, 1) # Los totales no caducan
+
+
+def test_timed_marks_errors_but_not_streamlit_control_flow():
+    metrics = Metrics()
+
+    class RerunException(Exception):
+        pass
+
+    @metrics.timed("page")
+    def page(error):
+        raise error
+
+    for error in (ValueError("boom"), RerunException()):
+        with pytest.raises(type(error)):
+            page(error)
+    assert metrics.histogram("page").summary()['errors'] == 1
+
+
+def test_instrumented_client_times_each_query(local, monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr("modules.instrumentation.metrics", metrics)
+    client = InstrumentedClient(local)
+    client.table("flashcards").insert({'front': "court"}).execute()
+    client.table("flashcards").select("id").eq("front", "court").execute()
+    client.rpc("apply_reviews", {"rows": []}).execute()
+
+    names = {entry['name'] for entry in metrics.snapshot()}
+    assert names == {"db.insert.flashcards", "db.select.flashcards", "db.rpc.apply_reviews"}
+    assert client.path == local.path # El resto de atributos pasa al cliente
+
+
+def test_export_appends_a_jsonl_snapshot(tmp_path):
+    metrics = Metrics()
+    metrics.record("gemini.generate", 0.2)
+    path = tmp_path / "metrics" / "metrics.jsonl"
+    metrics.export(str(path))
+    metrics.export(str(path))
+
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert len(lines) == 2
+    assert lines[0]['metrics'][0]['name'] == "gemini.generate"
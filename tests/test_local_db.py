@@ -0,0 +1,80 @@
+from modules.local_db import LocalClient, Replicator
+
+
+class FailingTable:
+    """Supabase que rechaza las escrituras de una tabla y deja pasar el resto."""
+    def __init__(self, remote: LocalClient, table: str):
+        self.remote = remote
+        self.failing = table
+
+    def table(self, name: str):
+        if name == self.failing:
+            raise ConnectionError("sin red")
+        return self.remote.table(name)
+
+    def rpc(self, name, params=None):
+        return self.remote.rpc(name, params)
+
+
+def _outbox_tables(local: LocalClient):
+    with local.lock:
+        return {row[0] for row in local.conn.execute('SELECT "tbl" FROM "_outbox"')}
+
+
+# --- Replicación ---
+
+def test_outbox_is_cleared_per_table(workdir):
+    local = LocalClient(str(workdir / "local.db"), track_changes=True)
+    remote = LocalClient(str(workdir / "remote.db"))
+    card = local.table("flashcards").insert({'front': "court", 'user_id': "user"}).execute().data[0]
+    local.table("review_log").insert({'user_id': "user", 'card_id': card['id'], 'grade': 2,
+                                      'reviewed_at': "2026-01-01T10:00:00"}).execute()
+
+    Replicator(local, FailingTable(remote, "review_log")).push()
+    assert _outbox_tables(local) == {"review_log"} # 'flashcards' ya llegó: no se reenvía
+
+    replicator = Replicator(local, remote)
+    assert replicator.push() == 1
+    replicator.push()
+    assert _outbox_tables(local) == set()
+    assert len(remote.table("review_log").select("id").execute().data) == 1
+
+
+def test_review_log_replication_is_idempotent(workdir):
+    local = LocalClient(str(workdir / "local.db"), track_changes=True)
+    remote = LocalClient(str(workdir / "remote.db"))
+    card = local.table("flashcards").insert({'front': "court", 'user_id': "user"}).execute().data[0]
+    Replicator(local, remote).push()
+    local.table("review_log").insert({'user_id': "user", 'card_id': card['id'], 'grade': 2,
+                                      'reviewed_at': "2026-01-01T10:00:00"}).execute()
+    with local.lock:
+        entries = local.conn.execute('SELECT "tbl", "row_id", "op" FROM "_outbox"').fetchall()
+
+    Replicator(local, remote).push()
+    with local.lock: # El outbox se perdió antes de borrarse (crash): la misma fila se envía otra vez
+        local.conn.executemany('INSERT INTO "_outbox" ("tbl", "row_id", "op") VALUES (?, ?, ?)',
+                               [tuple(entry) for entry in entries])
+        local.conn.commit()
+    Replicator(local, remote).push()
+    assert len(remote.table("review_log").select("id").execute().data) == 1
+
+
+def test_devices_with_the_same_local_ids_do_not_collide(workdir):
+    remote = LocalClient(str(workdir / "remote.db"))
+    devices = [LocalClient(str(workdir / f"{name}.db"), track_changes=True) for name in ("laptop", "phone")]
+    for device, front in zip(devices, ("court", "run")):
+        card = device.table("flashcards").insert({'front': front, 'user_id': "user"}).execute().data[0]
+        assert card['id'] == 1 # Cada base numera por su cuenta
+        device.table("review_log").insert({'user_id': "user", 'card_id': 1, 'grade': 2,
+                                           'reviewed_at': "2026-01-01T10:00:00"}).execute()
+        Replicator(device, remote).push()
+
+    cards = {row['front']: row['id'] for row in remote.table("flashcards").select("*").execute().data}
+    assert set(cards) == {"court", "run"}
+    log = remote.table("review_log").select("card_id").execute().data
+    assert sorted(row['card_id'] for row in log) == sorted(cards.values()) # Cada revisión, con su tarjeta
+
+    devices[1].table("flashcards").update({'front': "sprint"}).eq("id", 1).execute()
+    Replicator(devices[1], remote).push()
+    fronts = {row['front'] for row in remote.table("flashcards").select("front").execute().data}
+    assert fronts == {"court", "sprint"} # La edición del phone no pisa la tarjeta 1 de la laptop
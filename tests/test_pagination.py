@@ -0,0 +1,68 @@
+def _walk(manager, limit: int):
+    """Recorre el mazo página por página siguiendo el cursor."""
+    pages, cursor = [], None
+    while True:
+        page, cursor = manager.cards_page(cursor, limit)
+        pages.append([card.id for card in page])
+        if cursor is None:
+            return pages
+
+
+def test_pages_cover_the_deck_in_id_order(make_manager):
+    manager = make_manager()
+    ids = [card.id for card in manager.add_cards([(f"word {i}", "") for i in range(25)])]
+
+    pages = _walk(manager, 10)
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum(pages, []) == sorted(ids)
+
+
+def test_exact_multiple_ends_without_an_empty_page(make_manager):
+    manager = make_manager()
+    manager.add_cards([(f"word {i}", "") for i in range(20)])
+    assert [len(page) for page in _walk(manager, 10)] == [10, 10]
+    assert make_manager(user_id="empty").cards_page() == ([], None)
+
+
+def test_deleting_cards_does_not_shift_the_next_page(make_manager):
+    manager = make_manager()
+    ids = [card.id for card in manager.add_cards([(f"word {i}", "") for i in range(30)])]
+    first, cursor = manager.cards_page(None, 10)
+
+    for card_id in ids[:5] + [cursor]: # Borradas de la página ya vista, incluida la del cursor
+        manager.delete_card(card_id)
+    page, _ = manager.cards_page(cursor, 10)
+    assert [card.id for card in page] == ids[10:20]
+
+
+def test_cards_added_elsewhere_appear_in_order(make_manager):
+    laptop, phone = make_manager(), make_manager()
+    laptop.add_cards([(f"word {i}", "") for i in range(5)])
+    phone.sync()
+    added = laptop.add_card("court", "a place")
+    phone.sync()
+
+    assert [card.id for card in phone.ordered_cards()][-1] == added.id
+    assert sum(_walk(phone, 2), []) == sorted(phone.cards)
+
+
+def test_deleted_ids_are_skipped_and_compacted(make_manager):
+    manager = make_manager()
+    cards = manager.add_cards([(f"word {i}", "") for i in range(200)])
+    ids = [card.id for card in cards]
+    for card_id in ids[:-10]:
+        manager.delete_card(card_id)
+
+    assert [card.id for card in manager.ordered_cards()] == ids[-10:]
+    assert len(manager._id_order) < 200 # Se compactó: había más muertos que vivos
+    assert manager.cards_page(None, 10) == (manager.ordered_cards(), None)
+
+
+def test_a_dead_id_that_comes_back_is_not_duplicated(make_manager):
+    manager = make_manager()
+    cards = manager.add_cards([(f"word {i}", "") for i in range(3)])
+    manager._remove_local(cards[1].id) # Sigue en _id_order hasta compactar
+    manager._append_local(cards[1])
+
+    assert [card.id for card in manager.ordered_cards()] == [card.id for card in cards]
+    assert manager._id_order == [card.id for card in cards]
@@ -0,0 +1,42 @@
+import time
+
+from modules.response_cache import ResponseCache
+
+
+def test_put_and_get(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    key = cache.key("model", "context", "court")
+
+    assert cache.get(key) is None
+    cache.put(key, "#### court\na place")
+    assert cache.get(key) == "#### court\na place"
+    assert ResponseCache(str(tmp_path / "cache.db")).get(key) == "#### court\na place" # Persiste
+
+
+def test_key_depends_on_model_context_and_prompt():
+    keys = {ResponseCache.key(*parts) for parts in
+            [("model", "ctx", "court"), ("other", "ctx", "court"), ("model", "", "court"), ("model", "ctx", "run")]}
+    assert len(keys) == 4
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=60)
+    key = cache.key("model", "", "court")
+    cache.put(key, "a place")
+    with cache._lock:
+        cache._conn.execute("UPDATE responses SET created = ?", (time.time() - 120,))
+
+    assert cache.get(key) is None
+    assert cache._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=250)
+    keys = [cache.key("model", "", word) for word in ("court", "run", "walk")]
+    cache.put(keys[0], "x" * 100)
+    cache.put(keys[1], "y" * 100)
+    time.sleep(0.01)
+    cache.get(keys[0]) # 'court' pasa a ser la más reciente
+    cache.put(keys[2], "z" * 100)
+
+    assert [cache.get(key) is not None for key in keys] == [True, False, True]
@@ -0,0 +1,172 @@
+import json
+
+import modules.flashcards_manager as fm
+from modules.review_queue import ReviewWriteBehind
+from conftest import db_row
+
+
+# --- Write-behind ---
+
+def test_flush_writes_reviews_and_log(local, make_manager):
+    manager = make_manager()
+    card = manager.add_card("court", "#### court\na place")
+    days = manager.review_card(card.id, 2) # Good
+
+    assert manager.flush_reviews()
+    row = db_row(local, card.id)
+    assert days == 1
+    assert row['repetitions'] == 1
+    assert row['interval'] == 1.0
+    assert row['version'] == 2 # Update condicional: sube la versión
+    assert manager.cards[card.id].version == 2
+    log = local.table("review_log").select("*").execute().data
+    assert [(entry['card_id'], entry['grade']) for entry in log] == [(card.id, 2)]
+
+
+def test_several_reviews_of_a_card_are_one_write(local, make_manager):
+    manager = make_manager()
+    card = manager.add_card("court", "a place")
+    for grade in (2, 2, 3):
+        manager.review_card(card.id, grade)
+
+    assert manager.flush_reviews()
+    row = db_row(local, card.id)
+    assert row['repetitions'] == 3
+    assert row['version'] == 2 # La última revisión, en una sola escritura
+    assert len(local.table("review_log").select("id").execute().data) == 3 # El historial guarda todas
+
+
+def test_journal_is_compacted_after_flush(workdir, make_manager):
+    manager = make_manager()
+    card = manager.add_card("court", "a place")
+    manager.review_card(card.id, 2)
+    manager.flush_reviews()
+
+    with open(manager.review_writer.journal_path, encoding="utf-8") as f:
+        assert f.read() == ""
+
+
+# --- Journal ---
+
+def test_recover_returns_unsent_reviews(workdir, local):
+    journal = str(workdir / "journal.jsonl")
+    writer = ReviewWriteBehind(local, lambda card_id: None, journal_path=journal, flush_interval=3600)
+    writer.enqueue(7, {'repetitions': 1}, {'user_id': "user", 'card_id': 7, 'grade': 2,
+                                          'reviewed_at': "2026-01-01T10:00:00", 'interval': 1.0})
+    writer.enqueue(7, {'repetitions': 2})
+    writer.enqueue(8, {'repetitions': 5})
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('{"id": 9, "fields"') # Línea cortada por un crash
+
+    # Otro proceso (sin flush del anterior): la última revisión de cada tarjeta
+    recovered = ReviewWriteBehind(local, lambda card_id: None, journal_path=journal,
+                                  flush_interval=3600).recover()
+    assert recovered == {7: {'repetitions': 2}, 8: {'repetitions': 5}}
+
+
+def test_manager_replays_journal_on_start(local, make_manager):
+    first = make_manager()
+    card = first.add_card("court", "a place")
+    first.close()
+    with open(fm._journal_path("user"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"id": card.id, "fields": {'repetitions': 4, 'interval': 12.0}}) + "\n")
+
+    manager = make_manager()
+    assert manager.cards[card.id].repetitions == 4
+    assert manager.review_writer.is_pending(card.id)
+    manager.flush_reviews()
+    row = db_row(local, card.id)
+    assert (row['repetitions'], row['interval']) == (4, 12.0)
+
+
+# --- Conflictos de versión ---
+
+def test_conflicting_review_loses_to_the_first_write(local, make_manager):
+    laptop, phone = make_manager(), make_manager()
+    card = laptop.add_card("court", "a place")
+    phone.sync()
+
+    laptop.review_card(card.id, 3) # Easy
+    phone.review_card(card.id, 0) # Again, basada en la misma versión
+    laptop.flush_reviews()
+    phone.flush_reviews() # No pisa: la versión de la BD ya no es la que leyó
+
+    row = db_row(local, card.id)
+    assert (row['repetitions'], row['version']) == (1, 2)
+    phone.sync() # Resuelve el conflicto trayendo la versión de la BD
+    assert phone.cards[card.id].repetitions == 1
+    assert phone.cards[card.id].version == 2
+    assert not phone.review_writer.is_pending(card.id)
+
+
+def test_review_survives_an_edit_made_elsewhere(local, make_manager):
+    laptop, phone = make_manager(), make_manager()
+    card = laptop.add_card("court", "a place")
+    phone.sync()
+
+    phone.review_card(card.id, 3)
+    laptop.update_card(card.id, new_front="the court") # Sólo el texto, antes del flush del phone
+    phone.flush_reviews() # Choca con la versión de la edición
+    assert db_row(local, card.id)['repetitions'] == 0
+
+    phone.sync() # Vuelve a encolar la revisión sobre la versión nueva
+    assert phone.review_writer.is_pending(card.id)
+    assert phone.flush_reviews()
+    row = db_row(local, card.id)
+    assert (row['front'], row['repetitions'], row['version']) == ("the court", 1, 3)
+    assert (phone.cards[card.id].front, phone.cards[card.id].version) == ("the court", 3)
+    assert len(local.table("review_log").select("id").execute().data) == 1 # El historial no se repite
+
+
+def test_pending_review_survives_a_conflicting_edit(local, make_manager):
+    laptop, phone = make_manager(), make_manager()
+    card = laptop.add_card("court", "a place")
+    phone.sync()
+
+    phone.review_card(card.id, 3)
+    laptop.update_card(card.id, new_front="the court")
+    assert not phone.update_card(card.id, new_back="a room") # Conflicto al editar con la revisión en cola
+    assert phone.flush_reviews()
+    assert db_row(local, card.id)['repetitions'] == 1
+
+
+def test_conflicting_edit_is_not_saved(local, make_manager):
+    laptop, phone = make_manager(), make_manager()
+    card = laptop.add_card("court", "a place")
+    phone.sync()
+
+    assert laptop.update_card(card.id, new_front="the court")
+    assert not phone.update_card(card.id, new_front="a court")
+    assert db_row(local, card.id)['front'] == "the court"
+    assert phone.cards[card.id].front == "the court"
+
+
+def test_full_reload_keeps_queued_reviews(local, make_manager):
+    manager = make_manager()
+    card = manager.add_card("court", "a place")
+    manager.review_card(card.id, 3)
+
+    manager._watermark = None # Sin marca de agua: sync() recarga el mazo entero
+    manager.sync()
+    assert manager.cards[card.id].repetitions == 1
+    assert card.id not in {due.id for due in manager.due_cards()}
+    manager.flush_reviews()
+    assert db_row(local, card.id)['repetitions'] == 1
+
+
+def test_insert_sets_the_watermark(make_manager):
+    manager = make_manager()
+    assert manager._watermark is None # Mazo vacío
+    manager.add_card("court", "a place")
+    assert manager._watermark is not None
+
+
+def test_resending_a_log_batch_does_not_duplicate_it(local, make_manager):
+    manager = make_manager()
+    card = manager.add_card("court", "a place")
+    manager.review_card(card.id, 2)
+    log = list(manager.review_writer._log)
+
+    assert manager.flush_reviews()
+    assert manager.review_writer._write_log(log) # p.ej. un reintento tras un timeout que sí llegó
+    assert len(local.table("review_log").select("id").execute().data) == 1
@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+
+from modules.local_db import LocalClient, Replicator
+from modules.review_stats import ReviewStats
+
+
+def _day_row(local, user_id="user"):
+    rows = local.table("daily_stats").select("*").eq("user_id", user_id).execute().data
+    return {row['day']: [row['again'], row['hard'], row['good'], row['easy'], row['added']] for row in rows}
+
+
+# --- Métricas en memoria ---
+
+def test_streak_and_retention():
+    stats = ReviewStats()
+    today = datetime(2026, 3, 10, 9, 0)
+    for days_ago, grade in [(3, 2), (2, 0), (1, 3), (1, 1), (0, 2)]:
+        stats.record_review(grade, today - timedelta(days=days_ago))
+
+    summary = stats.summary(today.date())
+    assert (summary['total_reviews'], summary['reviews_today'], summary['streak']) == (5, 1, 4)
+    assert summary['grades'] == {'again': 1, 'hard': 1, 'good': 2, 'easy': 1}
+    assert summary['retention'] == 0.8
+    assert stats.current_streak(date(2026, 3, 12)) == 0 # Sin revisar ayer ni hoy
+
+
+def test_streak_restarts_after_a_gap():
+    stats = ReviewStats()
+    for day in (1, 2, 3, 6, 7):
+        stats.record_review(2, datetime(2026, 3, day, 12))
+    assert (stats.current_streak(date(2026, 3, 7)), stats.longest_streak) == (2, 3)
+
+
+def test_load_days_rebuilds_totals_and_streak():
+    stats = ReviewStats()
+    stats.load_days([{'day': "2026-03-02", 'again': 1, 'good': 2, 'added': 5},
+                     {'day': "2026-03-01", 'easy': 1},
+                     {'day': "2026-03-03", 'added': 4}]) # Sólo altas: no cuenta para la racha
+
+    summary = stats.summary(date(2026, 3, 3))
+    assert (summary['total_reviews'], summary['added_today'], summary['streak']) == (4, 4, 2)
+
+
+def test_due_forecast_rolls_overdue_cards_into_today():
+    stats = ReviewStats()
+    today = date.today()
+    noon = lambda offset: int(datetime.combine(today + timedelta(days=offset), datetime.min.time()).timestamp()) + 43200
+    for offset in (-2, 0, 1, 3):
+        stats.move_due(None, noon(offset))
+    stats.move_due(noon(3), noon(2)) # Una tarjeta cambió de día
+
+    forecast = stats.summary(today)['due_forecast']
+    assert list(forecast.values())[:4] == [2, 1, 1, 0] # La atrasada cuenta para hoy
+    later = stats.summary(today + timedelta(days=2)) # Pasaron dos días sin revisar
+    assert later['due_today'] == 4
+
+
+# --- Guardado ---
+
+def test_two_devices_add_up_the_same_day(local, make_manager):
+    laptop, phone = make_manager(), make_manager()
+    card = laptop.add_card("court", "a place")
+    laptop.review_card(card.id, 3)
+    phone.sync()
+    phone.review_card(card.id, 0)
+    phone.review_card(card.id, 2)
+    laptop.flush_reviews()
+    phone.flush_reviews()
+    laptop.flush_reviews() # Sin cambios nuevos: no vuelve a sumar
+
+    today = date.today().isoformat()
+    assert _day_row(local)[today] == [1, 0, 1, 1, 1]
+
+
+def test_transient_failure_keeps_the_increments(local, make_manager):
+    manager = make_manager()
+    manager.add_card("court", "a place")
+
+    class Down:
+        def rpc(self, name, params):
+            raise ConnectionError("sin red")
+
+    manager.stats.save(Down(), "user")
+    assert _day_row(local) == {}
+    manager.stats._retry_at = 0.0 # Sin esperar el backoff
+    manager.stats.save(local, "user")
+    assert list(_day_row(local).values()) == [[0, 0, 0, 0, 1]]
+
+
+def test_replica_receives_increments_not_totals(workdir):
+    remote = LocalClient(str(workdir / "remote.db"))
+    today = date.today().isoformat()
+    remote.rpc("add_daily_stats", {"rows": [{'user_id': "user", 'day': today, 'good': 5}]}).execute()
+
+    local = LocalClient(str(workdir / "local.db"), track_changes=True)
+    replicator = Replicator(local, remote)
+    replicator.bootstrap("daily_stats")
+    local.rpc("add_daily_stats", {"rows": [{'user_id': "user", 'day': today, 'good': 1}]}).execute()
+    remote.rpc("add_daily_stats", {"rows": [{'user_id': "user", 'day': today, 'good': 2}]}).execute()
+
+    assert replicator.push() == 1
+    assert _day_row(remote)[today][2] == 8 # 5 + 2 de otro dispositivo + 1 de éste
+    assert _day_row(local)[today][2] == 6
@@ -0,0 +1,147 @@
+import struct
+import threading
+
+import pytest
+
+from modules.snapshot import MAGIC, DeckSnapshot, SnapshotError, write_snapshot
+
+
+def _rows(n: int):
+    return [(i, f"front {i}", f"back {i} " + "é" * (i % 7), 1_700_000_000 + i, float(i), 2.5 - i / 1000, i % 4, 1 + i % 3)
+            for i in range(1, n + 1)]
+
+
+def _wait_reconcile():
+    for thread in threading.enumerate():
+        if thread.name == "snapshot-reconcile":
+            thread.join(10)
+
+
+# --- Formato ---
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "deck.fcs")
+    rows = _rows(600) # Más de dos bloques de texto
+    write_snapshot(path, rows, "user", watermark="2026-01-01T00:00:00", block_size=256)
+
+    with DeckSnapshot(path) as snapshot:
+        assert (snapshot.user_id, snapshot.watermark, len(snapshot)) == ("user", "2026-01-01T00:00:00", 600)
+        assert snapshot.ids.tolist() == [row[0] for row in rows]
+        assert snapshot.due.tolist() == [row[3] for row in rows]
+        assert snapshot.version.tolist() == [row[7] for row in rows]
+        assert list(snapshot.texts("front")) == [row[1] for row in rows]
+        restored = list(snapshot.rows())
+        assert (restored[300]['back'], restored[300]['easiness_factor']) == (rows[300][2], rows[300][5])
+
+
+def test_backs_by_id_and_version(tmp_path):
+    path = str(tmp_path / "deck.fcs")
+    write_snapshot(path, _rows(600), "user")
+
+    with DeckSnapshot(path) as snapshot:
+        assert snapshot.positions([1, 600, 601]).tolist() == [0, 599, -1]
+        assert snapshot.backs([2, 513, 999]) == {2: "back 2 éé", 513: "back 513 " + "é" * (513 % 7)}
+        # Con otra versión, el 'back' del snapshot puede estar viejo: no se devuelve (la 3 tiene la 1)
+        assert snapshot.backs([2, 3], versions=[3, 2]) == {2: "back 2 éé"}
+
+
+def test_rows_must_be_sorted(tmp_path):
+    with pytest.raises(ValueError):
+        write_snapshot(str(tmp_path / "deck.fcs"), list(reversed(_rows(3))), "user")
+
+
+# --- Archivos dañados ---
+
+@pytest.mark.parametrize("damage", ["empty", "magic", "truncated", "columns", "meta"])
+def test_damaged_files_raise_snapshot_error(tmp_path, damage):
+    path = tmp_path / "deck.fcs"
+    write_snapshot(str(path), _rows(50), "user")
+    data = bytearray(path.read_bytes())
+    if damage == "empty":
+        data = b""
+    elif damage == "magic":
+        data[:4] = b"JUNK"
+    elif damage == "truncated":
+        data = data[:len(data) // 2]
+    elif damage == "columns":
+        _, _, meta_len = struct.unpack_from("<HHI", data, len(MAGIC))
+        data[len(MAGIC) + 8 + meta_len + 3] ^= 0xFF # Un byte de la columna 'id': no pasa el checksum
+    else:
+        data = data.replace(b'"sections"', b'"sectionz"') # Metadatos incompletos
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(SnapshotError):
+        DeckSnapshot(str(path))
+
+
+def test_damaged_text_block_raises_on_read(tmp_path):
+    path = tmp_path / "deck.fcs"
+    write_snapshot(str(path), _rows(50), "user")
+    with DeckSnapshot(str(path)) as snapshot:
+        offset = snapshot._base + snapshot.meta['sections']['back'][0] + snapshot._tables['back'].nbytes
+    data = bytearray(path.read_bytes())
+    data[offset + 4] ^= 0xFF # Dentro del primer bloque comprimido de 'back'
+    path.write_bytes(bytes(data))
+
+    with DeckSnapshot(str(path)) as snapshot:
+        with pytest.raises(SnapshotError):
+            snapshot.backs([1])
+
+
+# --- Manager ---
+
+def test_warm_start_from_snapshot(workdir, make_manager):
+    path = str(workdir / "deck.fcs")
+    manager = make_manager(snapshot_path=path)
+    cards = manager.add_cards([(f"word {i}", f"meaning {i}") for i in range(20)])
+    manager.review_card(cards[0].id, 3)
+    manager.close() # Envía lo pendiente y escribe el snapshot
+
+    warm = make_manager(snapshot_path=path)
+    assert set(warm.cards) == {card.id for card in cards}
+    assert warm.cards[cards[0].id].repetitions == 1
+    assert warm.get_back(cards[5].id) == "meaning 5"
+
+
+def test_reconcile_applies_changes_made_after_the_snapshot(workdir, make_manager):
+    path = str(workdir / "deck.fcs")
+    manager = make_manager(snapshot_path=path)
+    edited, deleted, kept = manager.add_cards([("court", "a place"), ("take off", "leave"), ("run", "move")])
+    manager.close()
+
+    other = make_manager() # Otro dispositivo, mientras esta sesión estaba cerrada
+    other.update_card(edited.id, new_front="the court", new_back="a room")
+    other.delete_card(deleted.id)
+    added = other.add_card("walk", "move slowly")
+
+    warm = make_manager(snapshot_path=path)
+    assert warm.cards[edited.id].front == "court" # Sale del snapshot, sin consultar la BD
+    _wait_reconcile()
+    warm.sync()
+    assert set(warm.cards) == {edited.id, kept.id, added.id}
+    assert warm.cards[edited.id].front == "the court"
+    assert warm.get_back(edited.id) == "a room" # Versión distinta: el 'back' no sale del snapshot
+
+
+def test_snapshot_of_another_user_is_ignored(workdir, make_manager):
+    path = str(workdir / "deck.fcs")
+    owner = make_manager(snapshot_path=path)
+    owner.add_card("court", "a place")
+    owner.close()
+
+    assert make_manager(user_id="someone else", snapshot_path=path).cards == {}
+
+
+def test_restore_adds_only_new_fronts(workdir, make_manager):
+    backup = str(workdir / "backup.fcs")
+    source = make_manager()
+    source.add_cards([("court", "a place"), ("run", "move")])
+    source.review_card(next(iter(source.cards)), 3)
+    assert source.save_snapshot(backup) > 0
+
+    target = make_manager(user_id="target")
+    target.add_card("run", "already here")
+    assert target.restore_snapshot(backup) == 1
+    restored = next(card for card in target.cards.values() if card.front == "court")
+    assert restored.repetitions == 1 # Con su scheduling
+    assert target.get_back(restored.id) == "a place"
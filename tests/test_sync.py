@@ -0,0 +1,70 @@
+from conftest import db_row
+
+
+def test_sync_brings_cards_added_elsewhere(make_manager):
+    laptop, phone = make_manager(), make_manager()
+    card = laptop.add_card("court", "a place")
+
+    phone.sync()
+    assert phone.cards[card.id].front == "court"
+    assert phone.get_back(card.id) == "a place"
+
+
+def test_sync_applies_edits_and_reviews(make_manager):
+    laptop, phone = make_manager(), make_manager()
+    card = laptop.add_card("court", "a place")
+    phone.sync()
+
+    laptop.update_card(card.id, new_front="the court", new_back="a room")
+    laptop.review_card(card.id, 3)
+    laptop.flush_reviews()
+    phone.sync()
+
+    synced = phone.cards[card.id]
+    assert (synced.front, synced.repetitions, synced.version) == ("the court", 1, 3)
+    assert phone.get_back(card.id) == "a room" # El cache se invalidó
+    assert card.id not in {due.id for due in phone.due_cards()}
+
+
+def test_delete_leaves_a_tombstone_that_sync_applies(local, make_manager):
+    laptop, phone = make_manager(), make_manager()
+    kept, deleted = laptop.add_card("court", "a place"), laptop.add_card("take off", "leave")
+    phone.sync()
+
+    assert laptop.delete_card(deleted.id)
+    assert db_row(local, deleted.id)['deleted'] is True # La fila queda: así la ve la sync incremental
+    phone.sync()
+    assert set(phone.cards) == {kept.id}
+    assert [card.id for card in phone.ordered_cards()] == [kept.id]
+
+
+def test_deleted_cards_are_not_loaded(make_manager):
+    laptop = make_manager()
+    kept, deleted = laptop.add_card("court", "a place"), laptop.add_card("take off", "leave")
+    laptop.delete_card(deleted.id)
+
+    assert set(make_manager().cards) == {kept.id}
+
+
+def test_sync_only_reads_rows_past_the_watermark(local, make_manager):
+    laptop, phone = make_manager(), make_manager()
+    laptop.add_cards([(f"word {i}", "") for i in range(50)])
+    phone.sync()
+    watermark = phone._watermark
+
+    card = laptop.add_card("court", "a place")
+    applied = phone.sync()
+    assert applied < 5 # La tarjeta nueva (y las del borde de la marca de agua), no el mazo
+    assert card.id in phone.cards
+    assert phone._watermark > watermark
+
+
+def test_queued_review_is_not_overwritten_by_sync(make_manager):
+    laptop, phone = make_manager(), make_manager()
+    card = laptop.add_card("court", "a place")
+    phone.sync()
+
+    phone.review_card(card.id, 3)
+    laptop.update_card(card.id, new_front="the court") # Otra escritura antes del flush del phone
+    phone.sync()
+    assert phone.cards[card.id].repetitions == 1 # La revisión en cola no se pierde
@@ -0,0 +1,56 @@
+import base64
+import os
+
+import pytest
+
+from modules.tts_cache import TTSCache
+
+
+@pytest.fixture
+def synthesized(monkeypatch):
+    """gTTS de mentira: devuelve el texto como audio y anota cada síntesis."""
+    calls = []
+
+    def fake(text, lang, slow):
+        calls.append(text)
+        return f"{lang}:{text}".encode("utf-8") * 100
+    monkeypatch.setattr(TTSCache, "_synthesize", staticmethod(fake))
+    return calls
+
+
+def test_second_request_is_served_from_memory(tmp_path, synthesized):
+    cache = TTSCache(str(tmp_path / "tts"))
+    audio = cache.get_base64("court")
+
+    assert base64.b64decode(audio).startswith(b"en:court")
+    assert cache.get_base64("court") == audio
+    assert synthesized == ["court"]
+    assert cache.get_base64("court", lang="es") != audio # Otra clave: otro audio
+
+
+def test_audio_survives_a_restart_on_disk(tmp_path, synthesized):
+    TTSCache(str(tmp_path / "tts")).get_base64("court")
+    restarted = TTSCache(str(tmp_path / "tts"))
+
+    assert base64.b64decode(restarted.get_base64("court")).startswith(b"en:court")
+    assert synthesized == ["court"]
+
+
+def test_prefetch_synthesizes_in_the_background(tmp_path, synthesized):
+    cache = TTSCache(str(tmp_path / "tts"))
+    cache.prefetch(["court", "", "run"])
+    cache.get_base64("court") # Espera la síntesis en vuelo, no la repite
+    cache.get_base64("run")
+
+    assert sorted(synthesized) == ["court", "run"]
+
+
+def test_disk_is_trimmed_least_recently_used_first(tmp_path, synthesized):
+    directory = tmp_path / "tts"
+    cache = TTSCache(str(directory), max_bytes=1500, memory_items=1)
+    for text in ("court", "run", "walk"): # 600-800 bytes cada uno
+        cache.get_base64(text)
+
+    files = set(os.listdir(directory))
+    assert TTSCache.key("court") + ".mp3" not in files
+    assert {TTSCache.key("run") + ".mp3", TTSCache.key("walk") + ".mp3"} <= files